@@ -0,0 +1,75 @@
+### asof_join.py ###
+#
+# Compares the vectorized asof_join against the original pure Python
+# increase_sample_rate_most_recent loop on a synthetic liquid ticker day
+# Run from the repo root: python -m benchmarks.asof_join
+#
+
+import time
+import numpy as np
+
+from src.datastream import asof_join
+
+
+N_QUOTES = 2_000_000
+N_TRADES = 400_000
+REPEATS = 3
+
+
+def legacy_increase_sample_rate_most_recent(to_increase, timestamps, timestamps_onto):
+
+    """
+    Verbatim copy of the original loop, kept here as the baseline
+    """
+
+    upsampled = [[] for _ in range(len(to_increase))]
+
+    basei = 0
+    for ts in timestamps_onto:
+        while basei + 1 < len(timestamps) and timestamps[basei + 1] <= ts:
+            basei += 1
+
+        for i in range(len(to_increase)):
+            if timestamps[basei] <= ts:
+                upsampled[i].append(to_increase[i][basei])
+            else:
+                upsampled[i].append(0)
+
+    return upsampled
+
+
+def best_of(fn, repeats=REPEATS):
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+
+    rng = np.random.default_rng(0)
+    quote_ts = np.sort(rng.integers(0, 57_600 * 10**9, N_QUOTES))
+    trade_ts = np.sort(rng.integers(0, 57_600 * 10**9, N_TRADES))
+    prices = 780 + rng.standard_normal(N_TRADES).cumsum() * 0.01
+    sizes = rng.integers(1, 500, N_TRADES).astype(np.float64)
+
+    quote_list, trade_list = quote_ts.tolist(), trade_ts.tolist()
+    price_list, size_list = prices.tolist(), sizes.tolist()
+
+    # The old _info_for_day called the loop once for prices and once for sizes
+    legacy_time, legacy = best_of(lambda: (
+        legacy_increase_sample_rate_most_recent([price_list], trade_list, quote_list)[0],
+        legacy_increase_sample_rate_most_recent([size_list], trade_list, quote_list)[0]
+    ), repeats=1)
+    vector_time, vector = best_of(lambda: asof_join([prices, sizes], trade_ts, quote_ts))
+
+    assert vector[0].tolist() == legacy[0]
+    assert vector[1].tolist() == legacy[1]
+
+    print(f"{N_QUOTES:,} quotes, {N_TRADES:,} trades, 2 columns")
+    print(f"legacy loop: {legacy_time:.3f}s")
+    print(f"asof_join:   {vector_time:.3f}s")
+    print(f"speedup:     {legacy_time / vector_time:.1f}x")
@@ -0,0 +1,81 @@
+### json_decode.py ###
+#
+# Parse time and peak memory for one 50k-row Polygon page with each JSON backend
+# Compares decoding to full record dicts against decoding straight to typed columns
+# Run from the repo root: python -m benchmarks.json_decode
+#
+
+import json
+import time
+import random
+import tracemalloc
+
+from src.transport import get_json_loads, orjson
+from src.datastream import records_to_columns, TRADE_COLUMNS, QUOTE_COLUMNS
+
+
+ROWS = 50_000
+REPEATS = 5
+
+
+def make_page(kind):
+
+    """
+    Builds a page body with every field the Polygon v3 endpoints return
+    """
+
+    rng = random.Random(0)
+    t = 1752586200000000000
+    results = []
+    for i in range(ROWS):
+        t += rng.randint(1, 2_000_000)
+        mid = round(780 + rng.gauss(0, 2), 2)
+        if kind == "trades":
+            results.append({
+                "conditions": [12, 37], "exchange": 4, "id": str(i), "participant_timestamp": t - 500,
+                "price": mid, "sequence_number": i, "sip_timestamp": t, "size": rng.randint(1, 500),
+                "tape": 3, "trf_id": 201, "trf_timestamp": t - 200
+            })
+        else:
+            results.append({
+                "ask_exchange": 11, "ask_price": mid + 0.05, "ask_size": rng.randint(1, 9), "bid_exchange": 12,
+                "bid_price": mid - 0.05, "bid_size": rng.randint(1, 9), "conditions": [1], "indicators": [604],
+                "participant_timestamp": t - 500, "sequence_number": i, "sip_timestamp": t, "tape": 3
+            })
+
+    body = {"results": results, "status": "OK", "request_id": "bench", "next_url": "https://api.polygon.io/v3/next"}
+    return json.dumps(body).encode()
+
+
+def measure(fn):
+
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    # Retained is what stays alive per page once decoding is done
+    tracemalloc.start()
+    kept = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    return best, peak, retained
+
+
+if __name__ == "__main__":
+
+    backends = ["json"] + (["orjson"] if orjson is not None else [])
+
+    for kind, columns in (("trades", TRADE_COLUMNS), ("quotes", QUOTE_COLUMNS)):
+        body = make_page(kind)
+        print(f"{kind}: {ROWS:,} rows, {len(body) / 1e6:.1f} MB page")
+
+        for backend in backends:
+            loads = get_json_loads(backend)
+
+            for label, fn in (("records", lambda: loads(body)["results"]), ("columns", lambda: records_to_columns(loads(body)["results"], columns))):
+                seconds, peak, retained = measure(fn)
+                print(f"  {backend:7s} {label}: {seconds * 1000:7.1f} ms, peak {peak / 1e6:6.1f} MB, retained {retained / 1e6:6.1f} MB")
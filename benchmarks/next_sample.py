@@ -0,0 +1,88 @@
+### next_sample.py ###
+#
+# Measures DataInterface.next_sample throughput in ticks/sec
+# Compares fresh MarketSample dicts per quote against the reusable SampleCursor
+# Data is written to a temporary TickCache so no API key or network is needed
+# Run from the repo root: python -m benchmarks.next_sample
+#
+
+import time
+import tempfile
+import numpy as np
+
+from src.cache import TickCache
+from src.interface import DataInterface
+
+
+N_QUOTES = 1_000_000
+N_TRADES = 200_000
+TICKER = "BENCH"
+DATE = "2025-07-15"
+
+
+def make_cache(root):
+
+    rng = np.random.default_rng(0)
+    cache = TickCache(root)
+
+    DI = DataInterface(None, TICKER, [DATE], cache=cache)
+    start, end = DI._time_window(DATE)
+
+    quote_ts = np.sort(rng.integers(start, end, N_QUOTES))
+    trade_ts = np.sort(rng.integers(start, end, N_TRADES))
+    mid = 780 + rng.standard_normal(N_QUOTES).cumsum() * 0.01
+
+    trades = {
+        "participant_timestamp": trade_ts,
+        "sip_timestamp": trade_ts,
+        "price": 780 + rng.standard_normal(N_TRADES).cumsum() * 0.01,
+        "size": rng.integers(1, 500, N_TRADES).astype(np.float64)
+    }
+    quotes = {
+        "participant_timestamp": quote_ts,
+        "sip_timestamp": quote_ts,
+        "bid_price": mid - 0.05,
+        "ask_price": mid + 0.05,
+        "bid_size": rng.integers(1, 10, N_QUOTES).astype(np.float64),
+        "ask_size": rng.integers(1, 10, N_QUOTES).astype(np.float64)
+    }
+    cache.put(TICKER, DATE, (start, end), trades, quotes)
+
+    return cache
+
+
+def run(cache, reuse_samples):
+
+    DI = DataInterface(None, TICKER, [DATE], cache=cache, reuse_samples=reuse_samples)
+
+    # First call loads the day from the cache, only the per quote loop is timed
+    sample = DI.next_sample()
+    ticks = 0
+    checksum = 0.0
+
+    start = time.perf_counter()
+    while sample:
+        # Same access pattern as RangeBound.get_order and MarketSimulator.fill_order
+        checksum += sample.NBBO.get("bid") + sample.NBBO.get("ask") + sample.NBBO.get("ask_size", 0)
+        ticks += 1
+        sample = DI.next_sample()
+    elapsed = time.perf_counter() - start
+
+    return ticks / elapsed, checksum
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as root:
+
+        cache = make_cache(root)
+
+        dict_rate, dict_checksum = run(cache, reuse_samples=False)
+        cursor_rate, cursor_checksum = run(cache, reuse_samples=True)
+
+        assert dict_checksum == cursor_checksum
+
+        print(f"{N_QUOTES:,} quotes")
+        print(f"MarketSample dicts: {dict_rate:,.0f} ticks/sec")
+        print(f"SampleCursor:       {cursor_rate:,.0f} ticks/sec")
+        print(f"speedup:            {cursor_rate / dict_rate:.2f}x")
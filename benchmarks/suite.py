@@ -0,0 +1,266 @@
+### suite.py ###
+#
+# Offline throughput suite for the backtest loop, no API key or network needed
+# Serves a SyntheticMarket from a local MockPolygonServer and reports per stage
+# ticks/sec, latency percentiles per call and peak traced memory
+# Save a run with --json and pass it back with --baseline to flag regressions
+# Run from the repo root: python -m benchmarks.suite [--quotes-per-second 5] [--json out.json] [--baseline old.json]
+#
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+from src.cache import TickCache
+from src.interface import DataInterface
+from src.transport import PolygonSession
+from src.results import Grapher
+from src.matching import MatchingEngine
+from src.marketsimulator import MarketSimulator, BasicFractionalSlippageModel, IBKRProFIXEDCostStructure
+from src.synthetic import SyntheticMarket, MockPolygonServer
+
+
+TICKER = "SYN"
+DATES = ["2025-07-14", "2025-07-15"]
+
+
+def percentiles(latencies):
+
+    """
+    Latency summary in microseconds from an array of nanosecond call times
+    """
+
+    if len(latencies) == 0:
+        return {"p50_us": 0.0, "p90_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) / 1000
+    return {"p50_us": p50, "p90_us": p90, "p99_us": p99, "max_us": latencies.max() / 1000}
+
+
+def peak_memory(fn):
+
+    """
+    Peak bytes traced by tracemalloc while fn runs, numpy allocations included
+    Runs separately from the timed pass because tracing slows Python code down
+    """
+
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stage_result(ticks, seconds, latencies, peak):
+    return {
+        "ticks": ticks,
+        "seconds": seconds,
+        "ticks_per_second": ticks / seconds if seconds else 0.0,
+        **percentiles(latencies),
+        "peak_mb": peak / 1e6
+    }
+
+
+def make_interface(server, cache_root, session=None):
+    return DataInterface("synthetic", TICKER, DATES, base_url=server.url, cache=TickCache(cache_root), session=session)
+
+
+def bench_fetch(server, limit):
+
+    """
+    Download, JSON decode and day building over HTTP, latency is per page
+    The mock server runs in this process so its page encoding shows up in peak memory too
+    """
+
+    pages = []
+    session = PolygonSession(on_page=lambda record: pages.append(record["latency"]))
+
+    def run():
+        DI = DataInterface("synthetic", TICKER, DATES, base_url=server.url, session=session)
+        return sum(len(DI._build_day(date, limit)) for date in DATES)
+
+    start = time.perf_counter()
+    ticks = run()
+    seconds = time.perf_counter() - start
+    latencies = np.array(pages) * 1e9
+
+    return stage_result(ticks, seconds, latencies, peak_memory(run))
+
+
+def bench_next_sample(server, cache_root, limit):
+
+    """
+    next_sample from the on-disk cache, latency is per call
+    """
+
+    def run(latencies=None):
+        DI = make_interface(server, cache_root)
+        clock = time.perf_counter_ns
+        n = 0
+        t = clock()
+        sample = DI.next_sample(limit)
+        while sample:
+            now = clock()
+            if latencies is not None:
+                latencies.append(now - t)
+            n += 1
+            t = clock()
+            sample = DI.next_sample(limit)
+        return n
+
+    latencies = []
+    start = time.perf_counter()
+    ticks = run(latencies)
+    seconds = time.perf_counter() - start
+
+    return stage_result(ticks, seconds, np.array(latencies), peak_memory(run))
+
+
+def load_samples(server, cache_root, limit):
+
+    DI = make_interface(server, cache_root)
+    samples = []
+    sample = DI.next_sample(limit)
+    while sample:
+        if sample.NBBO["bid"] and sample.NBBO["ask"]:
+            samples.append(sample.copy())
+        sample = DI.next_sample(limit)
+    return samples
+
+
+def bench_per_sample(samples, make_step):
+
+    """
+    Times step(sample) for every sample, make_step builds fresh state for each pass
+    """
+
+    def run(latencies=None):
+        step = make_step()
+        clock = time.perf_counter_ns
+        for sample in samples:
+            t = clock()
+            step(sample)
+            if latencies is not None:
+                latencies.append(clock() - t)
+
+    latencies = []
+    start = time.perf_counter()
+    run(latencies)
+    seconds = time.perf_counter() - start
+
+    return stage_result(len(samples), seconds, np.array(latencies), peak_memory(run))
+
+
+def fill_order_step():
+
+    # Alternates buying and selling 100 shares so lots open and close every tick
+    MS = MarketSimulator(slippage_model=BasicFractionalSlippageModel(), cost_structure=IBKRProFIXEDCostStructure())
+    state = {"buy": True}
+
+    def step(sample):
+        MS.fill_order(TICKER, sample.NBBO, 100, sample.temporal, state["buy"])
+        state["buy"] = not state["buy"]
+
+    return step
+
+
+def grapher_step():
+
+    G = Grapher()
+
+    def step(sample):
+        G.add_data(sample.temporal, (sample.NBBO["bid"], sample.NBBO["ask"]), 0, 0.0)
+
+    return step
+
+
+def matching_step():
+
+    # Keeps one passive order resting on each side so quotes and trades keep hitting the book
+    engine = MatchingEngine(MarketSimulator(), latency_ns=1_000_000)
+
+    def step(sample):
+        engine.on_sample(sample)
+        if len(engine.orders) < 2:
+            engine.submit(TICKER, 100, sample.temporal, True, "limit", sample.NBBO["bid"])
+            engine.submit(TICKER, 100, sample.temporal, False, "limit", sample.NBBO["ask"])
+
+    return step
+
+
+def run_suite(quotes_per_second=5.0, trades_per_second=1.0, limit=50000, seed=0):
+
+    """
+    Runs every stage and returns {stage: result dict}
+    """
+
+    market = SyntheticMarket(seed=seed, start_price=780, quotes_per_second=quotes_per_second, trades_per_second=trades_per_second)
+    results = {}
+
+    with MockPolygonServer(market) as server, tempfile.TemporaryDirectory() as cache_root:
+        results["fetch"] = bench_fetch(server, limit)
+
+        # Fill the cache once so the later stages do not depend on the HTTP path
+        make_interface(server, cache_root).prewarm(limit)
+
+        results["next_sample"] = bench_next_sample(server, cache_root, limit)
+
+        samples = load_samples(server, cache_root, limit)
+        results["fill_order"] = bench_per_sample(samples, fill_order_step)
+        results["grapher.add_data"] = bench_per_sample(samples, grapher_step)
+        results["matching.on_sample"] = bench_per_sample(samples, matching_step)
+
+    return results
+
+
+def format_results(results):
+    lines = [f"{'stage':22s} {'ticks':>10s} {'ticks/s':>12s} {'p50 us':>9s} {'p90 us':>9s} {'p99 us':>9s} {'max us':>10s} {'peak MB':>9s}"]
+    for name, r in results.items():
+        lines.append(f"{name:22s} {r['ticks']:10d} {r['ticks_per_second']:12,.0f} {r['p50_us']:9.2f} {r['p90_us']:9.2f} {r['p99_us']:9.2f} {r['max_us']:10.1f} {r['peak_mb']:9.1f}")
+    return "\n".join(lines)
+
+
+def compare(results, baseline, tolerance):
+
+    """
+    Returns the stages whose ticks/sec dropped by more than tolerance against a baseline run
+    """
+
+    regressions = []
+    for name, r in results.items():
+        old = baseline.get(name)
+        if old and old["ticks_per_second"] and r["ticks_per_second"] < old["ticks_per_second"] * (1 - tolerance):
+            regressions.append((name, old["ticks_per_second"], r["ticks_per_second"]))
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Offline benchmark suite on synthetic Polygon data")
+    parser.add_argument("--quotes-per-second", type=float, default=5.0)
+    parser.add_argument("--trades-per-second", type=float, default=1.0)
+    parser.add_argument("--limit", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed ticks/sec drop before a stage counts as a regression")
+    args = parser.parse_args()
+
+    results = run_suite(args.quotes_per_second, args.trades_per_second, args.limit, args.seed)
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:,.0f} -> {new:,.0f} ticks/s")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,98 @@
+### vectorized.py ###
+#
+# Runs RangeBound over a synthetic day with the event loop and with the
+# vectorized engine, checks they agree fill by fill and reports the speedup
+# Run from the repo root: python -m benchmarks.vectorized
+#
+
+import time
+import numpy as np
+
+from src.interface import DayData, DAY_COLUMNS
+from src.sweep import simulate_day
+from src.vectorized import run_vectorized_day
+from src.marketsimulator import MarketSimulator, IdealFillSlippageModel, BasicFractionalSlippageModel, IBKRProFIXEDCostStructure
+
+from example_strategies.reversion import RangeBound
+
+
+N_QUOTES = 2_000_000
+TICKER = "BENCH"
+
+MEAN = 780
+DEVIATION = 2
+
+
+class RecordingSimulator(MarketSimulator):
+
+    """
+    MarketSimulator keeping (timestamp, position, realized PnL) after every fill
+    fill_order and the vectorized engine both book through apply_fill
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = []
+
+    def apply_fill(self, stock, avg_price, filled_qty, timestamp, *args, **kwargs):
+        super().apply_fill(stock, avg_price, filled_qty, timestamp, *args, **kwargs)
+        self.path.append((timestamp, self.positions[stock], self.position_PnL[stock]))
+
+
+def make_day():
+
+    """
+    Mid price oscillating around MEAN through both edges of the RangeBound band
+    with a random cycle length and noise, so the strategy flips position hundreds of times
+    """
+
+    rng = np.random.default_rng(0)
+    timestamps = np.cumsum(rng.integers(1, 20_000_000, N_QUOTES))
+    phase = np.cumsum(rng.uniform(0, 2 * np.pi / 2500, N_QUOTES))
+    mid = MEAN + 1.5 * DEVIATION * np.sin(phase) + rng.normal(0, 0.3, N_QUOTES)
+    return DayData(
+        "2025-07-15",
+        timestamps,
+        np.round(mid - 0.05, 2),
+        np.round(mid + 0.05, 2),
+        rng.integers(1, 200, N_QUOTES).astype(np.float64),
+        rng.integers(1, 200, N_QUOTES).astype(np.float64),
+        np.round(mid, 2),
+        rng.integers(1, 500, N_QUOTES).astype(np.float64)
+    )
+
+
+if __name__ == "__main__":
+
+    day = make_day()
+    columns = {name: getattr(day, name) for name in DAY_COLUMNS}
+
+    for slippage_model in (IdealFillSlippageModel(), BasicFractionalSlippageModel()):
+
+        strategy = RangeBound(mean=MEAN, deviation=DEVIATION, max_allowed_position=100)
+
+        event_sim = RecordingSimulator(slippage_model=slippage_model, cost_structure=IBKRProFIXEDCostStructure())
+        start = time.perf_counter()
+        cursor = simulate_day(strategy, event_sim, TICKER, columns, 0, N_QUOTES)
+        event_time = time.perf_counter() - start
+
+        vector_sim = RecordingSimulator(slippage_model=slippage_model, cost_structure=IBKRProFIXEDCostStructure())
+        start = time.perf_counter()
+        result = run_vectorized_day(strategy, vector_sim, TICKER, day)
+        vector_time = time.perf_counter() - start
+
+        # Same fills at the same times, with identical position and realized PnL after each one
+        event_path = np.array(event_sim.path)
+        vector_path = np.array(vector_sim.path)
+        assert len(event_path) >= 200, f"only {len(event_path)} fills, the day no longer exercises the engines"
+        assert (event_path[:, 1] > 0).any() and (event_path[:, 1] < 0).any(), "fills should open both long and short positions"
+        assert event_path.shape == vector_path.shape
+        assert np.array_equal(event_path[:, :2], vector_path[:, :2])
+        assert np.array_equal(event_path[:, 2], vector_path[:, 2])
+        assert np.array_equal(result.positions[result.fill_index], event_path[:, 1])
+        assert abs(result.equity[-1] - event_sim.get_equity_curve_sample(TICKER, cursor.NBBO)) < 1e-6
+
+        print(f"{type(slippage_model).__name__}: {N_QUOTES:,} quotes, {len(result.fill_index):,} fills")
+        print(f"  event loop: {event_time:.3f}s")
+        print(f"  vectorized: {vector_time:.3f}s")
+        print(f"  speedup:    {event_time / vector_time:.1f}x")
@@ -6,8 +6,10 @@
 #
 
 
+from src import profiling
 from src.interface import DataInterface
 from src.results import Grapher
+from src.analytics import PerformanceTracker
 from src.marketsimulator import MarketSimulator, IdealFillSlippageModel, ZeroCostStructure
 
 from example_strategies.reversion import RangeBound
@@ -17,12 +19,16 @@ API_KEY = "YOUR_API_KEY"
 STOCK = "LLY"
 DATES = ["2025-07-14", "2025-07-15", "2025-07-16", "2025-07-17", "2025-07-18"]
 
+# Set to True to print where the run spends its time (pages, decoding, strategy, fills, plotting)
+PROFILE = False
+
 
 if __name__ == "__main__":
 
 
     DI = DataInterface(API_KEY, STOCK, DATES, use_NY_hours=False, start_hour=4, end_hour=23.98)
     Results = Grapher()
+    Metrics = PerformanceTracker()
 
     # Can write your own slippage model and cost structure based on the structure in marketsimulator.py
     MS = MarketSimulator(slippage_model=IdealFillSlippageModel(), cost_structure=ZeroCostStructure())
@@ -31,22 +37,39 @@ if __name__ == "__main__":
     Strategy = RangeBound(mean=780, deviation=13, max_allowed_position=100)
 
 
+    if PROFILE:
+        profiling.enable(sampler="sampling")
+
     sample = DI.next_sample()
 
     while sample:
 
         if sample.NBBO.get("bid", 0) == 0 or sample.NBBO.get("ask", 0) == 0:
+            sample = DI.next_sample()
             continue
 
-        order_qty, buy_side = Strategy.get_order(sample.NBBO, MS.positions.get(STOCK, 0))
+        fees_before = MS.total_fees
+        with profiling.timer("strategy"):
+            order_qty, buy_side = Strategy.get_order(sample.NBBO, MS.positions.get(STOCK, 0))
         if order_qty != 0:
             MS.fill_order(STOCK, sample.NBBO, order_qty, sample.temporal, buy_side)
 
-        Results.add_data(sample.temporal, (sample.NBBO.get("bid"), sample.NBBO.get("ask")), MS.positions.get(STOCK, 0), MS.get_equity_curve_sample(STOCK, sample.NBBO))
-        
+        # Marked once per tick and shared by the plot and the metrics
+        quote = (sample.NBBO.get("bid"), sample.NBBO.get("ask"))
+        position = MS.positions.get(STOCK, 0)
+        equity = MS.get_equity_curve_sample(STOCK, sample.NBBO)
+        Results.add_data(sample.temporal, quote, position, equity)
+        Metrics.add_data(sample.temporal, quote, position, equity, MS.total_fees - fees_before)
+
         sample = DI.next_sample()
 
 
+    if PROFILE:
+        print(profiling.disable().format_report())
+
     print(f"Final Unrealized PnL for {STOCK}: {MS.get_stock_unrealized_PnL(STOCK, DI.last_sample.NBBO)}")
     print(f"Final Realized PnL for {STOCK}: {MS.get_stock_Pnl(STOCK)}")
+    print(Metrics.summary())
+    for day in Metrics.daily():
+        print(day)
     Results.show_plot()
\ No newline at end of file
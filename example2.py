@@ -0,0 +1,30 @@
+### example2.py ###
+#
+# Sweeps RangeBound parameters for LLY across all CPU cores
+# Market data is downloaded once and shared with every run
+#
+
+
+from src.cache import TickCache
+from src.sweep import run_sweep
+
+from example_strategies.reversion import RangeBound
+
+
+API_KEY = "YOUR_API_KEY"
+STOCK = "LLY"
+DATES = ["2025-07-14", "2025-07-15", "2025-07-16", "2025-07-17", "2025-07-18"]
+
+GRID = {
+    "mean": [770, 775, 780, 785],
+    "deviation": [5, 9, 13],
+    "max_allowed_position": [100]
+}
+
+
+if __name__ == "__main__":
+
+    results = run_sweep(RangeBound, GRID, API_KEY, STOCK, DATES, cache=TickCache(".tick_cache"), use_NY_hours=False, start_hour=4, end_hour=23.98)
+
+    for row in sorted(results, key=lambda r: r["total_PnL"], reverse=True):
+        print(f"mean={row['mean']} deviation={row['deviation']} realized={row['realized_PnL']:.2f} unrealized={row['unrealized_PnL']:.2f} total={row['total_PnL']:.2f}")
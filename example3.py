@@ -0,0 +1,49 @@
+### example3.py ###
+#
+# Runs the RangeBound strategy for LLY with resting limit orders instead of instant fills
+# Orders join the NBBO after a 1 ms latency and only fill once later trades and quotes reach them
+#
+
+
+from src.interface import DataInterface
+from src.marketsimulator import MarketSimulator
+from src.matching import MatchingEngine
+
+from example_strategies.reversion import RangeBound
+
+
+API_KEY = "YOUR_API_KEY"
+STOCK = "LLY"
+DATES = ["2025-07-14", "2025-07-15"]
+
+
+if __name__ == "__main__":
+
+
+    DI = DataInterface(API_KEY, STOCK, DATES, use_NY_hours=True)
+    MS = MarketSimulator()
+    Engine = MatchingEngine(MS, latency_ns=1_000_000)
+
+    Strategy = RangeBound(mean=780, deviation=13, max_allowed_position=100)
+
+
+    sample = DI.next_sample()
+
+    while sample:
+
+        Engine.on_sample(sample)
+
+        if sample.NBBO.get("bid", 0) != 0 and sample.NBBO.get("ask", 0) != 0 and Engine.open_order_count(STOCK) == 0:
+            order_qty, buy_side = Strategy.get_order(sample.NBBO, MS.positions.get(STOCK, 0))
+            if order_qty != 0:
+                # Post on our own side of the NBBO and wait to be filled
+                price = sample.NBBO.get("bid") if buy_side else sample.NBBO.get("ask")
+                Engine.submit(STOCK, order_qty, sample.temporal, buy_side, "limit", price)
+
+        sample = DI.next_sample()
+
+
+    print(f"Open orders left: {Engine.open_orders(STOCK)}")
+    print(f"Final position for {STOCK}: {MS.positions.get(STOCK, 0)}")
+    print(f"Final Realized PnL for {STOCK}: {MS.get_stock_Pnl(STOCK)}")
+    print(f"Final Unrealized PnL for {STOCK}: {MS.get_stock_unrealized_PnL(STOCK, DI.last_sample.NBBO)}")
@@ -0,0 +1,42 @@
+### example4.py ###
+#
+# Runs RangeBound on one minute bars instead of every quote
+# The strategy and simulator are unchanged, BarInterface only decides what a sample is,
+# so a regular session is 390 samples and bar fields (OHLC, VWAP, volume, time-weighted NBBO) are in sample.bar
+#
+
+
+from src.interface import DataInterface
+from src.bars import BarInterface
+from src.marketsimulator import MarketSimulator, IdealFillSlippageModel, ZeroCostStructure
+
+from example_strategies.reversion import RangeBound
+
+
+API_KEY = "YOUR_API_KEY"
+STOCK = "LLY"
+DATES = ["2025-07-14", "2025-07-15", "2025-07-16", "2025-07-17", "2025-07-18"]
+
+
+if __name__ == "__main__":
+
+
+    BI = BarInterface(DataInterface(API_KEY, STOCK, DATES), interval="1min")
+    MS = MarketSimulator(slippage_model=IdealFillSlippageModel(), cost_structure=ZeroCostStructure())
+    Strategy = RangeBound(mean=780, deviation=13, max_allowed_position=100)
+
+    sample = BI.next_sample()
+
+    while sample:
+
+        if sample.NBBO["bid"] != 0 and sample.NBBO["ask"] != 0:
+            order_qty, buy_side = Strategy.get_order(sample.NBBO, MS.positions.get(STOCK, 0))
+            if order_qty != 0:
+                MS.fill_order(STOCK, sample.NBBO, order_qty, sample.temporal, buy_side)
+
+        sample = BI.next_sample()
+
+
+    print(f"Bars of the last day: {len(BI.bars)}, last close {BI.bars.close[-1]}, last VWAP {BI.bars.vwap[-1]}")
+    print(f"Final Unrealized PnL for {STOCK}: {MS.get_stock_unrealized_PnL(STOCK, BI.last_sample.NBBO)}")
+    print(f"Final Realized PnL for {STOCK}: {MS.get_stock_Pnl(STOCK)}")
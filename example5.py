@@ -0,0 +1,37 @@
+### example5.py ###
+#
+# Walk-forward evaluation of RangeBound parameters for LLY
+# Picks the best parameters on each 3 day train window and trades them on the next day
+# Day results are memoized by the WalkForward, so the second run with other window lengths
+# simulates nothing, the ticks themselves are kept in .tick_cache for later runs of the script
+#
+
+
+from src.cache import TickCache
+from src.walkforward import WalkForward
+
+from example_strategies.reversion import RangeBound
+
+
+API_KEY = "YOUR_API_KEY"
+STOCK = "LLY"
+DATES = ["2025-07-14", "2025-07-15", "2025-07-16", "2025-07-17", "2025-07-18", "2025-07-21", "2025-07-22", "2025-07-23"]
+
+GRID = {
+    "mean": [770, 775, 780, 785],
+    "deviation": [5, 9, 13],
+    "max_allowed_position": [100]
+}
+
+
+if __name__ == "__main__":
+
+    with WalkForward(RangeBound, API_KEY, STOCK, DATES, cache=TickCache(".tick_cache"), use_NY_hours=False, start_hour=4, end_hour=23.98) as wf:
+
+        for train_days in (3, 5):
+            report = wf.run(GRID, train_days=train_days, test_days=1)
+
+            print(f"train_days={train_days}")
+            for window in report["windows"]:
+                print(f"  test {window['test'][0]} params={window['params']} in sample={window['in_sample']['total_pnl']:.2f} out of sample={window['out_of_sample']['total_pnl']:.2f}")
+            print(f"  in sample mean daily PnL {report['in_sample']['mean_daily_pnl']:.2f}, out of sample {report['out_of_sample']['mean_daily_pnl']:.2f}, efficiency {report['efficiency']:.2f}")
@@ -0,0 +1,45 @@
+### example6.py ###
+#
+# Replays LLY through the asyncio event bus like a paper trading session
+# The strategy, the portfolio marking and the plot are separate consumers with their own queues,
+# the replay runs 60x faster than real time with overnight gaps cut to one second
+# Prints per consumer lag and end-to-end decision latency per tick at the end
+#
+
+
+import asyncio
+
+from src.interface import DataInterface
+from src.results import Grapher
+from src.eventbus import EventBus, strategy_handler, simulator_handler, grapher_handler
+from src.marketsimulator import MarketSimulator, IdealFillSlippageModel, ZeroCostStructure
+
+from example_strategies.reversion import RangeBound
+
+
+API_KEY = "YOUR_API_KEY"
+STOCK = "LLY"
+DATES = ["2025-07-14", "2025-07-15"]
+
+# 1.0 for real time, None for as fast as possible
+SPEED = 60
+
+
+if __name__ == "__main__":
+
+    DI = DataInterface(API_KEY, STOCK, DATES)
+    MS = MarketSimulator(slippage_model=IdealFillSlippageModel(), cost_structure=ZeroCostStructure())
+    Results = Grapher()
+
+    bus = EventBus(maxsize=1024)
+    bus.subscribe("strategy", strategy_handler(RangeBound(mean=780, deviation=13, max_allowed_position=100), MS, STOCK))
+    bus.subscribe("portfolio", simulator_handler(MS))
+    bus.subscribe("grapher", grapher_handler(Results, MS, STOCK))
+
+    metrics = asyncio.run(bus.run(DI, speed=SPEED, max_gap=1))
+
+    for name, consumer in metrics.items():
+        print(f"{name}: {consumer['processed']} ticks, lag p99 {consumer['lag']['p99_us']:.1f} us, latency p50 {consumer['latency']['p50_us']:.1f} us p99 {consumer['latency']['p99_us']:.1f} us, max queue {consumer['max_depth']}")
+
+    print(f"Final Realized PnL for {STOCK}: {MS.get_stock_Pnl(STOCK)}")
+    Results.show_plot()
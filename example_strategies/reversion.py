@@ -1,3 +1,5 @@
+import numpy as np
+
 class RangeBound:
 
     """
@@ -32,4 +34,22 @@ class RangeBound:
         elif midpoint < self.mean - self.deviation:
             order_qty = abs(current_position - self.max_allowed_position)
 
-        return order_qty, buy_side
\ No newline at end of file
+        return order_qty, buy_side
+
+    def get_target_positions(self, bids, asks, bid_sizes, ask_sizes):
+
+        """
+        Array version of get_order for the vectorized engine.
+        Returns the position held after each quote, NaN where no order is placed.
+        Matches get_order as long as the position stays within max_allowed_position.
+        bids/asks/bid_sizes/ask_sizes: (np.ndarray) one entry per quote
+        """
+
+        midpoint = (bids + asks) / 2
+
+        targets = np.full(len(midpoint), np.nan)
+        targets[midpoint > self.mean + self.deviation] = -self.max_allowed_position
+        targets[midpoint < self.mean - self.deviation] = self.max_allowed_position
+
+        return targets
+
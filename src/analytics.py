@@ -0,0 +1,230 @@
+import math
+import pytz
+from datetime import datetime, timedelta
+
+NS_PER_SECOND = 1_000_000_000
+
+class RunningStats:
+
+    """
+    Welford's online mean and variance
+    """
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def sharpe(self, periods_per_year):
+
+        """
+        Annualized mean over standard deviation, 0.0 when undefined
+        """
+
+        std = self.std()
+        return self.mean / std * math.sqrt(periods_per_year) if std > 0 else 0.0
+
+class PerformanceTracker:
+
+    """
+    Incremental performance metrics fed from the same per tick hook as Grapher
+    Uses online algorithms so memory stays constant no matter how long the run is,
+    apart from one small rollup per trading day
+    Call add_data(timestamp, NBBO, position, pnl) every tick, then summary() and daily()
+    Sharpe ratios are computed on PnL changes in currency, not on returns of a capital base
+    """
+
+    def __init__(self, interval_seconds=60, periods_per_year=252 * 390, time_zone="US/Eastern"):
+
+        """
+        interval_seconds: (float) sampling interval for the intraday Sharpe ratio
+        periods_per_year: (float) number of such intervals in a year, default is 1 minute bars over regular hours
+        time_zone: (str) time zone used to decide which trading day a tick belongs to
+        """
+
+        self.interval = int(interval_seconds * NS_PER_SECOND)
+        self.periods_per_year = periods_per_year
+        self.tz = pytz.timezone(time_zone)
+
+        self.ticks = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.last_pnl = 0.0
+        self.last_position = 0
+
+        self.peak_pnl = 0.0
+        self.max_drawdown = 0.0
+
+        self.interval_stats = RunningStats()
+        self.interval_end = None
+        self.interval_start_pnl = 0.0
+
+        self.trades = 0
+        self.shares_traded = 0.0
+        self.notional_traded = 0.0
+        self.fees = 0.0
+
+        self.holding_start = None
+        self.holdings = 0
+        self.holding_time = 0
+        self.max_holding_time = 0
+        self.time_in_market = 0
+
+        self.days = []
+        self.day_end = None
+
+    def add_data(self, timestamp, NBBO, position, pnl, fees=0.0):
+
+        """
+        timestamp: (int) Unix nanosecond timestamp
+        NBBO: (tuple) (bid, ask) as passed to Grapher.add_data
+        position: (int) position after this tick
+        pnl: (float) realized + unrealized PnL after this tick
+        fees: (float) commissions paid on this tick, optional
+        """
+
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+            self.interval_end = timestamp + self.interval
+            self.interval_start_pnl = pnl
+            self.peak_pnl = pnl
+
+        if self.day_end is None or timestamp >= self.day_end:
+            self._start_day(timestamp)
+        day = self.days[-1]
+
+        # Intraday Sharpe is sampled on a fixed clock, gaps with no ticks count as flat intervals
+        while timestamp >= self.interval_end:
+            self.interval_stats.add(self.last_pnl - self.interval_start_pnl)
+            self.interval_start_pnl = self.last_pnl
+            self.interval_end += self.interval
+            if timestamp - self.interval_end > 100 * self.interval:
+                # Overnight or weekend gap, skip ahead instead of adding thousands of empty intervals
+                self.interval_end = timestamp + self.interval
+
+        if self.peak_pnl < pnl:
+            self.peak_pnl = pnl
+        drawdown = self.peak_pnl - pnl
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+
+        if day["peak_pnl"] < pnl:
+            day["peak_pnl"] = pnl
+        day_drawdown = day["peak_pnl"] - pnl
+        if day_drawdown > day["max_drawdown"]:
+            day["max_drawdown"] = day_drawdown
+
+        change = position - self.last_position
+        if change:
+            shares = abs(change)
+            notional = shares * (NBBO[0] + NBBO[1]) / 2
+            self.trades += 1
+            self.shares_traded += shares
+            self.notional_traded += notional
+            day["trades"] += 1
+            day["shares_traded"] += shares
+            day["notional_traded"] += notional
+            self._update_holding(timestamp, position)
+
+        if fees:
+            self.fees += fees
+            day["fees"] += fees
+
+        if self.last_position and self.last_timestamp is not None:
+            self.time_in_market += timestamp - self.last_timestamp
+
+        day["ticks"] += 1
+        day["end_pnl"] = pnl
+
+        self.ticks += 1
+        self.last_timestamp = timestamp
+        self.last_pnl = pnl
+        self.last_position = position
+
+    def _start_day(self, timestamp):
+
+        local = datetime.fromtimestamp(timestamp / NS_PER_SECOND, self.tz)
+        midnight = self.tz.localize(datetime(local.year, local.month, local.day) + timedelta(days=1))
+        self.day_end = int(midnight.timestamp()) * NS_PER_SECOND
+
+        self.days.append({
+            "date": local.strftime("%Y-%m-%d"),
+            "ticks": 0,
+            "start_pnl": self.last_pnl,
+            "end_pnl": self.last_pnl,
+            "peak_pnl": self.last_pnl,
+            "max_drawdown": 0.0,
+            "trades": 0,
+            "shares_traded": 0.0,
+            "notional_traded": 0.0,
+            "fees": 0.0
+        })
+
+    def _update_holding(self, timestamp, position):
+
+        # A holding period runs from leaving flat until returning to flat or flipping sides
+        previous = self.last_position
+        if previous and (position == 0 or (position > 0) != (previous > 0)):
+            held = timestamp - self.holding_start
+            self.holdings += 1
+            self.holding_time += held
+            self.max_holding_time = max(self.max_holding_time, held)
+            self.holding_start = None
+        if position and self.holding_start is None:
+            self.holding_start = timestamp
+
+    def daily(self):
+
+        """
+        Returns one dict per trading day with that day's PnL, drawdown, trades and turnover
+        """
+
+        out = []
+        for day in self.days:
+            row = dict(day)
+            row["pnl"] = day["end_pnl"] - day["start_pnl"]
+            del row["peak_pnl"]
+            out.append(row)
+        return out
+
+    def summary(self):
+
+        """
+        Returns a dict of run level metrics
+        """
+
+        daily_stats = RunningStats()
+        for day in self.days:
+            daily_stats.add(day["end_pnl"] - day["start_pnl"])
+
+        duration = (self.last_timestamp - self.first_timestamp) if self.ticks else 0
+
+        return {
+            "ticks": self.ticks,
+            "days": len(self.days),
+            "pnl": self.last_pnl,
+            "max_drawdown": self.max_drawdown,
+            "sharpe_intraday": self.interval_stats.sharpe(self.periods_per_year),
+            "sharpe_daily": daily_stats.sharpe(252),
+            "trades": self.trades,
+            "shares_traded": self.shares_traded,
+            "notional_traded": self.notional_traded,
+            "fees": self.fees,
+            "round_trips": self.holdings,
+            "avg_holding_seconds": self.holding_time / self.holdings / NS_PER_SECOND if self.holdings else 0.0,
+            "max_holding_seconds": self.max_holding_time / NS_PER_SECOND,
+            "time_in_market": self.time_in_market / duration if duration else 0.0,
+            "final_position": self.last_position
+        }
@@ -0,0 +1,304 @@
+import re
+import numpy as np
+
+from src.interface import SampleCursor, RowView, CLOCKS, order_events, take_events
+
+NS_PER_SECOND = 1_000_000_000
+
+_UNITS = {"ns": 1, "us": 1_000, "ms": 1_000_000, "s": NS_PER_SECOND, "sec": NS_PER_SECOND, "m": 60 * NS_PER_SECOND, "min": 60 * NS_PER_SECOND, "h": 3600 * NS_PER_SECOND}
+
+BAR_COLUMNS = (
+    "start_times", "end_times",
+    "open", "high", "low", "close", "volume", "vwap", "trade_count",
+    "bid", "ask", "bid_size", "ask_size",
+    "twap_bid", "twap_ask", "twap_spread", "quote_count"
+)
+
+def parse_interval(interval):
+
+    """
+    Returns an interval in nanoseconds
+    interval: (float or str) seconds, or a string like "500ms", "1s", "5min", "1h"
+    """
+
+    if isinstance(interval, str):
+        match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-z]+)\s*", interval.lower())
+        if match is None or match.group(2) not in _UNITS:
+            raise ValueError(f"Cannot parse interval {interval!r}, expected e.g. '1s', '5min' or '1h'")
+        ns = float(match.group(1)) * _UNITS[match.group(2)]
+    else:
+        ns = float(interval) * NS_PER_SECOND
+
+    if ns < 1:
+        raise ValueError("interval must be at least 1 ns")
+    return int(ns)
+
+class BarData:
+
+    """
+    Columnar numpy arrays for one day of bars, one row per interval of the session window
+    Bars without trades have NaN prices and zero volume, NBBO columns are as of the bar end
+    """
+
+    __slots__ = ("date", "interval") + BAR_COLUMNS
+
+    def __init__(self, date, interval, **columns):
+
+        self.date = date
+        self.interval = interval
+        for name in BAR_COLUMNS:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.end_times)
+
+def _time_weighted(timestamps, values, edges):
+
+    """
+    Time-weighted mean of a step function over each [edges[i], edges[i + 1]) interval
+    The step function holds values[k] from timestamps[k] until the next timestamp,
+    time before the first timestamp is left out of the average (NaN if a bar has none)
+    """
+
+    if len(timestamps) == 0:
+        return np.full(len(edges) - 1, np.nan)
+
+    # Integral of the step function at every quote time, relative to the first quote
+    origin = timestamps[0]
+    t = (timestamps - origin).astype(np.float64)
+    integral = np.concatenate(([0.0], np.cumsum(values[:-1] * np.diff(t))))
+
+    e = (edges - origin).astype(np.float64)
+    k = np.searchsorted(timestamps, edges, side="right") - 1
+    before = k < 0
+    k = np.maximum(k, 0)
+    at_edges = integral[k] + values[k] * (e - t[k])
+    at_edges[before] = 0.0
+    covered = np.maximum(e, 0.0)
+
+    duration = np.diff(covered)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(duration > 0, np.diff(at_edges) / duration, np.nan)
+
+def build_bars(date, trades, quotes, window, interval, clock="participant"):
+
+    """
+    Resamples one day of raw trades and quotes into bars in a single vectorized pass
+    trades/quotes: (dict) columns as described by datastream.TRADE_COLUMNS and QUOTE_COLUMNS
+    window: (tuple) start and end Unix nanosecond timestamps, bars tile [start, end)
+    interval: (int) bar length in nanoseconds, see parse_interval
+    clock: (str) "participant" or "sip", see interface.build_day
+    Every trade and quote is kept, trades sharing a timestamp all count towards the volume
+    Returns a BarData
+    """
+
+    start, end = window
+    n = max(int(-(-(end - start) // interval)), 0)
+    edges = np.minimum(start + interval * np.arange(n + 1, dtype=np.int64), end)
+
+    key = CLOCKS[clock]
+
+    trade_order, _ = order_events(trades[key], "keep")
+    trade_times = take_events(trades[key], trade_order, None)
+    prices = take_events(trades["price"], trade_order, None).astype(np.float64, copy=False)
+    sizes = take_events(trades["size"], trade_order, None).astype(np.float64, copy=False)
+
+    quote_order, _ = order_events(quotes[key], "keep")
+    quote_times = take_events(quotes[key], quote_order, None)
+    bids = take_events(quotes["bid_price"], quote_order, None).astype(np.float64, copy=False)
+    asks = take_events(quotes["ask_price"], quote_order, None).astype(np.float64, copy=False)
+    bid_sizes = take_events(quotes["bid_size"], quote_order, None).astype(np.float64, copy=False)
+    ask_sizes = take_events(quotes["ask_size"], quote_order, None).astype(np.float64, copy=False)
+
+    # Trades are sorted so every bar is a contiguous slice [first, last)
+    bounds = np.searchsorted(trade_times, edges, side="left")
+    first, last = bounds[:-1], bounds[1:]
+    trade_count = last - first
+    has_trades = trade_count > 0
+    starts = first[has_trades]
+
+    open_ = np.full(n, np.nan)
+    high = np.full(n, np.nan)
+    low = np.full(n, np.nan)
+    close = np.full(n, np.nan)
+    volume = np.zeros(n)
+    vwap = np.full(n, np.nan)
+
+    if len(starts):
+        open_[has_trades] = prices[starts]
+        close[has_trades] = prices[last[has_trades] - 1]
+        # reduceat runs each segment up to the next start, so only bars with trades are passed
+        # and the arrays are cut at the end of the last bar
+        stop = last[has_trades][-1]
+        high[has_trades] = np.maximum.reduceat(prices[:stop], starts)
+        low[has_trades] = np.minimum.reduceat(prices[:stop], starts)
+        volume[has_trades] = np.add.reduceat(sizes[:stop], starts)
+        notional = np.add.reduceat((prices * sizes)[:stop], starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vwap[has_trades] = np.where(volume[has_trades] > 0, notional / volume[has_trades], np.nan)
+
+    # NBBO as of each bar end (last quote strictly before the next bar starts)
+    quote_bounds = np.searchsorted(quote_times, edges, side="left")
+    quote_count = np.diff(quote_bounds)
+    at_close = quote_bounds[1:] - 1
+    no_quote = at_close < 0
+    at_close = np.maximum(at_close, 0)
+
+    def snapshot(values):
+        if len(values) == 0:
+            return np.zeros(n)
+        out = values[at_close]
+        out[no_quote] = 0
+        return out
+
+    twap_bid = _time_weighted(quote_times, bids, edges)
+    twap_ask = _time_weighted(quote_times, asks, edges)
+
+    return BarData(
+        date, interval,
+        start_times=edges[:-1],
+        end_times=edges[1:],
+        open=open_,
+        high=high,
+        low=low,
+        close=close,
+        volume=volume,
+        vwap=vwap,
+        trade_count=trade_count,
+        bid=snapshot(bids),
+        ask=snapshot(asks),
+        bid_size=snapshot(bid_sizes),
+        ask_size=snapshot(ask_sizes),
+        twap_bid=twap_bid,
+        twap_ask=twap_ask,
+        twap_spread=twap_ask - twap_bid,
+        quote_count=quote_count
+    )
+
+class BarCursor(SampleCursor):
+
+    """
+    SampleCursor over bars
+    NBBO is the quote at the bar end, last_trade holds the bar close and volume,
+    bar exposes every BAR_COLUMNS value of the current bar, temporal is the bar end
+    """
+
+    __slots__ = ("bar",)
+
+    def __init__(self, symbol=None):
+
+        super().__init__(symbol)
+        self.bar = RowView(self, {})
+
+    def bind_bars(self, columns):
+
+        """
+        columns: (dict) BAR_COLUMNS name -> list
+        """
+
+        self.bind(columns["end_times"], columns["bid"], columns["ask"], columns["bid_size"], columns["ask_size"], columns["close"], columns["volume"])
+        self.bar._columns = columns
+
+class BarInterface:
+
+    """
+    Serves bars instead of quotes with the same next_sample loop as DataInterface
+    A minute-bar backtest then runs get_order and fill_order 390 times per regular session
+    Days come from the wrapped DataInterface (cache, source, hours and dates included),
+    each day is resampled in one vectorized pass by build_bars
+    Strategies written against MarketSample keep working, bar fields are in sample.bar
+    """
+
+    def __init__(self, DI, interval="1min", skip_empty=False):
+
+        """
+        DI: (DataInterface) provides the dates, hours and raw data, streaming mode is not supported
+        interval: (float or str) bar length, see parse_interval
+        skip_empty: (bool) leave out bars with no trades
+        """
+
+        if DI.streaming:
+            raise ValueError("BarInterface needs whole days, use a DataInterface with streaming=False")
+
+        self.DI = DI
+        self.interval = parse_interval(interval)
+        self.skip_empty = skip_empty
+        self.ticker = DI.ticker
+        self.dates = DI.dates
+
+        self.current_date_index = 0
+        self.current_data_index = 0
+        self.need_new_data = True
+        self.bars = None
+        self.last_sample = None
+
+        self._length = 0
+        self._cursor = BarCursor(DI.ticker)
+
+    def next_sample(self, limit=50000, max_iter=10000):
+
+        """
+        Returns the next bar as a sample, None once every date is done
+        """
+
+        while self.need_new_data:
+            if self.current_date_index >= len(self.dates):
+                return None
+
+            bars = self.load_bars(self.dates[self.current_date_index], limit, max_iter)
+            self.current_date_index += 1
+            if len(bars) == 0:
+                # Not installed so last_sample still reads the previous day's bars
+                continue
+
+            self._install_bars(bars)
+            self.current_data_index = 0
+            self.need_new_data = False
+
+        # Same cursor every call, copy() it to keep a bar's NBBO and trade fields
+        sample = self._cursor
+        sample.index = self.current_data_index
+
+        self.current_data_index += 1
+        if self.current_data_index >= self._length:
+            self.need_new_data = True
+
+        self.last_sample = sample
+        return sample
+
+    def load_bars(self, date, limit=50000, max_iter=10000):
+
+        """
+        Returns the BarData for one date without moving the iteration
+        """
+
+        DI = self.DI
+        window = DI._time_window(date)
+        source = DI.source
+
+        if source is None:
+            trades, quotes = DI._tables_for_day(date, limit, max_iter)
+        elif hasattr(source, "load_tables"):
+            trades, quotes = source.load_tables(DI.ticker, date, window)
+        else:
+            # Sources that only hold quote-aligned days lose trades between quotes, bars are approximate
+            day = source.load_day(DI.ticker, date, window, limit, max_iter)
+            new_trade = np.flatnonzero(np.diff(day.trade_timestamps, prepend=0) != 0)
+            key = CLOCKS[DI.clock]
+            trades = {key: day.trade_timestamps[new_trade], "price": day.prices[new_trade], "size": day.sizes[new_trade]}
+            quotes = {key: day.timestamps, "bid_price": day.bids, "ask_price": day.asks, "bid_size": day.bid_sizes, "ask_size": day.ask_sizes}
+
+        bars = build_bars(date, trades, quotes, window, self.interval, DI.clock)
+
+        if self.skip_empty:
+            keep = bars.trade_count > 0
+            bars = BarData(date, bars.interval, **{name: getattr(bars, name)[keep] for name in BAR_COLUMNS})
+
+        return bars
+
+    def _install_bars(self, bars):
+
+        # Lists once per day so per bar reads are plain indexing, like DataInterface._install_day
+        self.bars = bars
+        self._length = len(bars)
+        self._cursor.bind_bars({name: getattr(bars, name).tolist() for name in BAR_COLUMNS})
@@ -0,0 +1,177 @@
+import os
+import json
+import shutil
+import threading
+import numpy as np
+
+from src import profiling
+
+class TickCache:
+
+    """
+    Persistent on-disk store of raw trade and quote columns
+    Keyed by (feed, ticker, date, time window), one .npy file per column
+    Columns are loaded memory-mapped so re-runs read at disk speed
+    """
+
+    def __init__(self, root, feed="polygon"):
+
+        """
+        root: (str) directory holding the cache, created if missing
+        feed: (str) name of the data feed the cached ticks came from
+        """
+
+        self.root = root
+        self.feed = feed
+
+        os.makedirs(root, exist_ok=True)
+
+    def _entry_dir(self, ticker, date, window):
+        start, end = window
+        return os.path.join(self.root, self.feed, ticker, date, f"{start}-{end}")
+
+    def contains(self, ticker, date, window):
+
+        """
+        True if the (ticker, date, window) entry has been fully written
+        window: (tuple) start and end Unix nanosecond timestamps
+        """
+
+        return os.path.exists(os.path.join(self._entry_dir(ticker, date, window), "meta.json"))
+
+    def get(self, ticker, date, window):
+
+        """
+        Returns (trades, quotes) as dicts of memory-mapped numpy arrays
+        Returns None on a cache miss
+        """
+
+        path = self._entry_dir(ticker, date, window)
+        meta_path = os.path.join(path, "meta.json")
+        profiler = profiling.active
+        if not os.path.exists(meta_path):
+            if profiler is not None:
+                profiler.count("cache.misses")
+            return None
+        if profiler is not None:
+            profiler.count("cache.hits")
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        tables = []
+        for table in ("trades", "quotes"):
+            columns = {}
+            for name in meta[table]["columns"]:
+                file_path = os.path.join(path, f"{table}.{name}.npy")
+                # np.load refuses to memory-map zero length files on some platforms
+                if meta[table]["rows"] == 0:
+                    columns[name] = np.load(file_path)
+                else:
+                    columns[name] = np.load(file_path, mmap_mode="r")
+            tables.append(columns)
+
+        return tables[0], tables[1]
+
+    def put(self, ticker, date, window, trades, quotes):
+
+        """
+        Writes the trade and quote columns for one entry
+        trades/quotes: (dict) column name -> numpy array
+        The entry is written to a temporary directory and renamed into place,
+        so a crash mid-write never leaves a half written entry behind
+        """
+
+        path = self._entry_dir(ticker, date, window)
+        tmp_path = path + f".tmp{os.getpid()}-{threading.get_ident()}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        meta = {"feed": self.feed, "ticker": ticker, "date": date, "window": list(window)}
+        for table, columns in (("trades", trades), ("quotes", quotes)):
+            rows = 0
+            for name, values in columns.items():
+                values = np.ascontiguousarray(values)
+                np.save(os.path.join(tmp_path, f"{table}.{name}.npy"), values)
+                rows = len(values)
+            meta[table] = {"columns": list(columns.keys()), "rows": rows}
+
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    def remove(self, ticker, date, window):
+
+        """
+        Deletes a single entry if present
+        """
+
+        path = self._entry_dir(ticker, date, window)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+
+    def clear(self):
+
+        """
+        Deletes every entry for this feed
+        """
+
+        path = os.path.join(self.root, self.feed)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+
+    def entries(self):
+
+        """
+        Returns a list of dicts describing every cached entry
+        Each dict has ticker, date, window, trade_rows, quote_rows and bytes
+        """
+
+        out = []
+        feed_dir = os.path.join(self.root, self.feed)
+        if not os.path.isdir(feed_dir):
+            return out
+
+        for ticker in sorted(os.listdir(feed_dir)):
+            for date in sorted(os.listdir(os.path.join(feed_dir, ticker))):
+                date_dir = os.path.join(feed_dir, ticker, date)
+                for window in sorted(os.listdir(date_dir)):
+                    if ".tmp" in window:
+                        continue
+                    entry_dir = os.path.join(date_dir, window)
+                    meta_path = os.path.join(entry_dir, "meta.json")
+                    if not os.path.exists(meta_path):
+                        continue
+                    with open(meta_path) as f:
+                        meta = json.load(f)
+                    size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+                    out.append({
+                        "ticker": ticker,
+                        "date": date,
+                        "window": tuple(meta["window"]),
+                        "trade_rows": meta["trades"]["rows"],
+                        "quote_rows": meta["quotes"]["rows"],
+                        "bytes": size
+                    })
+
+        return out
+
+    def info(self):
+
+        """
+        Returns summary totals over every cached entry
+        """
+
+        entries = self.entries()
+        return {
+            "root": self.root,
+            "feed": self.feed,
+            "entries": len(entries),
+            "trade_rows": sum(e["trade_rows"] for e in entries),
+            "quote_rows": sum(e["quote_rows"] for e in entries),
+            "bytes": sum(e["bytes"] for e in entries)
+        }
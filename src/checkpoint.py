@@ -0,0 +1,133 @@
+import os
+import json
+import time
+
+CHECKPOINT_VERSION = 1
+
+def _to_json(value):
+
+    # numpy scalars (e.g. sizes from the day columns) are stored as plain numbers
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Cannot store {type(value).__name__} in a checkpoint")
+
+class Checkpointer:
+
+    """
+    Saves DataInterface and MarketSimulator state so a long backtest can resume where it stopped
+    Call step(DI, MS) once per sample after handling it, a checkpoint is written at every day
+    boundary and/or every every_ticks samples, each one replacing the last with an atomic rename
+    Works with a DataInterface in either mode, MultiDataInterface state is not covered
+    On restart call restore(DI, MS) before the loop, next_sample then continues with the
+    next unprocessed sample without going through the earlier days again
+    extra is any JSON serializable state of your own (strategy, counters) saved alongside
+    Usage:
+        checkpointer = Checkpointer("run.ckpt.json", every_ticks=100000)
+        extra = checkpointer.restore(DI, MS)
+        sample = DI.next_sample()
+        while sample:
+            ...
+            checkpointer.step(DI, MS)
+            sample = DI.next_sample()
+        checkpointer.clear()
+    """
+
+    def __init__(self, path, every_ticks=None, on_day_boundary=True):
+
+        """
+        path: (str) checkpoint file
+        every_ticks: (int) also save every this many samples, None for day boundaries only
+        on_day_boundary: (bool) save after the last sample of every day
+        """
+
+        self.path = path
+        self.every_ticks = every_ticks
+        self.on_day_boundary = on_day_boundary
+        self.ticks = 0
+        self.saves = 0
+        self._date_index = None
+
+    def step(self, DI, MS, extra=None):
+
+        """
+        Counts one handled sample and saves if a checkpoint is due
+        extra: (object or callable) state of your own, a callable is only called when saving
+        Returns True when a checkpoint was written
+        """
+
+        self.ticks += 1
+        due = self.every_ticks is not None and self.ticks % self.every_ticks == 0
+        if self.on_day_boundary:
+            if DI.streaming:
+                # A stream only finds out a day ended when the next one starts, so save after
+                # the first sample of each new day, resuming then streams that day again up to it
+                due = due or (self._date_index is not None and DI.current_date_index != self._date_index)
+                self._date_index = DI.current_date_index
+            else:
+                due = due or DI.need_new_data
+        if due:
+            self.save(DI, MS, extra() if callable(extra) else extra)
+        return due
+
+    def save(self, DI, MS, extra=None):
+
+        """
+        Writes a checkpoint now
+        """
+
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "saved_at": time.time(),
+            "ticks": self.ticks,
+            "interface": DI.get_state(),
+            "simulator": MS.get_state(),
+            "extra": extra
+        }
+
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(state, f, separators=(",", ":"), default=_to_json)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.saves += 1
+
+    def load(self):
+
+        """
+        Returns the saved state dict, or None when there is no checkpoint
+        """
+
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {state.get('version')} in {self.path}")
+        return state
+
+    def restore(self, DI, MS, limit=50000, max_iter=10000):
+
+        """
+        Puts DI and MS back to the saved state if there is a checkpoint
+        Returns the saved extra, or None when starting fresh
+        """
+
+        state = self.load()
+        if state is None:
+            return None
+
+        MS.set_state(state["simulator"])
+        DI.set_state(state["interface"], limit, max_iter)
+        self.ticks = state["ticks"]
+        self._date_index = DI.current_date_index
+        return state["extra"]
+
+    def clear(self):
+
+        """
+        Removes the checkpoint, e.g. once the run has finished
+        """
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,7 +1,31 @@
 import pytz
-import requests
+import numpy as np
+from time import perf_counter
+from functools import lru_cache
 from datetime import datetime, time
 
+from src import profiling
+from src.transport import get_default_session
+
+POLYGON_BASE_URL = "https://api.polygon.io"
+
+TRADE_COLUMNS = {
+    "participant_timestamp": np.int64,
+    "sip_timestamp": np.int64,
+    "price": np.float64,
+    "size": np.float64
+}
+
+QUOTE_COLUMNS = {
+    "participant_timestamp": np.int64,
+    "sip_timestamp": np.int64,
+    "bid_price": np.float64,
+    "ask_price": np.float64,
+    "bid_size": np.float64,
+    "ask_size": np.float64
+}
+
+@lru_cache(maxsize=65536)
 def get_time_range(date_str, start_hour, end_hour, time_zone="US/Eastern"):
 
     """
@@ -9,6 +33,7 @@ def get_time_range(date_str, start_hour, end_hour, time_zone="US/Eastern"):
     Returns timestamps in nanoseconds for use with Polygon
     Hour parameters in fractions of an hour (24 hr format)
     Allowed time_zone
+    Results are memoized so the time zone localization runs once per date and hours
     """
 
     tz = pytz.timezone(time_zone)
@@ -35,6 +60,64 @@ def OC(date_str):
 
     return open_utc, close_utc
 
+def asof_join(to_increase, timestamps, timestamps_onto, fill="zero", initial=None):
+
+    """
+    Vectorized as-of join of any number of columns onto another clock
+    to_increase: (list) columns sharing the sorted timestamps
+    timestamps: (array) sorted timestamps of the columns in to_increase
+    timestamps_onto: (array) timestamps to align the columns onto
+    fill: how rows before the first timestamp are filled
+        "zero" -> 0, same as increase_sample_rate_most_recent
+        "nan" -> NaN
+        "ffill" -> carried forward from initial (e.g. the previous session's last trade), NaN without it
+        "drop" -> rows are removed and (columns, kept_index) is returned
+    Returns a list of numpy arrays, each row holding the most recent value at or before the onto timestamp
+    """
+
+    profiler = profiling.active
+    if profiler is not None:
+        start = perf_counter()
+
+    timestamps = np.asarray(timestamps)
+    timestamps_onto = np.asarray(timestamps_onto)
+
+    # One searchsorted for every column, the join index is shared
+    idx = np.searchsorted(timestamps, timestamps_onto, side="right") - 1
+    missing = idx < 0
+    has_missing = missing.any()
+    np.maximum(idx, 0, out=idx)
+
+    if fill == "drop":
+        kept = np.flatnonzero(~missing)
+        idx = idx[kept]
+
+    out = []
+    for i, column in enumerate(to_increase):
+        column = np.asarray(column)
+        if len(column) == 0:
+            column = np.zeros(1, dtype=column.dtype)
+        joined = column[idx]
+
+        if has_missing and fill != "drop":
+            if fill == "zero":
+                joined[missing] = 0
+            elif fill in ("nan", "ffill"):
+                joined = joined.astype(np.float64)
+                joined[missing] = np.nan if fill == "nan" or initial is None else initial[i]
+            else:
+                raise ValueError(f"Unknown fill: {fill}")
+
+        out.append(joined)
+
+    if profiler is not None:
+        profiler.add_time("asof_join", perf_counter() - start)
+
+    if fill == "drop":
+        return out, kept
+
+    return out
+
 def increase_sample_rate_most_recent(to_increase, timestamps, timestamps_onto):
 
     """
@@ -42,35 +125,31 @@ def increase_sample_rate_most_recent(to_increase, timestamps, timestamps_onto):
     timestamps represents timestamps of the lists in to_increase
     timestamps_onto represents the timestamps to increase the sample rate onto
     Returns same structure as to_increase but take most recent values and upsamples to match timestamps_onto
+    Kept for compatibility, see asof_join for the array version
     """
 
-    upsampled = [[] for _ in range(len(to_increase))]
-
-    basei = 0
-    for ts in timestamps_onto:
-        while basei + 1 < len(timestamps) and timestamps[basei + 1] <= ts:
-            basei += 1
+    return [column.tolist() for column in asof_join(to_increase, timestamps, timestamps_onto)]
 
-        for i in range(len(to_increase)):
-            if timestamps[basei] <= ts:
-                upsampled[i].append(to_increase[i][basei])
-            else:
-                upsampled[i].append(0)
-
-    return upsampled
-
-def get_polygon_trades_stream(ticker, date, api_key, limit=50000, max_iter=10000, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern"):
+def _get_polygon_pages(kind, ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window=None):
 
     """
-    Yields trades for a given ticker on a specific date and time frame from Polygon
-    Can also specify some limitations
+    Shared pager behind the trades and quotes streams
+    Yields the list of records of every page
+    kind: (str) "trades" or "quotes"
+    window: (tuple) start and end Unix nanosecond timestamps to request, overrides the hours when given
+    While a profiling.Profiler is active pages and rows are counted under "http.pages" and "http.rows"
     """
 
-    if use_NY_hours:
+    if session is None:
+        session = get_default_session()
+
+    if window is not None:
+        O, C = window
+    elif use_NY_hours:
         O, C = OC(date)
     else:
         O, C = get_time_range(date, start_hour, end_hour, time_zone)
-    next_url =f"https://api.polygon.io/v3/trades/{ticker}?timestamp.gte={O}&timestamp.lte={C}&order=asc&limit={limit}&sort=timestamp"
+    next_url = f"{base_url}/v3/{kind}/{ticker}?timestamp.gte={O}&timestamp.lte={C}&order=asc&limit={limit}&sort=timestamp"
     api_append = f"&apiKey={api_key}"
 
     iter = 1
@@ -81,52 +160,161 @@ def get_polygon_trades_stream(ticker, date, api_key, limit=50000, max_iter=10000
 
         next_url += api_append
 
-        response = requests.get(next_url)
-        if response.status_code != 200:
-            raise Exception(f"API error: {response.status_code} - {response.text}")
+        data = session.get_json(next_url)
+        records = data.get("results", [])
 
-        data = response.json()
-        trades = data.get("results", [])
+        profiler = profiling.active
+        if profiler is not None:
+            profiler.count("http.pages")
+            profiler.count("http.rows", len(records))
 
-        for trade in trades:
-            yield trade
+        yield records
 
         next_url = data.get("next_url")
-        print(iter * limit)
         iter += 1
 
-def get_polygon_quotes_stream(ticker, date, api_key, limit=50000, max_iter=10000, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern"):
+def _get_polygon_stream(kind, ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window=None):
+    for records in _get_polygon_pages(kind, ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window):
+        yield from records
+
+def get_polygon_trades_stream(ticker, date, api_key, limit=50000, max_iter=10000, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern", base_url=POLYGON_BASE_URL, session=None, window=None):
+
+    """
+    Yields trades for a given ticker on a specific date and time frame from Polygon
+    Can also specify some limitations
+    base_url can point at a local stand-in for the Polygon API
+    session: (transport.PolygonSession) shared transport, defaults to a process wide one
+    window: (tuple) start and end Unix nanosecond timestamps, e.g. a calendar session, instead of the hours
+    """
+
+    return _get_polygon_stream("trades", ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window)
+
+def get_polygon_quotes_stream(ticker, date, api_key, limit=50000, max_iter=10000, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern", base_url=POLYGON_BASE_URL, session=None, window=None):
 
     """
     Yields NBBO quotes for a given ticker on a specific date and time frame from Polygon
     Can also specify some limitations
+    base_url can point at a local stand-in for the Polygon API
+    session: (transport.PolygonSession) shared transport, defaults to a process wide one
+    window: (tuple) start and end Unix nanosecond timestamps, e.g. a calendar session, instead of the hours
     """
 
-    if use_NY_hours:
-        O, C = OC(date)
-    else:
-        O, C = get_time_range(date, start_hour, end_hour, time_zone)
-    next_url =f"https://api.polygon.io/v3/quotes/{ticker}?timestamp.gte={O}&timestamp.lte={C}&order=asc&limit={limit}&sort=timestamp"
-    api_append = f"&apiKey={api_key}"
+    return _get_polygon_stream("quotes", ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window)
 
-    iter = 1
-    while next_url:
+def get_polygon_trades_columns(ticker, date, api_key, limit=50000, max_iter=10000, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern", base_url=POLYGON_BASE_URL, session=None, window=None):
 
-        if iter > max_iter:
-            break
+    """
+    Yields one dict of typed numpy arrays (TRADE_COLUMNS) per page of trades
+    Only the fields the interface uses are kept and each page's dicts are dropped right after
+    window: (tuple) start and end Unix nanosecond timestamps, e.g. a calendar session, instead of the hours
+    """
 
-        next_url += api_append
+    for records in _get_polygon_pages("trades", ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window):
+        yield records_to_columns(records, TRADE_COLUMNS)
 
-        response = requests.get(next_url)
-        if response.status_code != 200:
-            raise Exception(f"API error: {response.status_code} - {response.text}")
+def get_polygon_quotes_columns(ticker, date, api_key, limit=50000, max_iter=10000, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern", base_url=POLYGON_BASE_URL, session=None, window=None):
 
-        data = response.json()
-        trades = data.get("results", [])
+    """
+    Yields one dict of typed numpy arrays (QUOTE_COLUMNS) per page of quotes
+    Only the fields the interface uses are kept and each page's dicts are dropped right after
+    window: (tuple) start and end Unix nanosecond timestamps, e.g. a calendar session, instead of the hours
+    """
 
-        for trade in trades:
-            yield trade
+    for records in _get_polygon_pages("quotes", ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window):
+        yield records_to_columns(records, QUOTE_COLUMNS)
 
-        next_url = data.get("next_url")
-        print(iter * limit)
-        iter += 1
\ No newline at end of file
+def get_polygon_trades_table(ticker, date, api_key, limit=50000, max_iter=10000, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern", base_url=POLYGON_BASE_URL, session=None, window=None):
+
+    """
+    Returns every trade of the date as one dict of TRADE_COLUMNS arrays, see read_columns
+    window: (tuple) start and end Unix nanosecond timestamps, e.g. a calendar session, instead of the hours
+    """
+
+    return read_columns(_get_polygon_pages("trades", ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window), TRADE_COLUMNS, limit)
+
+def get_polygon_quotes_table(ticker, date, api_key, limit=50000, max_iter=10000, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern", base_url=POLYGON_BASE_URL, session=None, window=None):
+
+    """
+    Returns every quote of the date as one dict of QUOTE_COLUMNS arrays, see read_columns
+    window: (tuple) start and end Unix nanosecond timestamps, e.g. a calendar session, instead of the hours
+    """
+
+    return read_columns(_get_polygon_pages("quotes", ticker, date, api_key, limit, max_iter, use_NY_hours, start_hour, end_hour, time_zone, base_url, session, window), QUOTE_COLUMNS, limit)
+
+def _field_values(records, name):
+
+    # participant_timestamp falls back to sip_timestamp when Polygon omits it
+    if name == "participant_timestamp":
+        return (record.get("participant_timestamp", record["sip_timestamp"]) for record in records)
+    return (record.get(name, 0) for record in records)
+
+def read_columns(pages, columns, capacity=0):
+
+    """
+    Writes pages of raw records straight into one preallocated array per column
+    pages: (iterable) lists of Polygon records, e.g. one per page as it is downloaded
+    columns: (dict) column name -> dtype, e.g. TRADE_COLUMNS or QUOTE_COLUMNS
+    capacity: (int) rows to preallocate, arrays double whenever a page does not fit
+    Only the needed fields are read from a page before its dicts are dropped, and there are
+    no per page arrays left to concatenate afterwards
+    Returns a dict of arrays holding exactly the rows read
+    """
+
+    profiler = profiling.active
+
+    size = capacity
+    rows = 0
+    out = {name: np.empty(size, dtype=dtype) for name, dtype in columns.items()}
+    for records in pages:
+        if profiler is not None:
+            start = perf_counter()
+
+        n = len(records)
+        if rows + n > size:
+            size = max(rows + n, 2 * size)
+            for name, values in out.items():
+                grown = np.empty(size, dtype=values.dtype)
+                grown[:rows] = values[:rows]
+                out[name] = grown
+
+        for name, dtype in columns.items():
+            out[name][rows:rows + n] = np.fromiter(_field_values(records, name), dtype=dtype, count=n)
+        rows += n
+
+        if profiler is not None:
+            profiler.add_time("decode.columns", perf_counter() - start)
+            profiler.count("rows", n)
+
+    # Spare capacity is given back so a cached or installed day holds only its rows
+    return {name: values[:rows].copy() if rows < size else values for name, values in out.items()}
+
+def records_to_columns(records, columns):
+
+    """
+    Converts raw Polygon records into a dict of typed numpy arrays
+    columns: (dict) column name -> dtype, e.g. TRADE_COLUMNS or QUOTE_COLUMNS
+    participant_timestamp falls back to sip_timestamp when Polygon omits it
+    """
+
+    profiler = profiling.active
+    if profiler is not None:
+        start = perf_counter()
+
+    n = len(records)
+    out = {}
+    for name, dtype in columns.items():
+        out[name] = np.fromiter(_field_values(records, name), dtype=dtype, count=n)
+
+    if profiler is not None:
+        profiler.add_time("decode.columns", perf_counter() - start)
+        profiler.count("rows", n)
+
+    return out
+
+def concat_columns(pages, columns):
+
+    """
+    Concatenates per page column dicts into one dict of arrays
+    """
+
+    return {name: np.concatenate([page[name] for page in pages]) if pages else np.zeros(0, dtype=dtype) for name, dtype in columns.items()}
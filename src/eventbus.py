@@ -0,0 +1,515 @@
+import json
+import asyncio
+import inspect
+from time import perf_counter_ns
+from collections import deque
+
+from src import profiling
+from src.interface import MarketSample
+from src.transport import orjson
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+NS_PER_SECOND = 1_000_000_000
+
+class LatencyStats:
+
+    """
+    Count, mean and max of nanosecond durations over the whole run,
+    percentiles over the most recent window values
+    """
+
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self, window=100000):
+
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.recent = deque(maxlen=window)
+
+    def add(self, ns):
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+        self.recent.append(ns)
+
+    def summary(self):
+
+        """
+        Returns count, mean, p50, p99 and max in microseconds
+        """
+
+        if not self.count:
+            return {"count": 0, "mean_us": 0.0, "p50_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000,
+            "p50_us": recent[len(recent) // 2] / 1000,
+            "p99_us": recent[min(len(recent) - 1, len(recent) * 99 // 100)] / 1000,
+            "max_us": self.max / 1000
+        }
+
+class Tick:
+
+    """
+    One sample on the bus
+    received is the perf_counter_ns time the tick entered the bus, every consumer latency starts there
+    """
+
+    __slots__ = ("seq", "sample", "received")
+
+    def __init__(self, seq, sample, received):
+
+        self.seq = seq
+        self.sample = sample
+        self.received = received
+
+class Consumer:
+
+    """
+    A subscriber with its own bounded queue and task
+    lag: time from the tick entering the bus to the handler starting (queueing behind slower work)
+    service: time spent in the handler
+    latency: end-to-end time from the tick entering the bus to the handler returning,
+        for a strategy consumer this is the decision latency per tick
+    """
+
+    def __init__(self, name, handler, maxsize):
+
+        self.name = name
+        self.handler = handler
+        self.is_async = inspect.iscoroutinefunction(handler)
+        self.queue = asyncio.Queue(maxsize)
+        self.lag = LatencyStats()
+        self.service = LatencyStats()
+        self.latency = LatencyStats()
+        self.max_depth = 0
+        self.errors = 0
+        self.task = None
+
+    async def run(self):
+
+        queue = self.queue
+        handler = self.handler
+        while True:
+            tick = await queue.get()
+            if tick is None:
+                return
+
+            start = perf_counter_ns()
+            try:
+                if self.is_async:
+                    await handler(tick)
+                else:
+                    handler(tick)
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                end = perf_counter_ns()
+                self.lag.add(start - tick.received)
+                self.service.add(end - start)
+                self.latency.add(end - tick.received)
+
+                profiler = profiling.active
+                if profiler is not None:
+                    profiler.add_time(f"bus.{self.name}", (end - start) / NS_PER_SECOND)
+
+    def metrics(self):
+        return {
+            "processed": self.service.count,
+            "backlog": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "errors": self.errors,
+            "lag": self.lag.summary(),
+            "service": self.service.summary(),
+            "latency": self.latency.summary()
+        }
+
+class Pacer:
+
+    """
+    Sleeps so samples are released at their market time divided by speed
+    speed: (float) 1.0 real time, 10.0 ten times faster, None as fast as possible
+    max_gap: (float) market seconds, longer gaps (overnight, halts) are cut down to this
+    """
+
+    def __init__(self, speed=None, max_gap=None):
+
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None")
+
+        self.speed = speed
+        self.max_gap = max_gap
+        self._origin = None
+        self._wall = None
+        self._previous = None
+
+    async def wait(self, timestamp):
+
+        if self.speed is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._origin is None:
+            self._origin = timestamp
+            self._wall = loop.time()
+        elif self.max_gap is not None and timestamp - self._previous > self.max_gap * NS_PER_SECOND:
+            # Skipped market time moves the origin so the schedule stays on the compressed clock
+            self._origin += timestamp - self._previous - int(self.max_gap * NS_PER_SECOND)
+        self._previous = timestamp
+
+        delay = self._wall + (timestamp - self._origin) / NS_PER_SECOND / self.speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class EventBus:
+
+    """
+    asyncio fan-out of market samples to any number of consumers
+    Every consumer has its own bounded queue, publish waits while any of them is full,
+    so a slow consumer slows the replay down (backpressure) instead of growing memory
+    Consumers run concurrently, each sees every tick in order
+    Usage:
+        bus = EventBus()
+        bus.subscribe("strategy", strategy_handler(Strategy, MS, STOCK))
+        bus.subscribe("grapher", grapher_handler(Results, MS, STOCK))
+        metrics = asyncio.run(bus.run(DataInterface(...), speed=60, max_gap=1))
+    """
+
+    def __init__(self, maxsize=1024):
+
+        """
+        maxsize: (int) default queue length of a consumer
+        """
+
+        self.maxsize = maxsize
+        self.consumers = {}
+        self.published = 0
+        self._running = False
+
+    def subscribe(self, name, handler, maxsize=None):
+
+        """
+        Adds a consumer, call before start
+        handler: (callable) handler(tick), plain functions or coroutine functions
+        maxsize: (int) queue length for this consumer, the bus default if None
+        Returns the Consumer
+        """
+
+        if name in self.consumers:
+            raise ValueError(f"A consumer named {name} is already subscribed")
+        consumer = Consumer(name, handler, self.maxsize if maxsize is None else maxsize)
+        self.consumers[name] = consumer
+        return consumer
+
+    async def start(self):
+        for consumer in self.consumers.values():
+            consumer.task = asyncio.create_task(consumer.run(), name=f"consumer-{consumer.name}")
+        self._running = True
+
+    async def publish(self, sample):
+
+        """
+        Puts a sample on every consumer queue, waiting for room when one is full
+        The sample must not change afterwards, copy reused cursors first (replay does)
+        """
+
+        tick = Tick(self.published, sample, perf_counter_ns())
+        self.published += 1
+        for consumer in self.consumers.values():
+            await self._put(consumer, tick)
+            depth = consumer.queue.qsize()
+            if depth > consumer.max_depth:
+                consumer.max_depth = depth
+
+    async def _put(self, consumer, item):
+
+        """
+        Puts item on a consumer queue, waiting for room while the consumer is alive
+        A full queue races the put against the consumer task, so a handler error raised while
+        waiting is re-raised here instead of blocking forever on a queue nobody reads
+        """
+
+        queue = consumer.queue
+        if not queue.full():
+            queue.put_nowait(item)
+            return
+        task = consumer.task
+        if not task.done():
+            put = asyncio.ensure_future(queue.put(item))
+            try:
+                await asyncio.wait((put, task), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not put.done():
+                    put.cancel()
+            if not put.cancelled():
+                return
+        # The consumer stopped with a full queue, raises its handler error
+        task.result()
+
+    async def close(self):
+
+        """
+        Lets every consumer drain its queue and stops them, re-raises a handler error
+        """
+
+        if not self._running:
+            return
+        self._running = False
+        for consumer in self.consumers.values():
+            if not consumer.task.done():
+                try:
+                    await self._put(consumer, None)
+                except Exception:
+                    # Raised below once the other consumers are stopped
+                    pass
+        results = await asyncio.gather(*(consumer.task for consumer in self.consumers.values()), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def run(self, source, speed=None, max_gap=None, limit=50000, max_iter=10000):
+
+        """
+        Starts the consumers, replays source into the bus and waits for them to finish
+        Returns metrics()
+        """
+
+        await self.start()
+        try:
+            await replay(source, self, speed, max_gap, limit, max_iter)
+        finally:
+            await self.close()
+        return self.metrics()
+
+    def metrics(self):
+
+        """
+        Returns {consumer name: lag, service and latency summaries plus queue depth}
+        """
+
+        return {name: consumer.metrics() for name, consumer in self.consumers.items()}
+
+async def replay(source, bus, speed=None, max_gap=None, limit=50000, max_iter=10000):
+
+    """
+    Publishes every sample of source on bus at the chosen speed
+    source: DataInterface, MultiDataInterface, BarInterface (anything with next_sample)
+        or an async iterable of samples such as websocket_samples
+    speed/max_gap: see Pacer
+    Loading a new day runs in a thread so consumers keep draining meanwhile
+    Returns the number of samples published
+    """
+
+    pacer = Pacer(speed, max_gap)
+    count = 0
+
+    if hasattr(source, "__aiter__"):
+        async for sample in source:
+            await pacer.wait(sample.temporal)
+            await bus.publish(sample)
+            count += 1
+        return count
+
+    loop = asyncio.get_running_loop()
+    while True:
+        if getattr(source, "need_new_data", False):
+            sample = await loop.run_in_executor(None, source.next_sample, limit, max_iter)
+        else:
+            sample = source.next_sample(limit, max_iter)
+        if sample is None:
+            return count
+
+        # Interfaces reuse one cursor, consumers run later so they get a detached copy
+        sample = sample.copy()
+        await pacer.wait(sample.temporal)
+        await bus.publish(sample)
+        count += 1
+
+def strategy_handler(strategy, simulator, symbol=None):
+
+    """
+    Consumer running a stateless strategy on every tick with zero bid/ask quotes skipped
+    Fills go to simulator like the example loops, so the consumer latency is the decision latency
+    symbol: (str) ticker for the fills, sample.symbol if None
+    """
+
+    def handle(tick):
+        sample = tick.sample
+        NBBO = sample.NBBO
+        if NBBO.get("bid", 0) == 0 or NBBO.get("ask", 0) == 0:
+            return
+        stock = symbol or sample.symbol
+        order_qty, buy_side = strategy.get_order(NBBO, simulator.positions.get(stock, 0))
+        if order_qty != 0:
+            simulator.fill_order(stock, NBBO, order_qty, sample.temporal, buy_side)
+
+    return handle
+
+def simulator_handler(simulator, on_snapshot=None):
+
+    """
+    Consumer marking the simulator's portfolio to market on every tick
+    on_snapshot: (callable) called with each MarketSimulator.portfolio_snapshot result
+    """
+
+    def handle(tick):
+        sample = tick.sample
+        snapshot = simulator.portfolio_snapshot({sample.symbol: sample.NBBO}, sample.temporal)
+        if on_snapshot is not None:
+            on_snapshot(snapshot)
+
+    return handle
+
+def grapher_handler(grapher, simulator, symbol=None):
+
+    """
+    Consumer feeding a Grapher (or PerformanceTracker) the example loops' data
+    Consumers run concurrently, so the position read here can trail the strategy consumer by a tick
+    """
+
+    def handle(tick):
+        sample = tick.sample
+        stock = symbol or sample.symbol
+        NBBO = sample.NBBO
+        grapher.add_data(sample.temporal, (NBBO.get("bid"), NBBO.get("ask")), simulator.positions.get(stock, 0), simulator.get_equity_curve_sample(stock, NBBO))
+
+    return handle
+
+def _require_websockets():
+    if websockets is None:
+        raise ImportError("WebSocket feeds require websockets, install it with pip install websockets")
+
+def _dumps(messages):
+    if orjson is not None:
+        return orjson.dumps(messages)
+    return json.dumps(messages)
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def sample_messages(sample, last_trade_timestamp=None):
+
+    """
+    Polygon WebSocket style messages for one sample: a "T" trade when last_trade has a new
+    timestamp followed by a "Q" quote, timestamps "t" are kept in nanoseconds
+    """
+
+    messages = []
+    trade = sample.last_trade
+    trade_timestamp = trade.get("timestamp")
+    if trade_timestamp and trade_timestamp != last_trade_timestamp:
+        messages.append({"ev": "T", "sym": sample.symbol, "p": trade.get("price"), "s": trade.get("size"), "t": trade_timestamp})
+    NBBO = sample.NBBO
+    messages.append({"ev": "Q", "sym": sample.symbol, "bp": NBBO.get("bid"), "ap": NBBO.get("ask"), "bs": NBBO.get("bid_size"), "as": NBBO.get("ask_size"), "t": sample.temporal})
+    return messages
+
+class WebSocketFeed:
+
+    """
+    Local stand-in for a live WebSocket market data feed, for paper trading and latency tests
+    Replays a DataInterface (or anything with next_sample) to the first client that connects
+    as Polygon style JSON arrays of "T"/"Q" messages, paced like replay
+    Read it back with websocket_samples, requires the optional websockets package
+    Usage:
+        async with WebSocketFeed(DI, speed=100) as feed:
+            await bus.run(websocket_samples(feed.url))
+    """
+
+    def __init__(self, source, host="127.0.0.1", port=0, speed=None, max_gap=None, limit=50000, max_iter=10000):
+
+        """
+        source: (DataInterface) samples to send, consumed by the first connection
+        port: (int) 0 picks a free port
+        speed/max_gap: see Pacer
+        """
+
+        _require_websockets()
+        self.source = source
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.max_gap = max_gap
+        self.limit = limit
+        self.max_iter = max_iter
+        self.sent = 0
+        self._server = None
+
+    @property
+    def url(self):
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://{self.host}:{port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+        return False
+
+    async def _handler(self, websocket, path=None):
+
+        loop = asyncio.get_running_loop()
+        pacer = Pacer(self.speed, self.max_gap)
+        last_trade_timestamp = None
+        source = self.source
+
+        while True:
+            if getattr(source, "need_new_data", False):
+                sample = await loop.run_in_executor(None, source.next_sample, self.limit, self.max_iter)
+            else:
+                sample = source.next_sample(self.limit, self.max_iter)
+            if sample is None:
+                break
+
+            await pacer.wait(sample.temporal)
+            messages = sample_messages(sample, last_trade_timestamp)
+            last_trade_timestamp = sample.last_trade.get("timestamp")
+            await websocket.send(_dumps(messages))
+            self.sent += 1
+
+        await websocket.close()
+
+async def websocket_samples(url, symbols=None):
+
+    """
+    Async generator of MarketSamples read from a Polygon style WebSocket feed (e.g. WebSocketFeed)
+    One sample per "Q" message with the most recent "T" of the same symbol as last_trade
+    symbols: (iterable) only yield these symbols, every symbol if None
+    """
+
+    _require_websockets()
+    symbols = set(symbols) if symbols is not None else None
+    trades = {}
+
+    async with websockets.connect(url) as websocket:
+        async for data in websocket:
+            for message in _loads(data):
+                event = message.get("ev")
+                symbol = message.get("sym")
+                if symbols is not None and symbol not in symbols:
+                    continue
+                if event == "T":
+                    trades[symbol] = {"price": message["p"], "size": message["s"], "timestamp": message["t"]}
+                elif event == "Q":
+                    NBBO = {"bid": message["bp"], "ask": message["ap"], "bid_size": message["bs"], "ask_size": message["as"]}
+                    yield MarketSample(NBBO, dict(trades.get(symbol) or {"price": 0, "size": 0, "timestamp": 0}), message["t"], symbol)
@@ -0,0 +1,211 @@
+import os
+import csv
+import gzip
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from src.datastream import TRADE_COLUMNS, QUOTE_COLUMNS
+from src.interface import build_day
+from src.sources import DataSource
+
+TRADES_PREFIX = "us_stocks_sip/trades_v1"
+QUOTES_PREFIX = "us_stocks_sip/quotes_v1"
+
+def flat_file_key(prefix, date):
+
+    """
+    Object key of a daily flat file, e.g. us_stocks_sip/trades_v1/2025/07/2025-07-15.csv.gz
+    """
+
+    year, month, _ = date.split("-")
+    return f"{prefix}/{year}/{month}/{date}.csv.gz"
+
+class DirectoryStore:
+
+    """
+    Object store stand-in backed by a local directory
+    Anything with an open(key) method returning a binary file object can be used instead,
+    e.g. a thin wrapper over an S3 client
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def open(self, key):
+        return open(os.path.join(self.root, key), "rb")
+
+def read_flat_file(fileobj, tickers, window, columns, chunk_size=1 << 24, sorted_by_ticker=True):
+
+    """
+    Stream decodes a gzipped daily CSV keeping only the requested tickers and time window
+    Lines are located with bytes.find on the ticker field (found from the header) so rows of
+    other tickers are never split or parsed, and with sorted_by_ticker reading stops once
+    every requested ticker's block has passed
+
+    fileobj: (file) binary file object of the .csv.gz
+    tickers: (iterable) ticker symbols to keep
+    window: (tuple) start and end Unix nanosecond timestamps, compared to sip_timestamp
+    columns: (dict) datastream.TRADE_COLUMNS or QUOTE_COLUMNS
+    Returns {ticker: {column: numpy array}}
+    """
+
+    start, end = window
+    names = list(columns.keys())
+    rows = {ticker: {name: [] for name in names} for ticker in tickers}
+
+    with gzip.GzipFile(fileobj=fileobj) as f:
+        header = f.readline().decode().rstrip("\r\n").split(",")
+        index = {name: i for i, name in enumerate(header)}
+        if "ticker" not in index:
+            raise ValueError(f"Flat file header has no ticker column: {header}")
+        tick = index["ticker"]
+        sip = index["sip_timestamp"]
+
+        # The needle spans the delimiters around the ticker field, lines are checked after parsing
+        # since a quoted field of another column can contain the same bytes
+        prefix = b"\n" if tick == 0 else b","
+        suffix = b"\n" if tick == len(header) - 1 else b","
+        encoded = {ticker: ticker.encode() for ticker in tickers}
+        needles = {ticker: prefix + encoded[ticker] + suffix for ticker in tickers}
+        participant = index.get("participant_timestamp")
+        fields = [(name, index[name]) for name in names if name not in ("sip_timestamp", "participant_timestamp")]
+
+        seen = set()
+        carry = b""
+        while True:
+            data = f.read(chunk_size)
+            buffer = b"\n" + carry + data
+            if data:
+                cut = buffer.rfind(b"\n")
+                carry = buffer[cut + 1:]
+                buffer = buffer[:cut + 1]
+            else:
+                carry = b""
+                if not buffer.endswith(b"\n"):
+                    buffer += b"\n"
+
+            found = False
+            for ticker, needle in needles.items():
+                out = rows[ticker]
+                pos = buffer.find(needle)
+                while pos != -1:
+                    line_start = buffer.rfind(b"\n", 0, pos + 1) + 1
+                    line_end = buffer.find(b"\n", pos + 1)
+                    line = buffer[line_start:line_end]
+                    pos = buffer.find(needle, line_end)
+
+                    if b'"' in line:
+                        parts = next(csv.reader([line.decode()]))
+                        if parts[tick] != ticker:
+                            continue
+                    else:
+                        parts = line.split(b",")
+                        if parts[tick] != encoded[ticker]:
+                            continue
+
+                    found = True
+                    seen.add(ticker)
+                    sip_timestamp = int(parts[sip])
+                    if sip_timestamp < start or sip_timestamp > end:
+                        continue
+
+                    out["sip_timestamp"].append(sip_timestamp)
+                    if participant is not None and parts[participant]:
+                        out["participant_timestamp"].append(int(parts[participant]))
+                    else:
+                        out["participant_timestamp"].append(sip_timestamp)
+                    for name, i in fields:
+                        out[name].append(float(parts[i]) if parts[i] else 0.0)
+
+            if not data:
+                break
+            if sorted_by_ticker and not found and len(seen) == len(needles):
+                break
+
+    return {
+        ticker: {name: np.array(values, dtype=columns[name]) for name, values in table.items()}
+        for ticker, table in rows.items()
+    }
+
+class FlatFileSource(DataSource):
+
+    """
+    Loads days from bulk daily flat files (gzipped CSV per day, Polygon flat file layout)
+    instead of paging through the REST API
+    One pass over a day's files serves every ticker in tickers, the other tickers are
+    kept until the interface asks for them or moves past their date (or written to the cache when one is given)
+    """
+
+    def __init__(self, store, tickers=None, cache=None, chunk_size=1 << 24, sorted_by_ticker=True, trades_prefix=TRADES_PREFIX, quotes_prefix=QUOTES_PREFIX):
+
+        """
+        store: (object) DirectoryStore or anything with open(key) -> binary file
+        tickers: (list) tickers to extract in the same pass, e.g. every ticker of a MultiDataInterface
+        cache: (cache.TickCache) optional store for the extracted columns
+        """
+
+        self.store = store
+        self.tickers = list(tickers) if tickers else []
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.sorted_by_ticker = sorted_by_ticker
+        self.trades_prefix = trades_prefix
+        self.quotes_prefix = quotes_prefix
+
+        self._extracted = {}
+        self._served = {}
+        self._lock = threading.Lock()
+
+    def load_tables(self, ticker, date, window):
+
+        """
+        Returns (trades, quotes) column dicts for one ticker and date
+        """
+
+        if self.cache is not None:
+            cached = self.cache.get(ticker, date, window)
+            if cached is not None:
+                return cached
+
+        # One reader per date at a time, so concurrent interfaces share a single pass
+        with self._lock:
+            # Interfaces move forward in time, once a ticker asks for a date its tables
+            # of earlier dates will never be served and are dropped
+            self._served[ticker] = date
+            for key in [key for key in self._extracted if key[0] == ticker and key[1] < date]:
+                del self._extracted[key]
+
+            tables = self._extracted.pop((ticker, date, window), None)
+            if tables is not None:
+                return tables
+
+            wanted = [ticker] + [t for t in self.tickers if t != ticker]
+
+            def read(prefix, columns):
+                key = flat_file_key(prefix, date)
+                try:
+                    f = self.store.open(key)
+                except FileNotFoundError:
+                    raise FileNotFoundError(f"No flat file for {date} at {key}, the date may not be a trading day or not published yet") from None
+                with f:
+                    return read_flat_file(f, wanted, window, columns, self.chunk_size, self.sorted_by_ticker)
+
+            # Decompression releases the GIL so the two files are read side by side
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                trades_future = pool.submit(read, self.trades_prefix, TRADE_COLUMNS)
+                quotes_future = pool.submit(read, self.quotes_prefix, QUOTE_COLUMNS)
+                trades_all = trades_future.result()
+                quotes_all = quotes_future.result()
+
+            for other in wanted:
+                if self.cache is not None:
+                    self.cache.put(other, date, window, trades_all[other], quotes_all[other])
+                elif other != ticker and self._served.get(other, "") < date:
+                    self._extracted[(other, date, window)] = (trades_all[other], quotes_all[other])
+
+            return trades_all[ticker], quotes_all[ticker]
+
+    def load_day(self, ticker, date, window, limit=50000, max_iter=10000):
+        trades, quotes = self.load_tables(ticker, date, window)
+        return build_day(date, trades, quotes)
@@ -1,6 +1,23 @@
-from src.datastream import get_polygon_trades_stream, get_polygon_quotes_stream, increase_sample_rate_most_recent
+import numpy as np
+from time import perf_counter
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+from src import profiling
+from src.tradingcalendar import NYSE
+from src.datastream import get_polygon_trades_stream, get_polygon_quotes_stream, get_polygon_trades_table, get_polygon_quotes_table, asof_join, get_time_range, OC, POLYGON_BASE_URL
+
+def get_all_dates_on_range(start_date, end_date, calendar=NYSE, all_days=False):
+
+    """
+    Returns the dates between start_date and end_date (inclusive) as YYYY-MM-DD strings
+    Only sessions of calendar are returned so weekends and holidays are never requested
+    all_days: (bool) return every calendar day instead
+    """
+
+    if not all_days:
+        return calendar.sessions(start_date, end_date)
 
-def get_all_dates_on_range(start_date, end_date):
     from datetime import timedelta
     current_date = start_date
     dates = []
@@ -16,20 +33,252 @@ class MarketSample:
     Can be extended to include more information/complex operations on data
     """
 
-    def __init__(self, NBBO, last_trade, temporal):
+    __slots__ = ("NBBO", "last_trade", "temporal", "symbol")
+
+    def __init__(self, NBBO, last_trade, temporal, symbol=None):
 
         self.NBBO = NBBO 
         self.last_trade = last_trade  
         self.temporal = temporal 
+        self.symbol = symbol
+
+    def copy(self):
+
+        """
+        Returns a detached sample holding plain dicts
+        Use this to keep a sample around after the interface has moved on
+        """
+
+        return MarketSample(dict(self.NBBO), dict(self.last_trade), self.temporal, self.symbol)
+
+class RowView(Mapping):
+
+    """
+    Read-only dict-like view of one row across a set of columns
+    Supports .get and [] like the dicts MarketSample used to hold
+    """
+
+    __slots__ = ("_cursor", "_columns")
+
+    def __init__(self, cursor, columns):
+
+        self._cursor = cursor
+        self._columns = columns
+
+    def get(self, key, default=None):
+        column = self._columns.get(key)
+        if column is None:
+            return default
+        return column[self._cursor.index]
+
+    def __getitem__(self, key):
+        return self._columns[key][self._cursor.index]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class SampleCursor(MarketSample):
+
+    """
+    Reusable MarketSample that points at a row of the day's columns
+    next_sample moves the index instead of building a new sample per quote
+    """
+
+    __slots__ = ("index", "_timestamps")
+
+    def __init__(self, symbol=None):
+
+        self.index = 0
+        self.symbol = symbol
+        self._timestamps = []
+        self.NBBO = RowView(self, {})
+        self.last_trade = RowView(self, {})
+
+    @property
+    def temporal(self):
+        return self._timestamps[self.index]
+
+    def bind(self, timestamps, bids, asks, bid_sizes, ask_sizes, prices, sizes, trade_timestamps=None):
+
+        """
+        Points the cursor at a new set of columns
+        trade_timestamps: (list) timestamp of the joined trade, exposed as last_trade["timestamp"]
+        """
+
+        self.index = 0
+        self._timestamps = timestamps
+        self.NBBO._columns = {"bid": bids, "ask": asks, "bid_size": bid_sizes, "ask_size": ask_sizes}
+        self.last_trade._columns = {"price": prices, "size": sizes}
+        if trade_timestamps is not None:
+            self.last_trade._columns["timestamp"] = trade_timestamps
+
+DAY_COLUMNS = ("timestamps", "bids", "asks", "bid_sizes", "ask_sizes", "prices", "sizes", "trade_timestamps")
+
+class DayData:
+
+    """
+    Columnar numpy arrays for one day, aligned on the quote clock
+    """
+
+    __slots__ = ("date", "timestamps", "bids", "asks", "bid_sizes", "ask_sizes", "prices", "sizes", "trade_timestamps")
+
+    def __init__(self, date, timestamps, bids, asks, bid_sizes, ask_sizes, prices, sizes, trade_timestamps=None):
+
+        """
+        trade_timestamps: timestamp of the trade joined onto each quote, 0 before the first trade
+        Days exported before this column existed leave it out and get zeros
+        """
+
+        self.date = date
+        self.timestamps = timestamps
+        self.bids = bids
+        self.asks = asks
+        self.bid_sizes = bid_sizes
+        self.ask_sizes = ask_sizes
+        self.prices = prices
+        self.sizes = sizes
+        self.trade_timestamps = trade_timestamps if trade_timestamps is not None else np.zeros(len(timestamps), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+CLOCKS = {"participant": "participant_timestamp", "sip": "sip_timestamp"}
+
+DUPLICATE_POLICIES = ("keep", "last", "aggregate")
+
+def order_events(timestamps, policy="last"):
+
+    """
+    Puts one day of events in time order and resolves events that share a timestamp
+    Polygon pages come sorted by sip_timestamp, so the sort is skipped when the timestamps
+    are already non-decreasing and participant timestamps only pay for a stable sort
+    policy: (str) what to do with events sharing a timestamp
+        "keep" -> every event is kept, in arrival order
+        "last" -> only the last one is kept (the old dict keyed by timestamp)
+        "aggregate" -> like "last", take_events then sums the sizes of each group
+    Returns (order, last): order sorts the events (None when already sorted) and last holds
+    the position in sorted order of the last event of every timestamp (None when all are kept)
+    """
+
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy: {policy}, expected one of {DUPLICATE_POLICIES}")
+
+    timestamps = np.asarray(timestamps)
+    order = None
+    if len(timestamps) > 1 and (timestamps[1:] < timestamps[:-1]).any():
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+
+    if policy == "keep" or len(timestamps) < 2:
+        return order, None
+
+    changes = timestamps[1:] != timestamps[:-1]
+    if changes.all():
+        return order, None
+    return order, np.flatnonzero(np.append(changes, True))
+
+def take_events(column, order, last, aggregate=False):
+
+    """
+    Applies the result of order_events to a column
+    aggregate: (bool) sum the column over each timestamp group instead of taking the last value
+    """
+
+    column = np.asarray(column)
+    if order is not None:
+        column = column[order]
+    if last is None:
+        return column
+    if aggregate:
+        return np.add.reduceat(column, np.concatenate(([0], last[:-1] + 1)))
+    return column[last]
+
+def build_day(date, trades, quotes, clock="participant", trade_duplicates="aggregate", quote_duplicates="keep"):
+
+    """
+    Builds the DayData for a date from raw trade and quote columns
+    trades/quotes: (dict) columns as described by datastream.TRADE_COLUMNS and QUOTE_COLUMNS
+    clock: (str) "participant" (exchange time) or "sip" (the order Polygon pages come in, never sorted)
+    trade_duplicates: (str) order_events policy for trades sharing a timestamp,
+        "aggregate" reports their summed size at their volume weighted price so a busy print is not undercounted
+    quote_duplicates: (str) "keep" or "last", "keep" serves every quote even at the same timestamp
+    The defaults serve every quote and one aggregated trade per participant timestamp,
+    "last" for both gives the old dict keyed by timestamp
+    """
+
+    if clock not in CLOCKS:
+        raise ValueError(f"Unknown clock: {clock}, expected one of {tuple(CLOCKS)}")
+    if quote_duplicates == "aggregate":
+        raise ValueError("Quote sizes cannot be aggregated, use quote_duplicates='keep' or 'last'")
+
+    profiler = profiling.active
+    if profiler is not None:
+        start = perf_counter()
+
+    key = CLOCKS[clock]
+    trade_order, trade_last = order_events(trades[key], trade_duplicates)
+    quote_order, quote_last = order_events(quotes[key], quote_duplicates)
+
+    trade_timestamps = take_events(trades[key], trade_order, trade_last)
+    quote_timestamps = take_events(quotes[key], quote_order, quote_last)
+    trade_prices = take_events(trades["price"], trade_order, trade_last)
+    trade_sizes = take_events(trades["size"], trade_order, trade_last, trade_duplicates == "aggregate")
+
+    if trade_duplicates == "aggregate" and trade_last is not None:
+        # Volume weighted price of each group, groups with no size keep their last price
+        notional = take_events(np.asarray(trades["price"], dtype=np.float64) * trades["size"], trade_order, trade_last, True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            trade_prices = np.where(trade_sizes > 0, notional / trade_sizes, trade_prices)
+
+    # With "keep" the join still lands on the last trade of a timestamp (searchsorted side="right")
+    prices, sizes, joined_timestamps = asof_join([trade_prices, trade_sizes, trade_timestamps], trade_timestamps, quote_timestamps)
+
+    day = DayData(
+        date,
+        quote_timestamps,
+        take_events(quotes["bid_price"], quote_order, quote_last),
+        take_events(quotes["ask_price"], quote_order, quote_last),
+        take_events(quotes["bid_size"], quote_order, quote_last),
+        take_events(quotes["ask_size"], quote_order, quote_last),
+        prices,
+        sizes,
+        joined_timestamps
+    )
+
+    if profiler is not None:
+        profiler.add_time("build_day", perf_counter() - start)
+
+    return day
 
 class DataInterface:
 
     """
     Simple class that can be initialized to stream data from Polygon.io
     Limited exposed functions to simplify stateless usage
+    Pass a cache.TickCache to read days from disk and only hit the API on a miss
+    By default next_sample returns the same SampleCursor every call, call .copy() to keep a sample
+    Set reuse_samples=False to get a fresh MarketSample per quote instead
+    prefetch_days > 0 downloads up to that many upcoming days in the background
+    while the current day is consumed, at most prefetch_days days are held ahead
+    Pass a transport.PolygonSession to control retries, rate limits and timeouts
+    streaming=True merges the trade and quote pages as they arrive instead of loading whole days,
+    memory then scales with the page size (limit) rather than the day, samples are ordered and
+    joined on sip_timestamp (the order Polygon pages come in) and cache/prefetch_days are not used
+    Pass a sources.DataSource (e.g. sources.FileSource) to load days from somewhere other than Polygon
+    calendar (tradingcalendar.NYSE by default) drops dates that are not sessions before anything is
+    requested and use_NY_hours windows follow its early closes, pass calendar=None to request
+    every date as given with fixed hours (e.g. for venues that trade on exchange holidays)
+    clock, trade_duplicates and quote_duplicates choose the clock days are ordered on and what
+    happens to events sharing a timestamp, see build_day (streaming mode always uses sip_timestamp)
     """
 
-    def __init__(self, api_key, ticker, dates, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern"):
+    def __init__(self, api_key, ticker, dates, use_NY_hours=True, start_hour=9.5, end_hour=16.0, time_zone="US/Eastern", cache=None, base_url=POLYGON_BASE_URL, reuse_samples=True, prefetch_days=0, session=None, streaming=False, source=None, calendar=NYSE, clock="participant", trade_duplicates="aggregate", quote_duplicates="keep"):
 
         self.api_key = api_key
         self.ticker = ticker
@@ -38,6 +287,24 @@ class DataInterface:
         self.start_hour = start_hour
         self.end_hour = end_hour
         self.time_zone = time_zone
+        self.cache = cache
+        self.base_url = base_url
+        self.session = session
+        self.reuse_samples = reuse_samples
+        self.prefetch_days = prefetch_days
+        self.streaming = streaming
+        self.source = source
+        self.calendar = calendar
+        self.clock = clock
+        self.trade_duplicates = trade_duplicates
+        self.quote_duplicates = quote_duplicates
+
+        # Session windows of every date, computed once up front and read by _time_window
+        self._session_bounds = {}
+        if calendar is not None:
+            self.dates = [date for date in dates if calendar.is_session(date)]
+            if use_NY_hours:
+                self._session_bounds = dict(zip(self.dates, map(tuple, calendar.session_bounds(self.dates).tolist())))
 
         self.timestamps = []
         self.current_date_index = 0
@@ -45,6 +312,14 @@ class DataInterface:
         self.need_new_data = True
 
         self.last_sample = None
+        self._cursor = SampleCursor(ticker)
+        self._prefetch_pool = None
+        self._pending = {}
+
+        self._quote_stream = None
+        self._trade_stream = None
+        self._next_trade = None
+        self._stream_columns = None
 
     def next_sample(self, limit=50000, max_iter=10000):
 
@@ -54,32 +329,61 @@ class DataInterface:
         Auto advances next market sample to return
         limit: Maximum number of trades/quotes to fetch at once (helps with data processing)
         max_iter: Maximum number of iterations to fetch data (to prevent super long backtests)
+        While a profiling.Profiler is active every call is timed under "next_sample",
+        including the wait for a new day which is also timed under "load_day"
         """
 
-        if self.need_new_data:
+        profiler = profiling.active
+        if profiler is not None:
+            start = perf_counter()
+
+        if self.streaming:
+            sample = self._next_streaming_sample(limit, max_iter)
+            if profiler is not None and sample is not None:
+                profiler.add_time("next_sample", perf_counter() - start)
+            return sample
+
+        # Days without any quotes are skipped before they are installed, the cursor (and so
+        # last_sample) keeps pointing at the previous day's columns
+        while self.need_new_data:
             if self.current_date_index >= len(self.dates):
                 return None
 
-            date = self.dates[self.current_date_index]
-            self._info_for_day(date, limit, max_iter)
+            if profiler is not None:
+                load_start = perf_counter()
+                day = self._load_day(self.current_date_index, limit, max_iter)
+                profiler.add_time("load_day", perf_counter() - load_start)
+            else:
+                day = self._load_day(self.current_date_index, limit, max_iter)
 
             self.current_date_index += 1
+            if len(day) == 0:
+                continue
+
+            self._install_day(day)
             self.current_data_index = 0
             self.need_new_data = False
 
-        sample = MarketSample(
-            {
-                "bid": self.bids[self.current_data_index],
-                "ask": self.asks[self.current_data_index],
-                "bid_size": self.bid_sizes[self.current_data_index],
-                "ask_size": self.ask_sizes[self.current_data_index]
-            },
-            {
-                "price": self.prices[self.current_data_index],
-                "size": self.sizes[self.current_data_index]
-            },
-            self.timestamps[self.current_data_index]
-        )
+        i = self.current_data_index
+        if self.reuse_samples:
+            sample = self._cursor
+            sample.index = i
+        else:
+            sample = MarketSample(
+                {
+                    "bid": self.bids[i],
+                    "ask": self.asks[i],
+                    "bid_size": self.bid_sizes[i],
+                    "ask_size": self.ask_sizes[i]
+                },
+                {
+                    "price": self.prices[i],
+                    "size": self.sizes[i],
+                    "timestamp": self.trade_timestamps[i]
+                },
+                self.timestamps[i],
+                self.ticker
+            )
 
         self.current_data_index += 1
 
@@ -88,22 +392,268 @@ class DataInterface:
 
         self.last_sample = sample
 
+        if profiler is not None:
+            profiler.add_time("next_sample", perf_counter() - start)
+
         return sample
 
-    def _info_for_day(self, date, limit=50000, max_iter=10000):
+    def _open_streams(self, date, limit=50000, max_iter=10000):
+
+        # Same window as batch mode so calendar early closes end the stream too
+        window = self._time_window(date)
+        self._quote_stream = get_polygon_quotes_stream(self.ticker, date, self.api_key, limit, max_iter, self.use_NY_hours, self.start_hour, self.end_hour, self.time_zone, self.base_url, self.session, window)
+        self._trade_stream = get_polygon_trades_stream(self.ticker, date, self.api_key, limit, max_iter, self.use_NY_hours, self.start_hour, self.end_hour, self.time_zone, self.base_url, self.session, window)
+        self._next_trade = next(self._trade_stream, None)
+
+        # One slot per column, overwritten in place for every quote
+        self._stream_columns = ([0], [0], [0], [0], [0], [0], [0], [0])
+        self._cursor.bind(*self._stream_columns)
+
+    def _next_streaming_sample(self, limit=50000, max_iter=10000):
+
+        """
+        next_sample for streaming mode
+        Pulls one quote at a time and advances the trade stream up to it,
+        so only the current page of each stream is ever held in memory
+        """
+
+        quote = None
+        while quote is None:
+            if self._quote_stream is None:
+                if self.current_date_index >= len(self.dates):
+                    return None
+                self._open_streams(self.dates[self.current_date_index], limit, max_iter)
+                self.current_date_index += 1
+                self.current_data_index = 0
+
+            quote = next(self._quote_stream, None)
+            if quote is None:
+                self._quote_stream = None
+                self._trade_stream = None
+
+        timestamp = quote["sip_timestamp"]
+        timestamps, bids, asks, bid_sizes, ask_sizes, prices, sizes, trade_timestamps = self._stream_columns
+
+        aggregate = self.trade_duplicates == "aggregate"
+        trade = self._next_trade
+        while trade is not None and trade["sip_timestamp"] <= timestamp:
+            total = sizes[0] + trade["size"]
+            if aggregate and trade["sip_timestamp"] == trade_timestamps[0] and total > 0:
+                # Prints sharing a timestamp are served as one, like build_day
+                prices[0] = (prices[0] * sizes[0] + trade["price"] * trade["size"]) / total
+                sizes[0] = total
+            else:
+                prices[0] = trade["price"]
+                sizes[0] = trade["size"]
+            trade_timestamps[0] = trade["sip_timestamp"]
+            trade = next(self._trade_stream, None)
+        self._next_trade = trade
+
+        timestamps[0] = timestamp
+        bids[0] = quote.get("bid_price", 0)
+        asks[0] = quote.get("ask_price", 0)
+        bid_sizes[0] = quote.get("bid_size", 0)
+        ask_sizes[0] = quote.get("ask_size", 0)
+
+        if self.reuse_samples:
+            sample = self._cursor
+        else:
+            sample = MarketSample(
+                {"bid": bids[0], "ask": asks[0], "bid_size": bid_sizes[0], "ask_size": ask_sizes[0]},
+                {"price": prices[0], "size": sizes[0], "timestamp": trade_timestamps[0]},
+                timestamp,
+                self.ticker
+            )
+
+        self.current_data_index += 1
+        self.last_sample = sample
+
+        return sample
+
+    def get_state(self):
+
+        """
+        Returns the position of the interface in its dates as a small JSON friendly dict
+        Taken right after a day's last sample it points at the start of the next day
+        (in streaming mode the end of a day is only known once the next sample is asked for)
+        """
+
+        return {
+            "ticker": self.ticker,
+            "dates": list(self.dates),
+            "current_date_index": self.current_date_index,
+            "current_data_index": self.current_data_index,
+            "need_new_data": self._quote_stream is None if self.streaming else self.need_new_data
+        }
+
+    def set_state(self, state, limit=50000, max_iter=10000):
+
+        """
+        Moves the interface to a position saved with get_state
+        At a day boundary nothing is loaded until the next next_sample call,
+        mid-day only the day being resumed is loaded (from the cache or source when there is one)
+        and next_sample continues with the sample after the saved one
+        """
+
+        if state["ticker"] != self.ticker or list(state["dates"]) != list(self.dates):
+            raise ValueError(f"State was saved for {state['ticker']} on {len(state['dates'])} dates, not this interface's")
+
+        self.close()
+        self.last_sample = None
+        self.current_date_index = state["current_date_index"]
+        self.current_data_index = 0
+        self.need_new_data = True
+
+        if state["need_new_data"]:
+            self._quote_stream = None
+            self._trade_stream = None
+            return
+
+        skip = state["current_data_index"]
+        if self.streaming:
+            # Streams cannot seek, so the resumed day is streamed again up to the saved sample
+            self.current_date_index -= 1
+            self._quote_stream = None
+            for _ in range(skip):
+                self._next_streaming_sample(limit, max_iter)
+            return
+
+        self._install_day(self._build_day(self.dates[self.current_date_index - 1], limit, max_iter))
+        self.current_data_index = skip
+        self.need_new_data = skip >= len(self.timestamps)
+
+    def close(self):
+
+        """
+        Cancels outstanding prefetches and stops the background threads
+        """
+
+        for future in self._pending.values():
+            future.cancel()
+        self._pending = {}
+        if self._prefetch_pool is not None:
+            self._prefetch_pool.shutdown(wait=False)
+            self._prefetch_pool = None
 
-        trades_raw = list(get_polygon_trades_stream(self.ticker, date, self.api_key, limit, max_iter, self.use_NY_hours, self.start_hour, self.end_hour, self.time_zone))
-        trades = {trade.get("participant_timestamp", trade["sip_timestamp"]): (trade["price"], trade["size"]) for trade in trades_raw}
-        trade_timestamps = sorted(trades.keys())
-
-        quotes_raw = list(get_polygon_quotes_stream(self.ticker, date, self.api_key, limit, max_iter, self.use_NY_hours, self.start_hour, self.end_hour, self.time_zone))
-        quotes = {quote.get("participant_timestamp", quote["sip_timestamp"]): (quote.get("bid_price", 0), quote.get("ask_price", 0), quote.get("bid_size", 0), quote.get("ask_size", 0)) for quote in quotes_raw}
-        quote_timestamps = sorted(quotes.keys())
-
-        self.prices = increase_sample_rate_most_recent([[trades[t][0] for t in trade_timestamps]], trade_timestamps, quote_timestamps)[0]
-        self.sizes = increase_sample_rate_most_recent([[trades[t][1] for t in trade_timestamps]], trade_timestamps, quote_timestamps)[0]
-        self.bids = [quotes[t][0] for t in quote_timestamps]
-        self.asks = [quotes[t][1] for t in quote_timestamps]
-        self.bid_sizes = [quotes[t][2] for t in quote_timestamps]
-        self.ask_sizes = [quotes[t][3] for t in quote_timestamps]
-        self.timestamps = quote_timestamps
\ No newline at end of file
+    def _load_day(self, index, limit=50000, max_iter=10000):
+
+        """
+        Returns the DayData for dates[index]
+        With prefetching on, also schedules the following prefetch_days dates
+        """
+
+        if self.prefetch_days <= 0:
+            return self._build_day(self.dates[index], limit, max_iter)
+
+        if self._prefetch_pool is None:
+            self._prefetch_pool = ThreadPoolExecutor(max_workers=self.prefetch_days, thread_name_prefix="prefetch")
+
+        future = self._pending.pop(index, None)
+        if future is None:
+            future = self._prefetch_pool.submit(self._build_day, self.dates[index], limit, max_iter)
+
+        # Only schedule ahead of the day being handed out so the buffer stays bounded
+        for ahead in range(index + 1, min(index + 1 + self.prefetch_days, len(self.dates))):
+            if ahead not in self._pending:
+                self._pending[ahead] = self._prefetch_pool.submit(self._build_day, self.dates[ahead], limit, max_iter)
+
+        day = future.result()
+
+        if index + 1 >= len(self.dates):
+            self.close()
+
+        return day
+
+    def prewarm(self, limit=50000, max_iter=10000):
+
+        """
+        Downloads every date into the cache without serving any samples
+        Returns the number of dates that had to be fetched from the API
+        """
+
+        if self.cache is None:
+            raise Exception("prewarm requires a cache")
+
+        fetched = 0
+        for date in self.dates:
+            if not self.cache.contains(self.ticker, date, self._time_window(date)):
+                self._tables_for_day(date, limit, max_iter)
+                fetched += 1
+
+        return fetched
+
+    def _time_window(self, date):
+        if self.use_NY_hours:
+            bounds = self._session_bounds.get(date)
+            if bounds is not None:
+                return bounds
+            if self.calendar is not None:
+                return self.calendar.session_range(date)
+            return OC(date)
+        return get_time_range(date, self.start_hour, self.end_hour, self.time_zone)
+
+    def _tables_for_day(self, date, limit=50000, max_iter=10000):
+
+        """
+        Returns (trades, quotes) column dicts for a date
+        Reads from the cache first and writes to it on a miss
+        """
+
+        window = self._time_window(date)
+        if self.cache is not None:
+            cached = self.cache.get(self.ticker, date, window)
+            if cached is not None:
+                return cached
+
+        # Trades and quotes are independent downloads so fetch them side by side
+        # Pages are written straight into the day's column arrays so only one page of dicts is alive at a time
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # The resolved window is requested so the cached day matches its key
+            trades_future = pool.submit(get_polygon_trades_table, self.ticker, date, self.api_key, limit, max_iter, self.use_NY_hours, self.start_hour, self.end_hour, self.time_zone, self.base_url, self.session, window)
+            quotes_future = pool.submit(get_polygon_quotes_table, self.ticker, date, self.api_key, limit, max_iter, self.use_NY_hours, self.start_hour, self.end_hour, self.time_zone, self.base_url, self.session, window)
+            trades = trades_future.result()
+            quotes = quotes_future.result()
+
+        # A fetch cut short by max_iter is not the full day so it is never cached
+        truncated = max(len(trades["sip_timestamp"]), len(quotes["sip_timestamp"])) >= limit * max_iter
+        if self.cache is not None and not truncated:
+            self.cache.put(self.ticker, date, window, trades, quotes)
+
+        return trades, quotes
+
+    def _build_day(self, date, limit=50000, max_iter=10000):
+
+        """
+        Builds the DayData for a date without touching the interface cursor
+        """
+
+        # Sources with raw tables are built here so the clock and duplicate policies apply
+        if self.source is not None and hasattr(self.source, "load_tables"):
+            trades, quotes = self.source.load_tables(self.ticker, date, self._time_window(date))
+        elif self.source is not None:
+            return self.source.load_day(self.ticker, date, self._time_window(date), limit, max_iter)
+        else:
+            trades, quotes = self._tables_for_day(date, limit, max_iter)
+
+        return build_day(date, trades, quotes, self.clock, self.trade_duplicates, self.quote_duplicates)
+
+    def _install_day(self, day):
+
+        """
+        Makes a DayData the day served by next_sample
+        Columns are converted to lists once so per quote reads are plain list indexing,
+        except for memory-mapped sources whose arrays are served in place so a day is
+        never copied into memory (pages are read as the cursor reaches them)
+        """
+
+        self.day = day
+        if getattr(self.source, "memory_mapped", False):
+            columns = [getattr(day, name) for name in DAY_COLUMNS]
+        else:
+            columns = [getattr(day, name).tolist() for name in DAY_COLUMNS]
+        self.timestamps, self.bids, self.asks, self.bid_sizes, self.ask_sizes, self.prices, self.sizes, self.trade_timestamps = columns
+
+        self._cursor.bind(*columns)
+
+    def _info_for_day(self, date, limit=50000, max_iter=10000):
+        self._install_day(self._build_day(date, limit, max_iter))
@@ -1,3 +1,9 @@
+import numpy as np
+from time import perf_counter
+from collections import deque
+
+from src import profiling
+
 class SlippageModel:
     
     """
@@ -15,6 +21,24 @@ class SlippageModel:
 
         raise NotImplementedError("Subclasses should implement this method.")
 
+    def calculate_slippage_batch(self, bids, asks, bid_sizes, ask_sizes, order_qty, buy_side):
+
+        """
+        Array version of calculate_slippage used by the vectorized engine
+        All arguments are numpy arrays, one entry per order
+        Returns (avg_prices, filled_qtys) arrays
+        Falls back to calling calculate_slippage per order, subclasses can override with numpy
+        """
+
+        avg_prices = np.zeros(len(order_qty))
+        filled_qtys = np.zeros(len(order_qty), dtype=np.int64)
+        for i in range(len(order_qty)):
+            NBBO = {"bid": bids[i].item(), "ask": asks[i].item(), "bid_size": bid_sizes[i].item(), "ask_size": ask_sizes[i].item()}
+            avg_price, filled_qty = self.calculate_slippage(NBBO, int(order_qty[i]), bool(buy_side[i]))
+            avg_prices[i] = avg_price
+            filled_qtys[i] = int(filled_qty)
+        return avg_prices, filled_qtys
+
 class IdealFillSlippageModel(SlippageModel):
 
     """
@@ -27,6 +51,9 @@ class IdealFillSlippageModel(SlippageModel):
         else:
             return NBBO.get("bid"), order_qty
 
+    def calculate_slippage_batch(self, bids, asks, bid_sizes, ask_sizes, order_qty, buy_side):
+        return np.where(buy_side, asks, bids), order_qty
+
 class BasicFractionalSlippageModel(SlippageModel):
 
     """
@@ -61,6 +88,15 @@ class BasicFractionalSlippageModel(SlippageModel):
                 avg_price = (bid * optimal_fill + suboptimal_price * suboptimal_fill) / order_qty
                 return avg_price, order_qty
 
+    def calculate_slippage_batch(self, bids, asks, bid_sizes, ask_sizes, order_qty, buy_side):
+        price = np.where(buy_side, asks, bids)
+        size = np.where(buy_side, ask_sizes, bid_sizes)
+        suboptimal_price = np.where(buy_side, asks * (1 + self.slippage_rate), bids * (1 - self.slippage_rate))
+        optimal_fill = np.minimum(size, order_qty)
+        suboptimal_fill = order_qty - optimal_fill
+        avg_price = np.where(order_qty <= size, price, (price * optimal_fill + suboptimal_price * suboptimal_fill) / order_qty)
+        return avg_price, order_qty
+
 
 class CostStructure:
 
@@ -78,6 +114,15 @@ class CostStructure:
 
         raise NotImplementedError("Subclasses should implement this method.")
 
+    def calculate_cost_batch(self, shares, avg_prices):
+
+        """
+        Array version of calculate_cost used by the vectorized engine
+        Falls back to calling calculate_cost per order, subclasses can override with numpy
+        """
+
+        return np.array([self.calculate_cost(shares[i], avg_prices[i]) for i in range(len(shares))], dtype=np.float64)
+
 class ZeroCostStructure(CostStructure):
 
     """
@@ -86,6 +131,9 @@ class ZeroCostStructure(CostStructure):
 
     def calculate_cost(self, shares, avg_price):
         return 0.0
+
+    def calculate_cost_batch(self, shares, avg_prices):
+        return np.zeros(len(shares))
     
 class IBKRProFIXEDCostStructure(CostStructure):
 
@@ -102,8 +150,103 @@ class IBKRProFIXEDCostStructure(CostStructure):
 
         cost = shares * PER_SHARE_FEE
         return min(max(cost, MIN_ORDER_FEE), MAX_ORDER_FEE)
+
+    def calculate_cost_batch(self, shares, avg_prices):
+        return np.minimum(np.maximum(shares * 0.005, 1.00), shares * avg_prices * 0.01)
     
 
+class LotQueue:
+
+    """
+    FIFO of open lots for one side of one stock
+    Keeps running quantity and cost basis so marking to market is O(1)
+    Lots are stored as [qty, entry_time, entry_price, borrow_rate] lists
+    borrow_notional (sum of qty * price * rate) and borrow_time (the same weighted by entry time)
+    make the borrow accrued by every open lot O(1) as well, see accrued_borrow
+    """
+
+    __slots__ = ("lots", "qty", "cost", "borrow_notional", "borrow_time")
+
+    def __init__(self):
+
+        self.lots = deque()
+        self.qty = 0
+        self.cost = 0.0
+        self.borrow_notional = 0.0
+        self.borrow_time = 0.0
+
+    def add(self, qty, entry_time, entry_price, borrow_rate=0.0):
+        self.lots.append([qty, entry_time, entry_price, borrow_rate])
+        self.qty += qty
+        self.cost += qty * entry_price
+        if borrow_rate:
+            self.borrow_notional += qty * entry_price * borrow_rate
+            self.borrow_time += qty * entry_price * borrow_rate * entry_time
+
+    def consume(self, qty):
+
+        """
+        Removes up to qty shares oldest lot first
+        Yields (used_qty, entry_time, entry_price, borrow_rate) for every lot touched
+        """
+
+        lots = self.lots
+        qty_left = qty
+        while qty_left > 0 and lots:
+            lot = lots[0]
+            used_qty = min(qty_left, lot[0])
+            yield used_qty, lot[1], lot[2], lot[3]
+            lot[0] -= used_qty
+            qty_left -= used_qty
+            self.qty -= used_qty
+            self.cost -= used_qty * lot[2]
+            if lot[3]:
+                self.borrow_notional -= used_qty * lot[2] * lot[3]
+                self.borrow_time -= used_qty * lot[2] * lot[3] * lot[1]
+            if lot[0] == 0:
+                lots.popleft()
+
+        # Drop rounding left over in the running cost once the side is flat
+        if not lots:
+            self.qty = 0
+            self.cost = 0.0
+            self.borrow_notional = 0.0
+            self.borrow_time = 0.0
+
+    def accrued_borrow(self, timestamp):
+
+        """
+        Borrow cost accrued by the open lots up to timestamp (Unix ns)
+        Same formula _cover_short charges when the lots are covered
+        """
+
+        if not self.borrow_notional:
+            return 0.0
+        return (self.borrow_notional * timestamp - self.borrow_time) / 1e9 / 86400 / 365
+
+    def __len__(self):
+        return len(self.lots)
+
+    def get_state(self):
+        return {"lots": [list(lot) for lot in self.lots], "qty": self.qty, "cost": self.cost}
+
+    @classmethod
+    def from_state(cls, state):
+        queue = cls()
+        queue.lots = deque(list(lot) for lot in state["lots"])
+        queue.qty = state["qty"]
+        queue.cost = state["cost"]
+        for qty, entry_time, entry_price, borrow_rate in queue.lots:
+            queue.borrow_notional += qty * entry_price * borrow_rate
+            queue.borrow_time += qty * entry_price * borrow_rate * entry_time
+        return queue
+
+    def __iter__(self):
+
+        # Same dict shape the simulator used to store lots in
+        for qty, entry_time, entry_price, borrow_rate in self.lots:
+            yield {"qty": qty, "entry_time": entry_time, "entry_price": entry_price, "borrow_rate": borrow_rate}
+
 class MarketSimulator:
 
     def __init__(self, slippage_model=IdealFillSlippageModel(), cost_structure=ZeroCostStructure()):
@@ -122,6 +265,22 @@ class MarketSimulator:
         self.short_lots = {}
         self.long_lots = {}
 
+        # Commissions paid by every fill so far, already taken out of position_PnL
+        self.total_fees = 0.0
+
+        self._reset_portfolio()
+
+    def _reset_portfolio(self):
+
+        # Running realized total and the cached marks/rows behind portfolio_snapshot
+        self._realized_total = sum(self.position_PnL.values())
+        self._marks = {}
+        self._rows = {}
+        self._dirty = set(self.positions)
+        self._borrowing = set()
+        self._snapshot_time = None
+        self._totals = {"unrealized": 0.0, "accrued_borrow": 0.0, "gross_exposure": 0.0, "net_exposure": 0.0}
+
     def fill_order(self, stock, NBBO, order_qty, timestamp, buy_side=True, cost_to_borrow=0.0):
 
         """
@@ -139,16 +298,43 @@ class MarketSimulator:
         cost_to_borrow: (float) cost to borrow shares for short selling, default is 0.0
         """
 
+        profiler = profiling.active
+        if profiler is not None:
+            start = perf_counter()
+
         avg_price, filled_qty = self.slippage_model.calculate_slippage(NBBO, order_qty, buy_side)
+        if filled_qty > 0:
+            self.apply_fill(stock, avg_price, filled_qty, timestamp, buy_side, cost_to_borrow)
+
+        if profiler is not None:
+            profiler.add_time("fill_order", perf_counter() - start)
+
+    def apply_fill(self, stock, avg_price, filled_qty, timestamp, buy_side=True, cost_to_borrow=0.0, cost=None):
+
+        """
+        Books a fill whose price is already known, e.g. from a batch slippage computation
+        Same position, lot and PnL accounting as fill_order
+
+        Parameters:
+        avg_price: (float) average fill price
+        filled_qty: (int) quantity filled
+        cost: (float) commission for the fill, computed from the cost structure if None
+        """
+
         if filled_qty <= 0:
             return None
         total_qty = filled_qty
+        if cost is None:
+            cost = self.cost_structure.calculate_cost(total_qty, avg_price)
+        self.total_fees += cost
 
         if stock not in self.positions:
             self.positions[stock] = 0
             self.position_PnL[stock] = 0.0
-            self.short_lots[stock] = []
-            self.long_lots[stock] = [] 
+            self.short_lots[stock] = LotQueue()
+            self.long_lots[stock] = LotQueue()
+
+        realized_before = self.position_PnL[stock]
 
         if buy_side:
             if self.positions[stock] < 0:
@@ -157,12 +343,8 @@ class MarketSimulator:
                 filled_qty -= qty_to_cover
             self.positions[stock] += total_qty
             if filled_qty > 0:
-                self.long_lots[stock].append({
-                    "qty": filled_qty,
-                    "entry_time": timestamp,
-                    "entry_price": avg_price
-                })
-            self.position_PnL[stock] -= self.cost_structure.calculate_cost(total_qty, avg_price)
+                self.long_lots[stock].add(filled_qty, timestamp, avg_price)
+            self.position_PnL[stock] -= cost
         else:
             if self.positions[stock] > 0:
                 qty_to_cover = min(filled_qty, self.positions[stock])
@@ -170,43 +352,51 @@ class MarketSimulator:
                 filled_qty -= qty_to_cover
             self.positions[stock] -= total_qty
             if filled_qty > 0:
-                self.short_lots[stock].append({
-                    "qty": filled_qty,
-                    "entry_time": timestamp,
-                    "entry_price": avg_price,
-                    "borrow_rate": cost_to_borrow
-                })
-            self.position_PnL[stock] -= self.cost_structure.calculate_cost(total_qty, avg_price)
+                self.short_lots[stock].add(filled_qty, timestamp, avg_price, cost_to_borrow)
+            self.position_PnL[stock] -= cost
+
+        self._realized_total += self.position_PnL[stock] - realized_before
+        self._dirty.add(stock)
+
+    def get_state(self):
+
+        """
+        Returns positions, realized PnL and open lots as a JSON friendly dict
+        Slippage model and cost structure are configuration and are not included
+        """
+
+        return {
+            "positions": dict(self.positions),
+            "position_PnL": dict(self.position_PnL),
+            "total_fees": self.total_fees,
+            "long_lots": {stock: lots.get_state() for stock, lots in self.long_lots.items()},
+            "short_lots": {stock: lots.get_state() for stock, lots in self.short_lots.items()}
+        }
+
+    def set_state(self, state):
+
+        """
+        Restores a state saved with get_state, replacing the current one
+        """
+
+        self.positions = dict(state["positions"])
+        self.position_PnL = dict(state["position_PnL"])
+        self.total_fees = state.get("total_fees", 0.0)
+        self.long_lots = {stock: LotQueue.from_state(lots) for stock, lots in state["long_lots"].items()}
+        self.short_lots = {stock: LotQueue.from_state(lots) for stock, lots in state["short_lots"].items()}
+        self._reset_portfolio()
 
     def _cover_short(self, stock, qty_to_cover, cover_price, timestamp):
-        lots = self.short_lots[stock]
-        qty_left = qty_to_cover
-        while qty_left > 0 and lots:
-            lot = lots[0]
-            lot_qty = lot["qty"]
-            used_qty = min(qty_left, lot_qty)
-            holding_days = (timestamp - lot["entry_time"]) / 1e9 / 86400
-            borrow_cost = used_qty * lot["entry_price"] * lot["borrow_rate"] * holding_days / 365
-            pnl = (lot["entry_price"] - cover_price) * used_qty - borrow_cost
+        for used_qty, entry_time, entry_price, borrow_rate in self.short_lots[stock].consume(qty_to_cover):
+            holding_days = (timestamp - entry_time) / 1e9 / 86400
+            borrow_cost = used_qty * entry_price * borrow_rate * holding_days / 365
+            pnl = (entry_price - cover_price) * used_qty - borrow_cost
             self.position_PnL[stock] += pnl
-            lot["qty"] -= used_qty
-            qty_left -= used_qty
-            if lot["qty"] == 0:
-                lots.pop(0)
 
     def _sell_long(self, stock, qty_to_sell, sell_price, timestamp):
-        lots = self.long_lots[stock]
-        qty_left = qty_to_sell
-        while qty_left > 0 and lots:
-            lot = lots[0]
-            lot_qty = lot["qty"]
-            used_qty = min(qty_left, lot_qty)
-            pnl = (sell_price - lot["entry_price"]) * used_qty
+        for used_qty, entry_time, entry_price, borrow_rate in self.long_lots[stock].consume(qty_to_sell):
+            pnl = (sell_price - entry_price) * used_qty
             self.position_PnL[stock] += pnl
-            lot["qty"] -= used_qty
-            qty_left -= used_qty
-            if lot["qty"] == 0:
-                lots.pop(0)
 
     def get_stock_Pnl(self, stock):
         """
@@ -218,8 +408,9 @@ class MarketSimulator:
     def get_all_PnL(self):
         """
         Returns the total realized PnL across all stocks
+        Kept as a running total by every fill instead of summing position_PnL
         """
-        return sum(self.position_PnL.values())
+        return self._realized_total
 
     def get_stock_unrealized_PnL(self, stock, NBBO):
         """
@@ -227,15 +418,16 @@ class MarketSimulator:
         stock: (str) stock ticker symbol
         NBBO: (dict) current NBBO from interface.MarketSample
         """
-        market_bid = NBBO.get("bid", 0)
-        market_ask = NBBO.get("ask", 0)
         unrealized = 0.0
 
-        for lot in self.long_lots.get(stock, []):
-            unrealized += (market_bid - lot["entry_price"]) * lot["qty"]
-            
-        for lot in self.short_lots.get(stock, []):
-            unrealized += (lot["entry_price"] - market_ask) * lot["qty"]
+        # Running quantity and cost basis make this O(1) no matter how many lots are open
+        long_lots = self.long_lots.get(stock)
+        if long_lots is not None and long_lots.qty:
+            unrealized += NBBO.get("bid", 0) * long_lots.qty - long_lots.cost
+
+        short_lots = self.short_lots.get(stock)
+        if short_lots is not None and short_lots.qty:
+            unrealized += short_lots.cost - NBBO.get("ask", 0) * short_lots.qty
 
         return unrealized
     
@@ -246,3 +438,106 @@ class MarketSimulator:
         NBBO: (dict) current NBBO from interface.MarketSample
         """
         return self.position_PnL.get(stock, 0) + self.get_stock_unrealized_PnL(stock, NBBO)
+
+    def portfolio_snapshot(self, NBBOs=None, timestamp=None):
+
+        """
+        Marks the whole portfolio to market in one call
+        Only stocks whose quote changed, that filled, or that accrue borrow on a new timestamp
+        are recomputed, everything else comes from the previous snapshot, so calling it every
+        tick costs O(changed stocks) rather than O(stocks)
+        NBBOs: (dict) {stock: NBBO} quotes that changed since the last call, e.g.
+            {sample.symbol: sample.NBBO} or MultiDataInterface.latest_NBBOs(), stocks left out keep their last mark
+            or (tuple) (stocks, bids, asks) sequences or numpy arrays with one entry per stock
+        timestamp: (int) Unix nanosecond time borrow is accrued up to, the last one given if None
+        Longs are marked at the bid and shorts at the ask like get_stock_unrealized_PnL,
+        a zero or missing bid or ask keeps the last non-zero one, a side never quoted
+        contributes no unrealized PnL or exposure
+        Returns a dict with per stock rows under "symbols" (position, bid, ask, realized, unrealized,
+        accrued_borrow, gross_exposure, net_exposure, total) and the same totals for the portfolio
+        total is realized + unrealized - accrued_borrow, i.e. what closing everything now would realize
+        The "symbols" dict is updated in place by later calls, copy it to keep a snapshot
+        """
+
+        if NBBOs is not None:
+            if isinstance(NBBOs, dict):
+                quotes = [(stock, NBBO.get("bid"), NBBO.get("ask")) for stock, NBBO in NBBOs.items()]
+            else:
+                stocks, bids, asks = NBBOs
+                quotes = zip(stocks, np.asarray(bids).tolist(), np.asarray(asks).tolist())
+
+            marks = self._marks
+            for stock, bid, ask in quotes:
+                old_bid, old_ask = marks.get(stock, (None, None))
+                # An empty side of the book keeps the last price it was quoted at
+                if bid is None or not bid > 0:
+                    bid = old_bid
+                if ask is None or not ask > 0:
+                    ask = old_ask
+                if bid != old_bid or ask != old_ask:
+                    marks[stock] = (bid, ask)
+                    self._dirty.add(stock)
+
+        if timestamp is not None and timestamp != self._snapshot_time:
+            self._snapshot_time = timestamp
+            self._dirty.update(self._borrowing)
+
+        totals = self._totals
+        rows = self._rows
+        for stock in self._dirty:
+            row = self._mark_stock(stock)
+            old = rows.get(stock)
+            for name in totals:
+                totals[name] += row[name] - (old[name] if old is not None else 0.0)
+            rows[stock] = row
+        self._dirty.clear()
+
+        realized = self._realized_total
+        return {
+            "symbols": rows,
+            "realized": realized,
+            **totals,
+            "total": realized + totals["unrealized"] - totals["accrued_borrow"]
+        }
+
+    def _mark_stock(self, stock):
+
+        """
+        One portfolio_snapshot row from the running lot totals, O(1) per stock
+        """
+
+        bid, ask = self._marks.get(stock, (None, None))
+        long_lots = self.long_lots.get(stock)
+        short_lots = self.short_lots.get(stock)
+        long_qty = long_lots.qty if long_lots is not None else 0
+        short_qty = short_lots.qty if short_lots is not None else 0
+
+        unrealized = 0.0
+        long_value = short_value = 0.0
+        if long_qty and bid is not None:
+            long_value = bid * long_qty
+            unrealized += long_value - long_lots.cost
+        if short_qty and ask is not None:
+            short_value = ask * short_qty
+            unrealized += short_lots.cost - short_value
+
+        accrued_borrow = 0.0
+        if short_qty and short_lots.borrow_notional:
+            self._borrowing.add(stock)
+            if self._snapshot_time is not None:
+                accrued_borrow = short_lots.accrued_borrow(self._snapshot_time)
+        else:
+            self._borrowing.discard(stock)
+
+        realized = self.position_PnL.get(stock, 0.0)
+        return {
+            "position": self.positions.get(stock, 0),
+            "bid": bid,
+            "ask": ask,
+            "realized": realized,
+            "unrealized": unrealized,
+            "accrued_borrow": accrued_borrow,
+            "gross_exposure": long_value + short_value,
+            "net_exposure": long_value - short_value,
+            "total": realized + unrealized - accrued_borrow
+        }
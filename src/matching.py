@@ -0,0 +1,457 @@
+import heapq
+import itertools
+from bisect import bisect_left, bisect_right, insort
+
+MARKET = "market"
+LIMIT = "limit"
+IOC = "ioc"
+ORDER_TYPES = (MARKET, LIMIT, IOC)
+
+# Prices are keyed as integers in 1/10000ths so float noise never splits a level
+PRICE_SCALE = 10000
+
+def price_key(price):
+    return int(round(price * PRICE_SCALE))
+
+class Order:
+
+    """
+    One order handled by the MatchingEngine
+    status is "pending" until it reaches the exchange after the engine latency,
+    then "open" while resting, and finally "filled", "cancelled" or "rejected"
+    queue_ahead is the estimated displayed size ahead of the order at its price,
+    None while the order rests behind the NBBO and its queue is unknown
+    """
+
+    __slots__ = ("id", "stock", "buy_side", "qty", "remaining", "order_type", "limit_price", "level", "submit_time", "arrival_time", "queue_ahead", "status", "filled_value", "cost_to_borrow")
+
+    def __init__(self, id, stock, qty, buy_side, order_type, limit_price, submit_time, arrival_time, cost_to_borrow=0.0):
+
+        self.id = id
+        self.stock = stock
+        self.qty = qty
+        self.remaining = qty
+        self.buy_side = buy_side
+        self.order_type = order_type
+        self.limit_price = limit_price
+        self.level = price_key(limit_price) if limit_price is not None else None
+        self.submit_time = submit_time
+        self.arrival_time = arrival_time
+        self.queue_ahead = None
+        self.status = "pending"
+        self.filled_value = 0.0
+        self.cost_to_borrow = cost_to_borrow
+
+    @property
+    def filled_qty(self):
+        return self.qty - self.remaining
+
+    @property
+    def avg_fill_price(self):
+        filled = self.qty - self.remaining
+        return self.filled_value / filled if filled else 0.0
+
+    def __repr__(self):
+        side = "buy" if self.buy_side else "sell"
+        return f"Order({self.id}, {self.stock}, {side} {self.remaining}/{self.qty} {self.order_type} @ {self.limit_price}, {self.status})"
+
+class BookSide:
+
+    """
+    Resting orders on one side of one stock grouped by price level
+    prices is kept sorted so crossed or traded-through levels are found with bisect,
+    levels maps a price key to {order id: order} in time priority (dicts keep insertion order),
+    so an order is removed from its level in O(1)
+    """
+
+    __slots__ = ("prices", "levels")
+
+    def __init__(self):
+
+        self.prices = []
+        self.levels = {}
+
+    def add(self, order):
+        level = self.levels.get(order.level)
+        if level is None:
+            level = self.levels[order.level] = {}
+            insort(self.prices, order.level)
+        level[order.id] = order
+
+    def remove(self, order):
+        level = self.levels[order.level]
+        del level[order.id]
+        if not level:
+            self.drop_level(order.level)
+
+    def drop_level(self, key):
+        del self.levels[key]
+        del self.prices[bisect_left(self.prices, key)]
+
+    def __len__(self):
+        return sum(len(level) for level in self.levels.values())
+
+class MatchingEngine:
+
+    """
+    Event driven fills for market, limit and IOC orders on top of a MarketSimulator
+    Orders reach the exchange latency_ns after they are submitted, market orders and
+    the marketable part of limit/IOC orders then take the displayed NBBO size,
+    the rest of a limit order rests in the book until later quotes or trades reach it
+    Resting orders fill at their limit price when:
+        - a trade prints through their price (fully filled)
+        - a trade prints at their price, after the estimated queue ahead is used up
+        - the opposite side of the NBBO crosses their price (fully filled), or touches it
+          (treated like a trade of the displayed size)
+    Trades carry no aggressor side so a print at a price counts for both sides of the book
+    Fills are booked with MarketSimulator.apply_fill so positions and PnL work as with fill_order
+    Feed it with on_sample(sample) from a DataInterface, or call on_quote/on_trade directly
+    """
+
+    def __init__(self, simulator, latency_ns=0, size_multiplier=1, on_fill=None):
+
+        """
+        simulator: (MarketSimulator) books the fills, its slippage model prices market orders
+        latency_ns: (int) order and cancel travel time to the exchange in nanoseconds
+        size_multiplier: (int) shares per unit of quoted size, e.g. 100 for quotes in round lots
+        on_fill: (callable) called with each fill dict as it happens
+        """
+
+        self.simulator = simulator
+        self.latency = int(latency_ns)
+        self.size_multiplier = size_multiplier
+        self.on_fill = on_fill
+
+        self.orders = {}
+        self.stock_orders = {}
+        self.books = {}
+        self.NBBOs = {}
+        self.last_trade_times = {}
+
+        self._events = []
+        self._ids = itertools.count(1)
+        self._sequence = itertools.count()
+        self._fills = []
+
+    def submit(self, stock, order_qty, timestamp, buy_side=True, order_type=LIMIT, limit_price=None, cost_to_borrow=0.0):
+
+        """
+        Sends an order, returns the Order so its status and fills can be followed
+        stock: (str) stock ticker symbol
+        order_qty: (int) quantity of shares
+        timestamp: (int) Unix nanosecond timestamp the order is sent at
+        buy_side: (bool) True for buy orders, False for sell orders
+        order_type: (str) "market", "limit" or "ioc"
+        limit_price: (float) required for limit and IOC orders
+        """
+
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"Unknown order type: {order_type}, expected one of {ORDER_TYPES}")
+        if order_type != MARKET and limit_price is None:
+            raise ValueError(f"{order_type} orders need a limit_price")
+        if order_qty <= 0:
+            raise ValueError("order_qty must be positive")
+
+        order = Order(next(self._ids), stock, order_qty, buy_side, order_type, limit_price if order_type != MARKET else None, timestamp, timestamp + self.latency, cost_to_borrow)
+        self.orders[order.id] = order
+        self.stock_orders.setdefault(stock, {})[order.id] = order
+        heapq.heappush(self._events, (order.arrival_time, next(self._sequence), True, order))
+
+        if self.latency == 0:
+            self._fills = []
+            self._process_events(timestamp)
+
+        return order
+
+    def cancel(self, order_id, timestamp):
+
+        """
+        Requests a cancel that takes effect latency_ns after timestamp
+        Fills that happen before then still count
+        Returns False if the order is already done
+        """
+
+        order = self.orders.get(order_id)
+        if order is None:
+            return False
+
+        heapq.heappush(self._events, (timestamp + self.latency, next(self._sequence), False, order))
+        if self.latency == 0:
+            self._fills = []
+            self._process_events(timestamp)
+
+        return True
+
+    def open_orders(self, stock=None):
+
+        """
+        Returns the pending and resting orders, optionally for one stock
+        """
+
+        if stock is None:
+            return list(self.orders.values())
+        return list(self.stock_orders.get(stock, {}).values())
+
+    def open_order_count(self, stock=None):
+
+        """
+        Returns how many orders are pending or resting, optionally for one stock, in O(1)
+        """
+
+        if stock is None:
+            return len(self.orders)
+        return len(self.stock_orders.get(stock, ()))
+
+    def on_sample(self, sample):
+
+        """
+        Advances the engine with a sample from DataInterface.next_sample
+        A new trade is detected from last_trade["timestamp"] and handled before the quote
+        Returns the list of fills this sample caused
+        """
+
+        stock = sample.symbol
+        NBBO = sample.NBBO
+        trade = sample.last_trade
+        fills = []
+
+        trade_time = trade.get("timestamp")
+        if trade_time and trade_time != self.last_trade_times.get(stock):
+            self.last_trade_times[stock] = trade_time
+            fills += self.on_trade(stock, trade.get("price"), trade.get("size"), trade_time)
+
+        fills += self.on_quote(stock, NBBO.get("bid", 0), NBBO.get("ask", 0), NBBO.get("bid_size", 0), NBBO.get("ask_size", 0), sample.temporal)
+        return fills
+
+    def on_quote(self, stock, bid, ask, bid_size, ask_size, timestamp):
+
+        """
+        Updates the NBBO of a stock and fills resting orders it crosses
+        Orders and cancels due by timestamp are handled first against the previous NBBO
+        Returns the list of fills
+        """
+
+        self._fills = fills = []
+        self._process_events(timestamp)
+        previous = self.NBBOs.get(stock, (0, 0, 0, 0))
+        self.NBBOs[stock] = (bid, ask, bid_size, ask_size)
+
+        book = self.books.get(stock)
+        if book is None:
+            return fills
+        bids, asks = book
+        multiplier = self.size_multiplier
+
+        if ask > 0 and bids.prices:
+            key = price_key(ask)
+            crossed = bids.prices[bisect_right(bids.prices, key):]
+            for level in reversed(crossed):
+                self._fill_level_through(bids, level, timestamp)
+            # A touch only counts when the ask first moves onto the price, a locked market that stays put is not new volume
+            if key in bids.levels and price_key(previous[1]) != key:
+                self._fill_level_at(bids, key, ask_size * multiplier, timestamp)
+
+        if bid > 0 and asks.prices:
+            key = price_key(bid)
+            crossed = asks.prices[:bisect_left(asks.prices, key)]
+            for level in crossed:
+                self._fill_level_through(asks, level, timestamp)
+            if key in asks.levels and price_key(previous[0]) != key:
+                self._fill_level_at(asks, key, bid_size * multiplier, timestamp)
+
+        # Displayed size at our price can only shrink the queue ahead, cancels are assumed to come from ahead of us
+        if bid > 0:
+            self._update_queue(bids.levels.get(price_key(bid)), bid_size * multiplier)
+        if ask > 0:
+            self._update_queue(asks.levels.get(price_key(ask)), ask_size * multiplier)
+
+        return fills
+
+    def on_trade(self, stock, price, size, timestamp):
+
+        """
+        Fills resting orders that a trade printed through or at
+        Returns the list of fills
+        """
+
+        self._fills = fills = []
+        self._process_events(timestamp)
+
+        book = self.books.get(stock)
+        if book is None or not price or not size:
+            return fills
+        bids, asks = book
+        key = price_key(price)
+
+        if bids.prices:
+            through = bids.prices[bisect_right(bids.prices, key):]
+            for level in reversed(through):
+                self._fill_level_through(bids, level, timestamp)
+            if key in bids.levels:
+                self._fill_level_at(bids, key, size, timestamp)
+
+        if asks.prices:
+            through = asks.prices[:bisect_left(asks.prices, key)]
+            for level in through:
+                self._fill_level_through(asks, level, timestamp)
+            if key in asks.levels:
+                self._fill_level_at(asks, key, size, timestamp)
+
+        return fills
+
+    def advance(self, timestamp):
+
+        """
+        Handles orders and cancels due by timestamp without new market data
+        Returns the list of fills
+        """
+
+        self._fills = fills = []
+        self._process_events(timestamp)
+        return fills
+
+    def _process_events(self, now):
+
+        events = self._events
+        while events and events[0][0] <= now:
+            _, _, arrival, order = heapq.heappop(events)
+            if order.status not in ("pending", "open"):
+                continue
+            if arrival:
+                self._arrive(order)
+            else:
+                self._remove(order, "cancelled")
+
+    def _arrive(self, order):
+
+        NBBO = self.NBBOs.get(order.stock)
+        timestamp = order.arrival_time
+
+        if order.order_type == MARKET:
+            if NBBO is None or NBBO[0] <= 0 or NBBO[1] <= 0:
+                self._remove(order, "rejected")
+                return
+            bid, ask, bid_size, ask_size = NBBO
+            NBBO_dict = {"bid": bid, "ask": ask, "bid_size": bid_size * self.size_multiplier, "ask_size": ask_size * self.size_multiplier}
+            avg_price, filled_qty = self.simulator.slippage_model.calculate_slippage(NBBO_dict, order.remaining, order.buy_side)
+            if filled_qty > 0:
+                self._fill(order, avg_price, min(filled_qty, order.remaining), timestamp, "taker")
+            if order.remaining > 0:
+                self._remove(order, "cancelled")
+            return
+
+        # Marketable part of a limit or IOC order takes the displayed size on the other side
+        if NBBO is not None:
+            bid, ask, bid_size, ask_size = NBBO
+            if order.buy_side and ask > 0 and price_key(ask) <= order.level:
+                qty = min(order.remaining, ask_size * self.size_multiplier)
+                if qty > 0:
+                    self._fill(order, ask, qty, timestamp, "taker")
+            elif not order.buy_side and bid > 0 and price_key(bid) >= order.level:
+                qty = min(order.remaining, bid_size * self.size_multiplier)
+                if qty > 0:
+                    self._fill(order, bid, qty, timestamp, "taker")
+
+        if order.status != "pending":
+            return
+        if order.order_type == IOC:
+            self._remove(order, "cancelled")
+            return
+
+        # Joining the NBBO queues behind its displayed size, improving on it puts the order first
+        order.status = "open"
+        if NBBO is not None:
+            best, best_size = (NBBO[0], NBBO[2]) if order.buy_side else (NBBO[1], NBBO[3])
+            if best > 0:
+                best_key = price_key(best)
+                if best_key == order.level:
+                    order.queue_ahead = best_size * self.size_multiplier
+                elif (order.level > best_key) == order.buy_side:
+                    order.queue_ahead = 0
+
+        book = self.books.get(order.stock)
+        if book is None:
+            book = self.books[order.stock] = (BookSide(), BookSide())
+        book[0 if order.buy_side else 1].add(order)
+
+    def _fill_level_through(self, side, key, timestamp):
+
+        # The market traded past this price so every order resting at it would have filled
+        level = side.levels[key]
+        for order in level.values():
+            order.status = "filled"
+            self._fill(order, order.limit_price, order.remaining, timestamp, "maker")
+            self._forget(order)
+        side.drop_level(key)
+
+    def _fill_level_at(self, side, key, volume, timestamp):
+
+        """
+        Hands volume traded at a resting price to the orders there in time priority
+        Each order's queue ahead shrinks by the volume not taken by our orders in front of it
+        Unknown queues are treated as empty
+        """
+
+        level = side.levels[key]
+        done = []
+        taken = 0
+        for order in level.values():
+            seen = volume - taken
+            if seen <= 0:
+                break
+            ahead = order.queue_ahead or 0
+            order.queue_ahead = max(ahead - seen, 0)
+            qty = min(order.remaining, seen - ahead)
+            if qty > 0:
+                self._fill(order, order.limit_price, qty, timestamp, "maker")
+                taken += qty
+                if order.remaining == 0:
+                    done.append(order)
+
+        for order in done:
+            del level[order.id]
+            order.status = "filled"
+            self._forget(order)
+        if not level:
+            side.drop_level(key)
+
+    def _update_queue(self, level, displayed):
+        if level is None:
+            return
+        for order in level.values():
+            if order.queue_ahead is None or order.queue_ahead > displayed:
+                order.queue_ahead = displayed
+
+    def _fill(self, order, price, qty, timestamp, liquidity):
+
+        self.simulator.apply_fill(order.stock, price, qty, timestamp, order.buy_side, order.cost_to_borrow)
+        order.remaining -= qty
+        order.filled_value += price * qty
+
+        fill = {
+            "order_id": order.id,
+            "stock": order.stock,
+            "price": price,
+            "qty": qty,
+            "buy_side": order.buy_side,
+            "timestamp": timestamp,
+            "liquidity": liquidity
+        }
+        self._fills.append(fill)
+        if self.on_fill is not None:
+            self.on_fill(fill)
+
+        if order.remaining == 0 and order.status == "pending":
+            self._remove(order, "filled")
+
+    def _remove(self, order, status):
+
+        # Takes an order out of the engine, and out of the book if it was resting
+        if order.status == "open":
+            self.books[order.stock][0 if order.buy_side else 1].remove(order)
+        order.status = status
+        self._forget(order)
+
+    def _forget(self, order):
+        if self.orders.pop(order.id, None) is not None:
+            del self.stock_orders[order.stock][order.id]
@@ -0,0 +1,98 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+
+from src.interface import DataInterface
+
+class MultiDataInterface:
+
+    """
+    Streams several tickers as one timestamp ordered sequence of samples
+    Each ticker gets its own DataInterface and their samples are k-way merged with a heap
+    Samples carry the ticker in sample.symbol, e.g. for MarketSimulator.fill_order(sample.symbol, ...)
+    With streaming=True every ticker only holds its current page so memory stays bounded per ticker
+    """
+
+    def __init__(self, api_key, tickers, dates, synchronized=False, max_workers=None, prefetch_days=1, streaming=False, **interface_kwargs):
+
+        """
+        tickers: (list) ticker symbols to merge
+        dates: (list) dates shared by every ticker
+        synchronized: (bool) keep the latest NBBO of every ticker for latest_NBBOs()
+        max_workers: (int) threads used to load tickers concurrently, defaults to one per ticker
+        prefetch_days: (int) days each ticker downloads ahead in the background, ignored when streaming
+        interface_kwargs: passed to every DataInterface, e.g. use_NY_hours, cache, session
+        """
+
+        self.tickers = list(tickers)
+        self.dates = dates
+        self.synchronized = synchronized
+        self.max_workers = max_workers or max(len(self.tickers), 1)
+
+        self.interfaces = [
+            DataInterface(api_key, ticker, dates, prefetch_days=0 if streaming else prefetch_days, streaming=streaming, **interface_kwargs)
+            for ticker in self.tickers
+        ]
+
+        self._heap = None
+        self._advance = None
+        self._latest = {}
+
+        self.last_sample = None
+
+    def _push(self, i, sample):
+        if sample is not None:
+            heapq.heappush(self._heap, (sample.temporal, i))
+
+    def next_sample(self, limit=50000, max_iter=10000):
+
+        """
+        Returns the next sample across all tickers in timestamp order, None when every ticker is done
+        The sample stays valid until the next call, call .copy() to keep it
+        """
+
+        if self._heap is None:
+            # First day of every ticker is loaded concurrently, later days come from each interface's prefetcher
+            self._heap = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                firsts = list(pool.map(lambda DI: DI.next_sample(limit, max_iter), self.interfaces))
+            for i, sample in enumerate(firsts):
+                self._push(i, sample)
+
+        # The ticker handed out last time is only advanced now so its sample stayed valid until this call
+        if self._advance is not None:
+            self._push(self._advance, self.interfaces[self._advance].next_sample(limit, max_iter))
+            self._advance = None
+
+        if not self._heap:
+            return None
+
+        _, i = heapq.heappop(self._heap)
+        sample = self.interfaces[i].last_sample
+        self._advance = i
+
+        if self.synchronized:
+            NBBO = sample.NBBO
+            self._latest[sample.symbol] = (NBBO.get("bid"), NBBO.get("ask"), NBBO.get("bid_size"), NBBO.get("ask_size"), sample.temporal)
+
+        self.last_sample = sample
+
+        return sample
+
+    def latest_NBBOs(self):
+
+        """
+        Returns {ticker: NBBO dict} with the most recent quote seen for every ticker so far
+        Each NBBO dict also holds the quote "timestamp", requires synchronized=True
+        """
+
+        if not self.synchronized:
+            raise Exception("latest_NBBOs requires synchronized=True")
+
+        return {
+            symbol: {"bid": bid, "ask": ask, "bid_size": bid_size, "ask_size": ask_size, "timestamp": timestamp}
+            for symbol, (bid, ask, bid_size, ask_size, timestamp) in self._latest.items()
+        }
+
+    def close(self):
+        for DI in self.interfaces:
+            DI.close()
@@ -0,0 +1,333 @@
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+# The profiler the built-in hooks report to, None when profiling is off
+# Hooks read this once per call, so a disabled run only pays for an attribute lookup
+active = None
+
+class _NullTimer:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+class StackSampler:
+
+    """
+    Dependency free sampling profiler
+    A background thread looks at one thread's stack every interval seconds and
+    counts the innermost frame and every function on the stack
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.own = Counter()
+        self.total = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[_frame_name(frame)] += 1
+            seen = set()
+            while frame is not None:
+                name = _frame_name(frame)
+                if name not in seen:
+                    seen.add(name)
+                    self.total[name] += 1
+                frame = frame.f_back
+
+    def top(self, n=25):
+
+        """
+        Returns the n functions seen most often as the innermost frame
+        """
+
+        return [
+            {"function": name, "own_share": count / self.samples, "total_share": self.total[name] / self.samples}
+            for name, count in self.own.most_common(n)
+        ]
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+class Profiler:
+
+    """
+    Named timers, counters and gauges for a backtest run
+    The data pipeline, MarketSimulator and Grapher report here while the profiler is active,
+    strategy code can be timed with profiler.timer("strategy") or the timed decorator
+    sampler adds a function level view: "sampling" uses StackSampler, "cprofile" uses cProfile
+    (exact call counts but a much larger slowdown)
+    Usage:
+        profiler = profiling.enable()
+        ... run the backtest ...
+        profiling.disable()
+        print(profiler.format_report())
+    """
+
+    def __init__(self, sampler=None, sample_interval=0.005):
+
+        """
+        sampler: (str) None, "sampling" or "cprofile"
+        sample_interval: (float) seconds between stack samples for the "sampling" sampler
+        """
+
+        if sampler not in (None, "sampling", "cprofile"):
+            raise ValueError(f"Unknown sampler: {sampler}, expected None, 'sampling' or 'cprofile'")
+
+        self.sampler = sampler
+        self.sample_interval = sample_interval
+
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+        self.started = None
+        self.stopped = None
+        self._cprofile = None
+        self._stack_sampler = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.stopped = None
+        if self.sampler == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif self.sampler == "sampling":
+            self._stack_sampler = StackSampler(self.sample_interval)
+            self._stack_sampler.start()
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._stack_sampler is not None:
+            self._stack_sampler.stop()
+
+    def timer(self, name):
+
+        """
+        Context manager adding the time spent inside it to the named timer
+        """
+
+        return _Timer(self, name)
+
+    def add_time(self, name, seconds, calls=1):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [calls, seconds, seconds]
+            else:
+                timer[0] += calls
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def wall_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.stopped if self.stopped is not None else time.perf_counter()) - self.started
+
+    def report(self, top=25):
+
+        """
+        Returns the run as a dict that can be dumped to JSON
+        Timers hold calls, calls per second, total seconds, mean/max microseconds and share of wall time
+        (timers on other threads, like prefetching, can overlap the main thread)
+        Counters come with a per second rate over the wall time, e.g. http.bytes/sec
+        Ticks/sec is the per second rate of the next_sample timer
+        """
+
+        wall = self.wall_seconds()
+
+        with self.lock:
+            timers = {
+                name: {
+                    "calls": calls,
+                    "seconds": seconds,
+                    "mean_us": seconds / calls * 1e6 if calls else 0.0,
+                    "max_us": longest * 1e6,
+                    "per_second": calls / wall if wall else 0.0,
+                    "share": seconds / wall if wall else 0.0
+                }
+                for name, (calls, seconds, longest) in sorted(self.timers.items(), key=lambda item: -item[1][1])
+            }
+            counters = {name: {"value": value, "per_second": value / wall if wall else 0.0} for name, value in sorted(self.counters.items())}
+
+        return {
+            "wall_seconds": wall,
+            "timers": timers,
+            "counters": counters,
+            "gauges": dict(self.gauges),
+            "profile": self._profile_rows(top)
+        }
+
+    def _profile_rows(self, top):
+
+        if self._stack_sampler is not None:
+            return self._stack_sampler.top(top)
+
+        if self._cprofile is not None:
+            stats = pstats.Stats(self._cprofile, stream=io.StringIO())
+            rows = []
+            for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+                rows.append({"function": f"{filename}:{line}({function})", "calls": calls, "own_seconds": own, "cumulative_seconds": cumulative})
+            rows.sort(key=lambda row: -row["own_seconds"])
+            return rows[:top]
+
+        return None
+
+    def format_report(self, top=15):
+
+        """
+        Returns the report as a plain text table
+        """
+
+        report = self.report(top)
+        lines = [f"wall time: {report['wall_seconds']:.3f} s", "", f"{'timer':32s} {'calls':>10s} {'calls/s':>12s} {'total s':>10s} {'mean us':>10s} {'max us':>10s} {'share':>7s}"]
+        for name, row in report["timers"].items():
+            lines.append(f"{name:32s} {row['calls']:10d} {row['per_second']:12,.0f} {row['seconds']:10.3f} {row['mean_us']:10.1f} {row['max_us']:10.1f} {row['share']:7.1%}")
+
+        if report["counters"]:
+            lines += ["", f"{'counter':32s} {'value':>14s} {'per second':>14s}"]
+            for name, counter in report["counters"].items():
+                lines.append(f"{name:32s} {counter['value']:14,.0f} {counter['per_second']:14,.1f}")
+
+        if report["gauges"]:
+            lines += ["", "gauges:"]
+            lines += [f"  {name}: {value}" for name, value in report["gauges"].items()]
+
+        if report["profile"]:
+            lines += ["", "profile:"]
+            for row in report["profile"]:
+                if "own_share" in row:
+                    lines.append(f"  {row['own_share']:6.1%} own {row['total_share']:6.1%} total  {row['function']}")
+                else:
+                    lines.append(f"  {row['own_seconds']:8.3f} s own {row['cumulative_seconds']:8.3f} s cum {row['calls']:9d} calls  {row['function']}")
+
+        return "\n".join(lines)
+
+    def save(self, path, top=25):
+
+        """
+        Writes the report as JSON
+        """
+
+        with open(path, "w") as f:
+            json.dump(self.report(top), f, indent=2)
+
+def enable(profiler=None, **kwargs):
+
+    """
+    Starts a Profiler and makes it the one the built-in hooks report to
+    kwargs are passed to Profiler when none is given
+    Returns the profiler
+    """
+
+    global active
+    if profiler is None:
+        profiler = Profiler(**kwargs)
+    profiler.start()
+    active = profiler
+    return profiler
+
+def disable():
+
+    """
+    Stops the active profiler and detaches the hooks, returns it
+    """
+
+    global active
+    profiler = active
+    active = None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+def timer(name):
+
+    """
+    profiler.timer(name) on the active profiler, a no-op context manager when profiling is off
+    """
+
+    profiler = active
+    if profiler is None:
+        return _NULL_TIMER
+    return profiler.timer(name)
+
+def timed(name):
+
+    """
+    Decorator timing every call of a function under name while a profiler is active
+    """
+
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            profiler = active
+            if profiler is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.add_time(name, time.perf_counter() - start)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorate
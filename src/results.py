@@ -1,45 +1,143 @@
+import numpy as np
 import matplotlib.pyplot as plt
+from time import perf_counter
+from matplotlib.figure import Figure
+
+from src import profiling
+
+def minmax_decimate(x, ys, buckets):
+
+    """
+    Reduces a series to at most ~4 points per bucket keeping the first, last,
+    min and max of every bucket, so spikes survive at any zoom level
+    x: (np.ndarray) sorted x values
+    ys: (list) y arrays sharing x, the min/max picks are taken per array
+    buckets: (int) number of buckets, about the pixel width of the plot
+    Returns the sorted indices of the points to draw, shared by every y array
+    """
+
+    n = len(x)
+    if n <= buckets * 4:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    ends = edges[1:] - 1
+
+    keep = [starts, ends]
+    for y in ys:
+        keep.append(starts + _argreduce(y, edges, np.argmin))
+        keep.append(starts + _argreduce(y, edges, np.argmax))
+
+    return np.unique(np.concatenate(keep))
+
+def _argreduce(y, edges, fn):
+
+    # Buckets are equal width in rows, so trim to a whole number of rows and reshape when possible
+    counts = np.diff(edges)
+    if counts.min() == counts.max():
+        return fn(y[:edges[-1]].reshape(len(counts), counts[0]), axis=1)
+    return np.array([fn(y[a:b]) for a, b in zip(edges[:-1], edges[1:])])
 
 class Grapher:
 
     """
     Grapher class to visualize simulation results
     Self exaplanatory use -> see example1.py for usage
+    Data is kept in preallocated growable numpy arrays and plotted min/max decimated
+    stride: (int) only record every stride-th call to add_data
+    pixels: (int) horizontal resolution the plot is decimated to
     """
 
-    def __init__(self):
+    def __init__(self, stride=1, pixels=2000, capacity=65536):
+
+        self.stride = stride
+        self.pixels = pixels
+        self.calls = 0
 
-        self.timestamps = []
-        self.NBBOs = []
-        self.positions = []
-        self.pnls = []
+        # Preallocated columns, doubled when full, only [:size] is filled
+        self.size = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._bids = np.empty(capacity)
+        self._asks = np.empty(capacity)
+        self._positions = np.empty(capacity)
+        self._pnls = np.empty(capacity)
+
+    def _grow(self):
+        for name in ("_timestamps", "_bids", "_asks", "_positions", "_pnls"):
+            old = getattr(self, name)
+            new = np.empty(max(1, 2 * len(old)), dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
 
     def add_data(self, timestamp, NBBO, position, pnl):
 
-        self.timestamps.append(timestamp)
-        self.NBBOs.append(NBBO)
-        self.positions.append(position)
-        self.pnls.append(pnl)
+        profiler = profiling.active
+        if profiler is not None:
+            start = perf_counter()
 
-    def show_plot(self, title="Simulation Results"):
+        self.calls += 1
+        if self.stride > 1 and (self.calls - 1) % self.stride:
+            if profiler is not None:
+                profiler.add_time("grapher.add_data", perf_counter() - start)
+            return
+
+        i = self.size
+        if i == len(self._timestamps):
+            self._grow()
 
-        fig, axs = plt.subplots(3, 1, figsize=(12, 8), sharex=True)
+        self._timestamps[i] = timestamp
+        self._bids[i] = NBBO[0]
+        self._asks[i] = NBBO[1]
+        self._positions[i] = position
+        self._pnls[i] = pnl
+        self.size = i + 1
 
-        bids = [nbbo[0] for nbbo in self.NBBOs]
-        asks = [nbbo[1] for nbbo in self.NBBOs]
+        if profiler is not None:
+            profiler.add_time("grapher.add_data", perf_counter() - start)
 
-        axs[0].plot(self.timestamps, bids, color='tab:blue', label='Bid')
-        axs[0].plot(self.timestamps, asks, color='tab:orange', label='Ask')
+    @property
+    def timestamps(self):
+        return self._timestamps[:self.size]
+
+    @property
+    def NBBOs(self):
+        return np.column_stack((self._bids[:self.size], self._asks[:self.size]))
+
+    @property
+    def positions(self):
+        return self._positions[:self.size]
+
+    @property
+    def pnls(self):
+        return self._pnls[:self.size]
+
+    def _draw(self, fig, title):
+
+        timestamps = self.timestamps
+        bids = self._bids[:self.size]
+        asks = self._asks[:self.size]
+        positions = self.positions
+        pnls = self.pnls
+
+        # One index set for every panel keeps the shared x axis aligned
+        keep = minmax_decimate(timestamps, [bids, asks, positions, pnls], self.pixels)
+        timestamps = timestamps[keep]
+
+        axs = fig.subplots(3, 1, sharex=True)
+
+        axs[0].plot(timestamps, bids[keep], color='tab:blue', label='Bid')
+        axs[0].plot(timestamps, asks[keep], color='tab:orange', label='Ask')
         axs[0].set_ylabel('NBBO')
         axs[0].legend()
         axs[0].set_title('Bid/Ask')
 
-        axs[1].plot(self.timestamps, self.positions, color='tab:red', label='Position')
+        axs[1].plot(timestamps, positions[keep], color='tab:red', label='Position')
         axs[1].set_ylabel('Position')
         axs[1].legend()
         axs[1].set_title('Position')
 
-        axs[2].plot(self.timestamps, self.pnls, color='tab:green', label='PnL')
+        axs[2].plot(timestamps, pnls[keep], color='tab:green', label='PnL')
         axs[2].set_ylabel('PnL')
         axs[2].legend()
         axs[2].set_title('PnL')
@@ -47,4 +145,21 @@ class Grapher:
 
         fig.suptitle(title)
         fig.tight_layout(rect=[0, 0.03, 1, 0.95])
-        plt.show()
\ No newline at end of file
+
+    def show_plot(self, title="Simulation Results"):
+
+        fig = plt.figure(figsize=(12, 8))
+        self._draw(fig, title)
+        plt.show()
+
+    def save_plot(self, path, title="Simulation Results", dpi=100):
+
+        """
+        Renders the plot straight to a file without going through pyplot
+        Needs no display so it is safe in batch jobs
+        path: (str) output file, format taken from the extension (.png, .pdf, .svg)
+        """
+
+        fig = Figure(figsize=(12, 8))
+        self._draw(fig, title)
+        fig.savefig(path, dpi=dpi)
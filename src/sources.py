@@ -0,0 +1,147 @@
+import os
+import numpy as np
+
+from src.interface import DayData, DAY_COLUMNS
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMATS = ("npy", "npz", "arrow", "parquet")
+
+class DataSource:
+
+    """
+    Base class for places DataInterface can load days from
+    Other sources should inherit from this class and implement the load_day method
+    memory_mapped: sources whose columns are memory-mapped set this so DataInterface
+    serves the arrays in place instead of converting each day to lists
+    """
+
+    memory_mapped = False
+
+    def load_day(self, ticker, date, window, limit=50000, max_iter=10000):
+
+        """
+        ticker: (str) stock ticker symbol
+        date: (str) date as YYYY-MM-DD
+        window: (tuple) start and end Unix nanosecond timestamps of the requested hours
+        limit/max_iter: paging hints for sources that download, ignored otherwise
+        Returns an interface.DayData
+        """
+
+        raise NotImplementedError("Subclasses should implement this method.")
+
+def _require_pyarrow(fmt):
+    if pyarrow is None:
+        raise ImportError(f"The {fmt} format requires pyarrow, install it with pip install pyarrow")
+
+def _day_path(root, ticker, date, fmt):
+
+    # npy days are a directory of one file per column, the other formats are a single file
+    if fmt == "npy":
+        return os.path.join(root, ticker, date)
+    return os.path.join(root, ticker, f"{date}.{fmt}")
+
+class FileSource(DataSource):
+
+    """
+    Loads days exported with export_day/export_days from local storage
+    npy and arrow files are memory-mapped so columns are read without a copy,
+    npz and parquet are decoded into memory
+    Layout: root/<ticker>/<date>/<column>.npy or root/<ticker>/<date>.<fmt>
+    """
+
+    def __init__(self, root, fmt="npy", clip_to_window=True):
+
+        """
+        root: (str) directory the days were exported to
+        fmt: (str) one of "npy", "npz", "arrow", "parquet"
+        clip_to_window: (bool) only serve quotes inside the interface's requested hours
+        """
+
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt}, expected one of {FORMATS}")
+        if fmt in ("arrow", "parquet"):
+            _require_pyarrow(fmt)
+
+        self.root = root
+        self.fmt = fmt
+        self.clip_to_window = clip_to_window
+        self.memory_mapped = fmt in ("npy", "arrow")
+
+    def load_day(self, ticker, date, window, limit=50000, max_iter=10000):
+
+        path = _day_path(self.root, ticker, date, self.fmt)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No {self.fmt} data for {ticker} on {date} at {path}")
+
+        # Columns added after a day was exported are left out and defaulted by DayData
+        if self.fmt == "npy":
+            columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in DAY_COLUMNS if os.path.exists(os.path.join(path, f"{name}.npy"))}
+        elif self.fmt == "npz":
+            with np.load(path) as data:
+                columns = {name: data[name] for name in DAY_COLUMNS if name in data}
+        elif self.fmt == "arrow":
+            table = pyarrow.ipc.open_file(pyarrow.memory_map(path, "r")).read_all()
+            columns = {name: _arrow_column(table, name) for name in DAY_COLUMNS if name in table.column_names}
+        else:
+            table = pyarrow.parquet.read_table(path, memory_map=True)
+            columns = {name: _arrow_column(table, name) for name in DAY_COLUMNS if name in table.column_names}
+
+        if self.clip_to_window and window is not None:
+            # Timestamps are sorted so the window is a contiguous slice, still zero-copy
+            lo = np.searchsorted(columns["timestamps"], window[0], side="left")
+            hi = np.searchsorted(columns["timestamps"], window[1], side="right")
+            columns = {name: values[lo:hi] for name, values in columns.items()}
+
+        return DayData(date, *[columns.get(name) for name in DAY_COLUMNS])
+
+def _arrow_column(table, name):
+    column = table.column(name)
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    return column.to_numpy()
+
+def export_day(day, root, ticker, fmt="npy"):
+
+    """
+    Writes an interface.DayData so FileSource can load it back
+    Returns the path written
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}, expected one of {FORMATS}")
+
+    path = _day_path(root, ticker, day.date, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    columns = {name: np.ascontiguousarray(getattr(day, name)) for name in DAY_COLUMNS}
+
+    if fmt == "npy":
+        os.makedirs(path, exist_ok=True)
+        for name, values in columns.items():
+            np.save(os.path.join(path, f"{name}.npy"), values)
+    elif fmt == "npz":
+        np.savez(path, **columns)
+    else:
+        _require_pyarrow(fmt)
+        table = pyarrow.table(columns)
+        if fmt == "arrow":
+            with pyarrow.ipc.new_file(path, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pyarrow.parquet.write_table(table, path)
+
+    return path
+
+def export_days(DI, root, fmt="npy", limit=50000, max_iter=10000):
+
+    """
+    Loads every date of a DataInterface the way next_sample would and exports it
+    Returns the list of paths written
+    """
+
+    return [export_day(DI._load_day(i, limit, max_iter), root, DI.ticker, fmt) for i in range(len(DI.dates))]
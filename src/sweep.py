@@ -0,0 +1,163 @@
+import os
+import json
+import shutil
+import tempfile
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.interface import DataInterface, SampleCursor, DAY_COLUMNS
+from src.marketsimulator import MarketSimulator, IdealFillSlippageModel, ZeroCostStructure
+
+def expand_grid(param_grid):
+
+    """
+    Turns {"mean": [770, 780], "deviation": [10, 13]} into a list of parameter dicts
+    A list of dicts is passed through unchanged
+    """
+
+    if isinstance(param_grid, dict):
+        names = list(param_grid.keys())
+        return [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    return list(param_grid)
+
+# Column dtypes of the shared day files, the ones build_day produces
+DAY_DTYPES = {name: np.int64 if name in ("timestamps", "trade_timestamps") else np.float64 for name in DAY_COLUMNS}
+
+def write_days(DI, data_dir, limit=50000, max_iter=10000):
+
+    """
+    Loads every date of a DataInterface once and appends the days back to back
+    to one raw file per column plus an index of where each day starts
+    Each day is written as soon as it is loaded, so at most one day is held in memory
+    Workers memory-map these files so the data is shared through the page cache
+    """
+
+    dates = []
+    offsets = [0]
+    files = {name: open(os.path.join(data_dir, f"{name}.bin"), "wb") for name in DAY_COLUMNS}
+    try:
+        for i in range(len(DI.dates)):
+            day = DI._load_day(i, limit, max_iter)
+            for name, f in files.items():
+                np.ascontiguousarray(getattr(day, name), dtype=DAY_DTYPES[name]).tofile(f)
+            dates.append(day.date)
+            offsets.append(offsets[-1] + len(day))
+            day = None
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(os.path.join(data_dir, "days.json"), "w") as f:
+        json.dump({"dates": dates, "offsets": offsets, "dtypes": {name: np.dtype(dtype).str for name, dtype in DAY_DTYPES.items()}}, f)
+
+def load_days(data_dir):
+
+    """
+    Returns (columns, dates, offsets) with columns memory-mapped from write_days output
+    """
+
+    with open(os.path.join(data_dir, "days.json")) as f:
+        index = json.load(f)
+
+    rows = index["offsets"][-1]
+    columns = {}
+    for name in DAY_COLUMNS:
+        dtype = np.dtype(index["dtypes"][name])
+        # np.memmap refuses zero length files
+        columns[name] = np.memmap(os.path.join(data_dir, f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,)) if rows else np.zeros(0, dtype=dtype)
+
+    return columns, index["dates"], index["offsets"]
+
+def simulate_day(strategy, simulator, ticker, columns, start, end, cursor=None):
+
+    """
+    Runs the example1.py loop over rows [start, end) of the day columns
+    Quotes with a zero bid or ask are skipped
+    Returns the cursor left on the last valid quote, or None if there was none
+    """
+
+    bids = np.asarray(columns["bids"][start:end])
+    asks = np.asarray(columns["asks"][start:end])
+    valid = np.flatnonzero((bids != 0) & (asks != 0))
+    if len(valid) == 0:
+        return None
+
+    if cursor is None:
+        cursor = SampleCursor()
+    cursor.bind(*[np.asarray(columns[name][start:end])[valid].tolist() for name in DAY_COLUMNS])
+
+    NBBO = cursor.NBBO
+    positions = simulator.positions
+    for i in range(len(valid)):
+        cursor.index = i
+        order_qty, buy_side = strategy.get_order(NBBO, positions.get(ticker, 0))
+        if order_qty != 0:
+            simulator.fill_order(ticker, NBBO, order_qty, cursor.temporal, buy_side)
+
+    return cursor
+
+_worker_data = None
+
+def _init_worker(data_dir):
+    global _worker_data
+    _worker_data = load_days(data_dir)
+
+def _run_params(strategy_class, params, ticker, slippage_model, cost_structure):
+
+    columns, dates, offsets = _worker_data
+
+    strategy = strategy_class(**params)
+    simulator = MarketSimulator(slippage_model=slippage_model, cost_structure=cost_structure)
+
+    last = None
+    cursor = SampleCursor()
+    for d in range(len(dates)):
+        if simulate_day(strategy, simulator, ticker, columns, offsets[d], offsets[d + 1], cursor) is not None:
+            last = cursor
+
+    unrealized = simulator.get_stock_unrealized_PnL(ticker, last.NBBO) if last is not None else 0.0
+    realized = simulator.get_stock_Pnl(ticker)
+
+    return {
+        **params,
+        "realized_PnL": realized,
+        "unrealized_PnL": unrealized,
+        "total_PnL": realized + unrealized,
+        "position": simulator.positions.get(ticker, 0)
+    }
+
+def run_sweep(strategy_class, param_grid, api_key, ticker, dates, processes=None, slippage_model=IdealFillSlippageModel(), cost_structure=ZeroCostStructure(), data_dir=None, limit=50000, max_iter=10000, **interface_kwargs):
+
+    """
+    Runs strategy_class once per parameter set over the same market data
+    Each day is downloaded (or read from cache) once, written to memory-mapped
+    files and shared by a pool of worker processes
+    Returns a list of dicts, one per parameter set, with the parameters and
+    final realized_PnL, unrealized_PnL, total_PnL and position
+
+    strategy_class: (class) strategy built as strategy_class(**params), must be importable by workers
+    param_grid: (dict or list) {name: [values]} grid or a list of parameter dicts
+    processes: (int) worker processes, defaults to os.cpu_count()
+    data_dir: (str) where to keep the shared day files, a temporary directory by default
+    interface_kwargs: passed to DataInterface, e.g. use_NY_hours, cache, base_url
+    """
+
+    params_list = expand_grid(param_grid)
+
+    owns_dir = data_dir is None
+    if owns_dir:
+        data_dir = tempfile.mkdtemp(prefix="sweep")
+    else:
+        os.makedirs(data_dir, exist_ok=True)
+
+    try:
+        DI = DataInterface(api_key, ticker, dates, **interface_kwargs)
+        write_days(DI, data_dir, limit, max_iter)
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(data_dir,)) as pool:
+            futures = [pool.submit(_run_params, strategy_class, params, ticker, slippage_model, cost_structure) for params in params_list]
+            return [future.result() for future in futures]
+    finally:
+        if owns_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
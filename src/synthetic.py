@@ -0,0 +1,289 @@
+import json
+import zlib
+import threading
+import pytz
+import numpy as np
+from datetime import datetime
+from collections import OrderedDict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+from src.datastream import get_time_range
+from src.transport import orjson
+
+NS_PER_SECOND = 1_000_000_000
+
+# Trading seconds in a year, volatility is annualized over regular hours
+SECONDS_PER_YEAR = 252 * 6.5 * 3600
+
+class SyntheticMarket:
+
+    """
+    Reproducible random trades and quotes for any ticker and date
+    Quotes arrive as a Poisson process around a geometric random walk mid price,
+    with a spread of whole ticks and geometric sizes, trades print at the prevailing
+    bid or ask (sometimes inside) at their own Poisson rate
+    The same seed, ticker and date always give the same day
+    Columns follow datastream.TRADE_COLUMNS/QUOTE_COLUMNS plus the extra fields Polygon returns,
+    records() turns a slice of them into dicts shaped like the v3 trades/quotes results
+    """
+
+    def __init__(self, seed=0, start_price=100.0, quotes_per_second=10.0, trades_per_second=2.0, spread=0.02, volatility=0.3, tick_size=0.01, start_hour=4.0, end_hour=20.0, time_zone="US/Eastern", keep_days=4):
+
+        """
+        seed: (int) base seed, combined with the ticker and date
+        start_price: (float) typical price level, each day opens within a few percent of it
+        quotes_per_second/trades_per_second: (float) average event rates
+        spread: (float) typical quoted spread in price units, at least one tick
+        volatility: (float) annualized volatility of the mid price
+        tick_size: (float) price increment quotes and most trades are rounded to
+        start_hour/end_hour: (float) local hours each generated day covers
+        keep_days: (int) generated days kept in memory for repeated requests
+        """
+
+        self.seed = seed
+        self.start_price = start_price
+        self.quotes_per_second = quotes_per_second
+        self.trades_per_second = trades_per_second
+        self.spread = spread
+        self.volatility = volatility
+        self.tick_size = tick_size
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.time_zone = time_zone
+        self.keep_days = keep_days
+
+        self._days = OrderedDict()
+        self._lock = threading.Lock()
+
+    def day(self, ticker, date):
+
+        """
+        Returns (trades, quotes) column dicts for one ticker and date, sorted by sip_timestamp
+        """
+
+        key = (ticker, date)
+        with self._lock:
+            tables = self._days.get(key)
+            if tables is not None:
+                self._days.move_to_end(key)
+                return tables
+
+        tables = self._generate(ticker, date)
+
+        with self._lock:
+            self._days[key] = tables
+            while len(self._days) > self.keep_days:
+                self._days.popitem(last=False)
+
+        return tables
+
+    def _generate(self, ticker, date):
+
+        rng = np.random.default_rng([self.seed, zlib.crc32(f"{ticker}|{date}".encode())])
+        start, end = get_time_range(date, self.start_hour, self.end_hour, self.time_zone)
+        seconds = (end - start) / NS_PER_SECOND
+        tick = self.tick_size
+
+        # Poisson arrivals are uniform order statistics once the count is drawn
+        quote_times = np.sort(rng.integers(start, end, rng.poisson(self.quotes_per_second * seconds)))
+        trade_times = np.sort(rng.integers(start, end, rng.poisson(self.trades_per_second * seconds)))
+        n = len(quote_times)
+
+        open_price = self.start_price * np.exp(rng.normal(0, self.volatility / np.sqrt(252)))
+        dt = np.diff(quote_times, prepend=start) / NS_PER_SECOND
+        mid = open_price * np.exp(np.cumsum(rng.normal(0, self.volatility * np.sqrt(dt / SECONDS_PER_YEAR))))
+
+        spread_ticks = max(1, round(self.spread / tick)) + rng.geometric(0.7, n) - 1
+        bids = np.round(np.floor(mid / tick - spread_ticks / 2) * tick, 6)
+        asks = np.round(bids + spread_ticks * tick, 6)
+
+        quotes = {
+            "participant_timestamp": quote_times - rng.exponential(20_000, n).astype(np.int64),
+            "sip_timestamp": quote_times,
+            "bid_price": bids,
+            "ask_price": asks,
+            "bid_size": rng.geometric(0.3, n).astype(np.float64),
+            "ask_size": rng.geometric(0.3, n).astype(np.float64),
+            "bid_exchange": rng.integers(1, 20, n),
+            "ask_exchange": rng.integers(1, 20, n)
+        }
+
+        m = len(trade_times)
+        prevailing = np.maximum(np.searchsorted(quote_times, trade_times, side="right") - 1, 0)
+        if n == 0:
+            prices = np.full(m, round(open_price, 2))
+        else:
+            buy = rng.random(m) < 0.5
+            prices = np.where(buy, asks[prevailing], bids[prevailing])
+            inside = rng.random(m) < 0.1
+            prices[inside] = np.round((bids[prevailing[inside]] + asks[prevailing[inside]]) / 2, 4)
+
+        sizes = np.maximum(1, rng.lognormal(3.5, 1.3, m).astype(np.int64))
+        round_lot = rng.random(m) < 0.3
+        sizes[round_lot] = np.maximum(1, sizes[round_lot] // 100) * 100
+
+        trades = {
+            "participant_timestamp": trade_times - rng.exponential(20_000, m).astype(np.int64),
+            "sip_timestamp": trade_times,
+            "price": prices,
+            "size": sizes.astype(np.float64),
+            "exchange": rng.integers(1, 20, m)
+        }
+
+        return trades, quotes
+
+    def records(self, kind, columns, lo, hi):
+
+        """
+        Builds Polygon v3 shaped result dicts for rows [lo, hi) of a day's trades or quotes
+        kind: (str) "trades" or "quotes"
+        """
+
+        sip = columns["sip_timestamp"][lo:hi].tolist()
+        participant = columns["participant_timestamp"][lo:hi].tolist()
+
+        if kind == "trades":
+            return [
+                {"conditions": [12, 37], "exchange": exchange, "id": str(lo + i), "participant_timestamp": p, "price": price, "sequence_number": lo + i, "sip_timestamp": s, "size": size, "tape": 3}
+                for i, (p, s, price, size, exchange) in enumerate(zip(participant, sip, columns["price"][lo:hi].tolist(), columns["size"][lo:hi].tolist(), columns["exchange"][lo:hi].tolist()))
+            ]
+
+        return [
+            {"ask_exchange": ask_exchange, "ask_price": ask, "ask_size": ask_size, "bid_exchange": bid_exchange, "bid_price": bid, "bid_size": bid_size, "conditions": [1], "indicators": [604], "participant_timestamp": p, "sequence_number": lo + i, "sip_timestamp": s, "tape": 3}
+            for i, (p, s, bid, ask, bid_size, ask_size, bid_exchange, ask_exchange) in enumerate(zip(
+                participant, sip, columns["bid_price"][lo:hi].tolist(), columns["ask_price"][lo:hi].tolist(),
+                columns["bid_size"][lo:hi].tolist(), columns["ask_size"][lo:hi].tolist(),
+                columns["bid_exchange"][lo:hi].tolist(), columns["ask_exchange"][lo:hi].tolist()
+            ))
+        ]
+
+def _dumps(body):
+    if orjson is not None:
+        return orjson.dumps(body)
+    return json.dumps(body).encode()
+
+class _PolygonHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+
+        server = self.server
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "v3" or parts[1] not in ("trades", "quotes"):
+            return self._send(404, {"status": "NOT_FOUND", "message": f"Unknown path {url.path}"})
+
+        kind, ticker = parts[1], parts[2]
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        try:
+            lo = int(query["timestamp.gte"])
+            hi = int(query["timestamp.lte"])
+            limit = min(int(query.get("limit", 1000)), 50000)
+            cursor = int(query.get("cursor", 0))
+        except (KeyError, ValueError):
+            return self._send(400, {"status": "ERROR", "message": "timestamp.gte and timestamp.lte are required"})
+
+        with server.lock:
+            status = server.errors.popleft() if server.errors else None
+        if status is not None:
+            return self._send(status, {"status": "ERROR", "message": f"Injected {status}"}, {"Retry-After": "0"} if status == 429 else None)
+
+        if server.latency:
+            threading.Event().wait(server.latency)
+
+        market = server.market
+        date = datetime.fromtimestamp(lo / NS_PER_SECOND, pytz.timezone(market.time_zone)).strftime("%Y-%m-%d")
+        trades, quotes = market.day(ticker, date)
+        columns = trades if kind == "trades" else quotes
+
+        start = int(np.searchsorted(columns["sip_timestamp"], lo, side="left"))
+        end = int(np.searchsorted(columns["sip_timestamp"], hi, side="right"))
+        page_start = start + cursor
+        page_end = min(page_start + limit, end)
+
+        body = {"results": market.records(kind, columns, page_start, page_end), "status": "OK", "request_id": f"synthetic-{server.pages_served}"}
+        if page_end < end:
+            next_query = {name: value for name, value in query.items() if name != "apiKey"}
+            next_query["cursor"] = cursor + limit
+            body["next_url"] = f"{server.url}{url.path}?{urlencode(next_query)}"
+
+        with server.lock:
+            server.pages_served += 1
+        self._send(200, body)
+
+    def _send(self, status, body, headers=None):
+        data = _dumps(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class MockPolygonServer:
+
+    """
+    Local stand-in for the Polygon v3 trades and quotes endpoints serving a SyntheticMarket
+    Pages follow next_url like the real API, so DataInterface only needs base_url=server.url
+    Usage:
+        with MockPolygonServer(SyntheticMarket(seed=1)) as server:
+            DI = DataInterface("any key", "SYN", dates, base_url=server.url)
+    """
+
+    def __init__(self, market=None, host="127.0.0.1", port=0, latency=0.0, errors=()):
+
+        """
+        market: (SyntheticMarket) data to serve, a default SyntheticMarket if None
+        port: (int) 0 picks a free port
+        latency: (float) seconds added to every response
+        errors: (list) HTTP statuses answered to the first requests, one each, before serving data,
+            e.g. [429, 503] to exercise retries (429s carry Retry-After: 0)
+        """
+
+        self.market = market if market is not None else SyntheticMarket()
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.errors = errors
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self._server.server_port}"
+
+    @property
+    def pages_served(self):
+        return self._server.pages_served if self._server is not None else 0
+
+    def start(self):
+        server = ThreadingHTTPServer((self.host, self.port), _PolygonHandler)
+        server.daemon_threads = True
+        server.market = self.market
+        server.latency = self.latency
+        server.errors = deque(self.errors)
+        server.pages_served = 0
+        server.lock = threading.Lock()
+        self._server = server
+        server.url = self.url
+        self._thread = threading.Thread(target=server.serve_forever, name="mock-polygon", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
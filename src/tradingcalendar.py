@@ -0,0 +1,212 @@
+import pytz
+import numpy as np
+from datetime import date, datetime, timedelta
+
+# Closures outside the regular holiday rules (national days of mourning, weather)
+NYSE_SPECIAL_CLOSURES = (
+    "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14",
+    "2004-06-11", "2007-01-02", "2012-10-29", "2012-10-30",
+    "2018-12-05", "2025-01-09"
+)
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def _nth_weekday(year, month, weekday, n):
+
+    # n-th (1 based) weekday of a month, n=-1 for the last one
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _easter(year):
+
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def _observed(day):
+
+    # Saturday holidays move to Friday, Sunday holidays to Monday
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+def nyse_holidays(year):
+
+    """
+    Returns the set of NYSE full day holidays of a year under the current rules
+    """
+
+    holidays = {
+        _nth_weekday(year, 1, 0, 3) if year >= 1998 else None,
+        _nth_weekday(year, 2, 0, 3),
+        _easter(year) - timedelta(days=2),
+        _nth_weekday(year, 5, 0, -1),
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),
+        _nth_weekday(year, 11, 3, 4),
+        _observed(date(year, 12, 25))
+    }
+
+    # New Year's Day on a Saturday is not made up on the Friday before
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))
+
+    holidays.discard(None)
+    return holidays
+
+def nyse_early_closes(year):
+
+    """
+    Returns the set of NYSE 1pm early close days of a year
+    The day before Independence Day and Christmas Eve when they are Monday to Thursday,
+    and the day after Thanksgiving
+    """
+
+    early = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1)}
+    for day in (date(year, 7, 3), date(year, 12, 24)):
+        if day.weekday() < 4:
+            early.add(day)
+    return early
+
+class TradingCalendar:
+
+    """
+    Exchange sessions with holidays, early closes and extended hours, NYSE by default
+    Session bounds are computed once per date in Unix nanoseconds and kept,
+    so a whole backtest range costs one time zone conversion per session
+    """
+
+    def __init__(self, time_zone="US/Eastern", open_hour=9.5, close_hour=16.0, early_close_hour=13.0, pre_market_hour=4.0, post_market_hour=20.0, early_post_market_hour=17.0, holidays=nyse_holidays, early_closes=nyse_early_closes, special_closures=NYSE_SPECIAL_CLOSURES):
+
+        """
+        time_zone: (str) exchange time zone
+        open_hour/close_hour: (float) regular session in local hours
+        early_close_hour: (float) regular close on early close days
+        pre_market_hour/post_market_hour: (float) extended session bounds
+        early_post_market_hour: (float) extended close on early close days
+        holidays/early_closes: (callable) year -> set of datetime.date
+        special_closures: (iterable) extra closed dates as YYYY-MM-DD
+        """
+
+        self.tz = pytz.timezone(time_zone)
+        self.open_hour = open_hour
+        self.close_hour = close_hour
+        self.early_close_hour = early_close_hour
+        self.pre_market_hour = pre_market_hour
+        self.post_market_hour = post_market_hour
+        self.early_post_market_hour = early_post_market_hour
+        self._holiday_rule = holidays
+        self._early_close_rule = early_closes
+        self.special_closures = {_to_date(day) for day in special_closures}
+
+        self._years = {}
+        self._bounds = {}
+
+    def _year(self, year):
+        rules = self._years.get(year)
+        if rules is None:
+            rules = self._years[year] = (self._holiday_rule(year), self._early_close_rule(year))
+        return rules
+
+    def is_session(self, day):
+
+        """
+        True when the exchange is open on day (str YYYY-MM-DD, date or datetime)
+        """
+
+        day = _to_date(day)
+        return day.weekday() < 5 and day not in self._year(day.year)[0] and day not in self.special_closures
+
+    def is_early_close(self, day):
+        day = _to_date(day)
+        return self.is_session(day) and day in self._year(day.year)[1]
+
+    def holidays(self, start_date, end_date):
+
+        """
+        Returns the weekday closures between two dates (inclusive) as YYYY-MM-DD strings
+        """
+
+        start, end = _to_date(start_date), _to_date(end_date)
+        return [day.strftime("%Y-%m-%d") for day in _days(start, end) if day.weekday() < 5 and not self.is_session(day)]
+
+    def sessions(self, start_date, end_date):
+
+        """
+        Returns the session dates between two dates (inclusive) as YYYY-MM-DD strings
+        """
+
+        start, end = _to_date(start_date), _to_date(end_date)
+        return [day.strftime("%Y-%m-%d") for day in _days(start, end) if self.is_session(day)]
+
+    def session_range(self, day, extended=False):
+
+        """
+        Returns (open, close) Unix nanosecond timestamps of a session, None when day is not one
+        extended: (bool) pre-market open to post-market close instead of the regular session
+        """
+
+        day = _to_date(day)
+        key = (day, extended)
+        bounds = self._bounds.get(key)
+        if bounds is None:
+            if not self.is_session(day):
+                return None
+            early = day in self._year(day.year)[1]
+            if extended:
+                hours = (self.pre_market_hour, self.early_post_market_hour if early else self.post_market_hour)
+            else:
+                hours = (self.open_hour, self.early_close_hour if early else self.close_hour)
+            bounds = self._bounds[key] = (self._local_ns(day, hours[0]), self._local_ns(day, hours[1]))
+        return bounds
+
+    def session_bounds(self, dates, extended=False):
+
+        """
+        Precomputes and returns the bounds of many sessions at once
+        Returns an (n, 2) int64 array of open/close nanoseconds, rows of non-sessions are 0
+        """
+
+        out = np.zeros((len(dates), 2), dtype=np.int64)
+        for i, day in enumerate(dates):
+            bounds = self.session_range(day, extended)
+            if bounds is not None:
+                out[i] = bounds
+        return out
+
+    def _local_ns(self, day, hour):
+
+        # Same arithmetic as datastream.get_time_range so regular days give identical windows
+        minutes = int((hour - int(hour)) * 60)
+        local = self.tz.localize(datetime(day.year, day.month, day.day, int(hour), minutes))
+        return int(local.astimezone(pytz.utc).timestamp() * 1_000_000_000)
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+NYSE = TradingCalendar()
@@ -0,0 +1,230 @@
+import json
+import time
+import random
+import threading
+import requests
+from collections import deque
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+from src import profiling
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def get_json_loads(backend="auto"):
+
+    """
+    Returns a function decoding a JSON bytes body
+    backend: (str) "orjson", "json" or "auto" for orjson when installed and json otherwise
+    """
+
+    if backend == "auto":
+        backend = "orjson" if orjson is not None else "json"
+    if backend == "orjson":
+        if orjson is None:
+            raise ImportError("The orjson backend requires orjson, install it with pip install orjson")
+        return orjson.loads
+    if backend == "json":
+        return json.loads
+    raise ValueError(f"Unknown JSON backend: {backend}")
+
+class PolygonAPIError(Exception):
+
+    """
+    Raised when Polygon answers with a status that retrying will not fix
+    or when retries on 429/5xx are exhausted
+    """
+
+    def __init__(self, status_code, text, url=None):
+
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+
+        super().__init__(f"API error: {status_code} - {text}")
+
+class RateLimiter:
+
+    """
+    Spaces out requests so no more than requests_per_second are started
+    Shared across threads, None or 0 disables limiting
+    """
+
+    def __init__(self, requests_per_second=None):
+
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+
+        if start > now:
+            time.sleep(start - now)
+
+class PolygonSession:
+
+    """
+    Transport shared by the Polygon stream generators
+    Pooled keep-alive connections, compressed responses, timeouts,
+    exponential backoff with jitter on 429/5xx and an optional rate limit
+    Per page latency and byte counts are kept in page_stats and totals in stats
+    """
+
+    def __init__(self, requests_per_second=None, max_retries=5, backoff=0.5, max_backoff=30.0, timeout=(5.0, 60.0), pool_size=10, keep_pages=1000, on_page=None, json_backend="auto"):
+
+        """
+        requests_per_second: (float) request rate limit, None for unlimited
+        max_retries: (int) retries on 429/5xx and connection errors before giving up
+        backoff: (float) base delay in seconds, doubled every retry
+        max_backoff: (float) cap on a single retry delay in seconds
+        timeout: (tuple) connect and read timeouts in seconds
+        pool_size: (int) keep-alive connections kept per host
+        keep_pages: (int) how many recent page records page_stats holds
+        on_page: (callable) called with each page record dict, e.g. for logging
+        json_backend: (str) see get_json_loads, orjson is used when installed
+        """
+
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.on_page = on_page
+        self.loads = get_json_loads(json_backend)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+
+        self.limiter = RateLimiter(requests_per_second)
+
+        self.page_stats = deque(maxlen=keep_pages)
+        self.stats = {"pages": 0, "retries": 0, "bytes": 0, "wire_bytes": 0, "seconds": 0.0}
+        self.stats_lock = threading.Lock()
+
+    def get_json(self, url):
+
+        """
+        GETs url and returns the decoded JSON body
+        Retries 429/5xx and connection errors, raises PolygonAPIError otherwise
+        """
+
+        attempt = 0
+        while True:
+            self.limiter.wait()
+
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep_before_retry(attempt, None)
+                attempt += 1
+                continue
+            latency = time.perf_counter() - start
+
+            if response.status_code == 200:
+                self._record_page(url, response, latency, attempt)
+                profiler = profiling.active
+                if profiler is None:
+                    return self.loads(response.content)
+                start = time.perf_counter()
+                data = self.loads(response.content)
+                profiler.add_time("json.decode", time.perf_counter() - start)
+                return data
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self._sleep_before_retry(attempt, response.headers.get("Retry-After"))
+                attempt += 1
+                continue
+
+            raise PolygonAPIError(response.status_code, response.text, _strip_query(url))
+
+    def _sleep_before_retry(self, attempt, retry_after):
+
+        # Full jitter keeps parallel streams from retrying in lockstep
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+
+        with self.stats_lock:
+            self.stats["retries"] += 1
+        profiler = profiling.active
+        if profiler is not None:
+            profiler.count("http.retries")
+
+        time.sleep(delay)
+
+    def _record_page(self, url, response, latency, retries):
+
+        size = len(response.content)
+        try:
+            wire_size = response.raw.tell() or size
+        except Exception:
+            wire_size = size
+
+        record = {
+            "url": _strip_query(url),
+            "latency": latency,
+            "bytes": size,
+            "wire_bytes": wire_size,
+            "retries": retries
+        }
+
+        with self.stats_lock:
+            self.page_stats.append(record)
+            self.stats["pages"] += 1
+            self.stats["bytes"] += size
+            self.stats["wire_bytes"] += wire_size
+            self.stats["seconds"] += latency
+
+        profiler = profiling.active
+        if profiler is not None:
+            profiler.add_time("http.page", latency)
+            profiler.count("http.bytes", size)
+            profiler.count("http.wire_bytes", wire_size)
+
+        if self.on_page is not None:
+            self.on_page(record)
+
+    def close(self):
+        self.session.close()
+
+def _strip_query(url):
+
+    # Keeps the api key out of stats and error messages
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+def get_default_session():
+
+    """
+    Returns the process wide PolygonSession used when no session is passed
+    """
+
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = PolygonSession()
+        return _default_session
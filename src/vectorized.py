@@ -0,0 +1,166 @@
+import numpy as np
+
+class VectorizedResult:
+
+    """
+    Per quote output of a vectorized run over one day
+    Only quotes with a non-zero bid and ask are included, as in example1.py
+    """
+
+    __slots__ = ("date", "timestamps", "bids", "asks", "positions", "equity", "fill_index", "fill_prices", "fill_qtys", "fill_buy_side")
+
+    def __init__(self, date, timestamps, bids, asks, positions, equity, fill_index, fill_prices, fill_qtys, fill_buy_side):
+
+        self.date = date
+        self.timestamps = timestamps
+        self.bids = bids
+        self.asks = asks
+        self.positions = positions
+        self.equity = equity
+        self.fill_index = fill_index
+        self.fill_prices = fill_prices
+        self.fill_qtys = fill_qtys
+        self.fill_buy_side = fill_buy_side
+
+def forward_fill(targets, start):
+
+    """
+    Replaces NaN entries of targets with the last non-NaN value before them
+    Entries before the first non-NaN value become start
+    """
+
+    has_target = ~np.isnan(targets)
+    idx = np.where(has_target, np.arange(len(targets)), -1)
+    np.maximum.accumulate(idx, out=idx)
+    return np.where(idx >= 0, targets[np.maximum(idx, 0)], start)
+
+def walk_targets(slippage_model, targets, bids, asks, bid_sizes, ask_sizes, start):
+
+    """
+    Sequential fallback of run_vectorized_day for slippage models that fill less than ordered
+    Every quote with a target orders the difference to the position actually held, as the event loop does,
+    fills of zero shares or less are dropped like in MarketSimulator.fill_order
+    Returns (positions, fill_index, fill_prices, fill_qtys, buy_side)
+    """
+
+    signals = np.flatnonzero(~np.isnan(targets))
+    signal_targets = targets[signals].tolist()
+    signal_bids = bids[signals].tolist()
+    signal_asks = asks[signals].tolist()
+    signal_bid_sizes = bid_sizes[signals].tolist()
+    signal_ask_sizes = ask_sizes[signals].tolist()
+
+    fill_index = []
+    fill_prices = []
+    fill_qtys = []
+    buy_side = []
+    held = np.full(len(targets), np.nan)
+
+    position = start
+    for k in range(len(signals)):
+        order_qty = int(abs(signal_targets[k] - position))
+        if order_qty == 0:
+            continue
+        buy = signal_targets[k] > position
+        NBBO = {"bid": signal_bids[k], "ask": signal_asks[k], "bid_size": signal_bid_sizes[k], "ask_size": signal_ask_sizes[k]}
+        avg_price, filled_qty = slippage_model.calculate_slippage(NBBO, order_qty, buy)
+        filled_qty = int(filled_qty)
+        if filled_qty <= 0:
+            continue
+        position += filled_qty if buy else -filled_qty
+        held[signals[k]] = position
+        fill_index.append(signals[k])
+        fill_prices.append(avg_price)
+        fill_qtys.append(filled_qty)
+        buy_side.append(buy)
+
+    return (forward_fill(held, start), np.array(fill_index, dtype=np.int64), np.array(fill_prices, dtype=np.float64),
+            np.array(fill_qtys, dtype=np.int64), np.array(buy_side, dtype=bool))
+
+def run_vectorized_day(strategy, simulator, ticker, day, cost_to_borrow=0.0):
+
+    """
+    Runs a stateless strategy over a whole interface.DayData at once
+
+    The strategy must implement get_target_positions(bids, asks, bid_sizes, ask_sizes)
+    returning the position it wants after each quote, NaN where it places no order
+    (see RangeBound). Positions, fill prices (SlippageModel.calculate_slippage_batch)
+    and commissions (CostStructure.calculate_cost_batch) are computed with numpy.
+    Only the fills themselves are booked one by one through MarketSimulator.apply_fill,
+    so realized PnL and lots end up exactly as in the event loop.
+    If the slippage model fills less than ordered the day is replayed by walk_targets instead.
+
+    Returns a VectorizedResult with the position and equity (realized + unrealized) per quote
+    """
+
+    bids = np.asarray(day.bids)
+    asks = np.asarray(day.asks)
+    valid = np.flatnonzero((bids != 0) & (asks != 0))
+
+    timestamps = np.asarray(day.timestamps)[valid]
+    bids = bids[valid]
+    asks = asks[valid]
+    bid_sizes = np.asarray(day.bid_sizes)[valid]
+    ask_sizes = np.asarray(day.ask_sizes)[valid]
+
+    start = simulator.positions.get(ticker, 0)
+    targets = np.asarray(strategy.get_target_positions(bids, asks, bid_sizes, ask_sizes), dtype=np.float64)
+    positions = forward_fill(targets, start)
+
+    previous = np.empty_like(positions)
+    previous[:1] = start
+    previous[1:] = positions[:-1]
+    deltas = positions - previous
+
+    fill_index = np.flatnonzero(deltas != 0)
+    order_qty = np.abs(deltas[fill_index]).astype(np.int64)
+    buy_side = deltas[fill_index] > 0
+
+    fill_prices, fill_qtys = simulator.slippage_model.calculate_slippage_batch(bids[fill_index], asks[fill_index], bid_sizes[fill_index], ask_sizes[fill_index], order_qty, buy_side)
+    fill_prices = np.asarray(fill_prices, dtype=np.float64)
+    fill_qtys = np.asarray(fill_qtys).astype(np.int64)
+
+    # A partial fill leaves the position short of its target, the orders after it depend on what was filled
+    if (fill_qtys != order_qty).any():
+        positions, fill_index, fill_prices, fill_qtys, buy_side = walk_targets(simulator.slippage_model, targets, bids, asks, bid_sizes, ask_sizes, start)
+
+    costs = simulator.cost_structure.calculate_cost_batch(fill_qtys, fill_prices)
+
+    # Snapshot realized PnL and lot aggregates after every fill, slot 0 is the state before the day
+    n_fills = len(fill_index)
+    realized = np.empty(n_fills + 1)
+    long_qty = np.empty(n_fills + 1)
+    long_cost = np.empty(n_fills + 1)
+    short_qty = np.empty(n_fills + 1)
+    short_cost = np.empty(n_fills + 1)
+
+    def snapshot(k):
+        long_lots = simulator.long_lots.get(ticker)
+        short_lots = simulator.short_lots.get(ticker)
+        realized[k] = simulator.position_PnL.get(ticker, 0.0)
+        long_qty[k] = long_lots.qty if long_lots is not None else 0
+        long_cost[k] = long_lots.cost if long_lots is not None else 0.0
+        short_qty[k] = short_lots.qty if short_lots is not None else 0
+        short_cost[k] = short_lots.cost if short_lots is not None else 0.0
+
+    snapshot(0)
+    fill_timestamps = timestamps[fill_index].tolist()
+    for k in range(n_fills):
+        simulator.apply_fill(ticker, fill_prices[k].item(), fill_qtys[k].item(), fill_timestamps[k], bool(buy_side[k]), cost_to_borrow, costs[k].item())
+        snapshot(k + 1)
+
+    # Each quote is marked with the state after every fill at or before it
+    segment = np.searchsorted(fill_index, np.arange(len(timestamps)), side="right")
+    equity = realized[segment] + (bids * long_qty[segment] - long_cost[segment]) + (short_cost[segment] - asks * short_qty[segment])
+
+    return VectorizedResult(day.date, timestamps, bids, asks, positions, equity, fill_index, fill_prices, fill_qtys, buy_side)
+
+def run_vectorized(strategy, simulator, ticker, DI, limit=50000, max_iter=10000, cost_to_borrow=0.0):
+
+    """
+    Runs run_vectorized_day over every date of an interface.DataInterface
+    Positions and lots carry over from one day to the next
+    Returns a list of VectorizedResult, one per date
+    """
+
+    return [run_vectorized_day(strategy, simulator, ticker, DI._load_day(i, limit, max_iter), cost_to_borrow) for i in range(len(DI.dates))]
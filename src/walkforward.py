@@ -0,0 +1,269 @@
+import json
+import shutil
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src import sweep
+from src.analytics import RunningStats
+from src.interface import DataInterface, SampleCursor
+from src.marketsimulator import MarketSimulator, IdealFillSlippageModel, ZeroCostStructure
+
+def summarize(daily_pnl):
+
+    """
+    Metrics of a sequence of daily PnL values
+    Returns days, total_pnl, mean_daily_pnl, sharpe_daily, max_drawdown and win_rate
+    """
+
+    stats = RunningStats()
+    for pnl in daily_pnl:
+        stats.add(pnl)
+
+    pnl = np.asarray(daily_pnl, dtype=np.float64)
+    equity = np.cumsum(pnl)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity if len(pnl) else np.zeros(1)
+
+    return {
+        "days": len(pnl),
+        "total_pnl": float(pnl.sum()),
+        "mean_daily_pnl": stats.mean,
+        "sharpe_daily": stats.sharpe(252),
+        "max_drawdown": float(drawdown.max()),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) else 0.0
+    }
+
+def walk_forward_windows(n_days, train_days, test_days=1, anchored=False):
+
+    """
+    Returns [(train, test)] index ranges rolling forward by test_days
+    anchored: (bool) every train window starts at day 0 and grows, otherwise it has train_days days
+    """
+
+    if train_days < 1 or test_days < 1:
+        raise ValueError("train_days and test_days must be at least 1")
+
+    windows = []
+    start = train_days
+    while start < n_days:
+        train = range(0 if anchored else start - train_days, start)
+        test = range(start, min(start + test_days, n_days))
+        windows.append((train, test))
+        start += test_days
+    return windows
+
+def _run_days(strategy_class, params, ticker, slippage_model, cost_structure, days, flatten_daily, state=None, equity=0.0):
+
+    """
+    Worker: simulates the given day indices in order for one parameter set
+    flatten_daily starts every day flat with a fresh simulator and closes out at the day's last quote,
+    otherwise the simulator continues from state and equity (the previous day's close)
+    Returns one result dict per day, only the last one holds the simulator state
+    """
+
+    columns, dates, offsets = sweep._worker_data
+
+    strategy = strategy_class(**params)
+    simulator = MarketSimulator(slippage_model=slippage_model, cost_structure=cost_structure)
+    if state is not None:
+        simulator.set_state(state)
+
+    cursor = SampleCursor()
+    results = []
+    for d in days:
+        if flatten_daily:
+            simulator = MarketSimulator(slippage_model=slippage_model, cost_structure=cost_structure)
+            equity = 0.0
+
+        start_equity = equity
+        last = sweep.simulate_day(strategy, simulator, ticker, columns, offsets[d], offsets[d + 1], cursor)
+
+        if last is not None:
+            position = simulator.positions.get(ticker, 0)
+            if flatten_daily and position != 0:
+                simulator.fill_order(ticker, last.NBBO, abs(position), last.temporal, position < 0)
+            equity = simulator.get_equity_curve_sample(ticker, last.NBBO)
+
+        results.append({
+            "date": dates[d],
+            "pnl": equity - start_equity,
+            "equity": equity,
+            "position": simulator.positions.get(ticker, 0),
+            "state": None if flatten_daily or d != days[-1] else simulator.get_state()
+        })
+
+    return results
+
+class WalkForward:
+
+    """
+    Walk-forward evaluation of a strategy's parameters: choose the best parameters on a train
+    window of days, trade them on the following test days, then roll forward
+    Every (parameters, day) result is simulated once and memoized in day_cache for the lifetime of
+    the WalkForward, overlapping windows and repeated runs with other window lengths or metrics
+    only read it, so a full rolling evaluation costs one pass per parameter set over the data
+    (results are not written to disk, a cache passed to the interface only keeps the ticks)
+    Days are written once to memory-mapped files shared by a pool of workers like run_sweep
+    flatten_daily=True closes positions at every day's last quote, days are then independent and
+    every (parameters, day) pair runs in parallel
+    flatten_daily=False runs each parameter set as one continuous backtest from the first date,
+    the cache keeps the simulator state at the end of the last simulated day so later days resume from it,
+    a day's result then includes positions carried over from earlier (also in-sample) days
+    Usage:
+        with WalkForward(RangeBound, API_KEY, "LLY", DATES, cache=TickCache(".tick_cache")) as wf:
+            report = wf.run(GRID, train_days=5, test_days=1)
+    """
+
+    def __init__(self, strategy_class, api_key, ticker, dates, processes=None, slippage_model=IdealFillSlippageModel(), cost_structure=ZeroCostStructure(), flatten_daily=True, data_dir=None, limit=50000, max_iter=10000, **interface_kwargs):
+
+        """
+        strategy_class: (class) strategy built as strategy_class(**params), must be importable by workers
+        processes: (int) worker processes, defaults to os.cpu_count()
+        flatten_daily: (bool) see above
+        data_dir: (str) where to keep the shared day files, a temporary directory by default
+        interface_kwargs: passed to DataInterface, e.g. use_NY_hours, cache, calendar
+        """
+
+        self.strategy_class = strategy_class
+        self.ticker = ticker
+        self.processes = processes
+        self.slippage_model = slippage_model
+        self.cost_structure = cost_structure
+        self.flatten_daily = flatten_daily
+        self.limit = limit
+        self.max_iter = max_iter
+
+        self._interface = DataInterface(api_key, ticker, dates, **interface_kwargs)
+        self.dates = self._interface.dates
+
+        self._owns_dir = data_dir is None
+        self.data_dir = data_dir
+        self._prepared = False
+
+        # params key -> list of day results, index aligned with self.dates
+        self.day_cache = {}
+
+    def prepare(self):
+
+        """
+        Downloads (or reads from cache) every date once and writes the shared day files
+        Called by the first run, call it directly to pay for the data up front
+        """
+
+        if self._prepared:
+            return
+        if self._owns_dir:
+            self.data_dir = tempfile.mkdtemp(prefix="walkforward")
+        sweep.write_days(self._interface, self.data_dir, self.limit, self.max_iter)
+        self._prepared = True
+
+    def day_results(self, param_grid, days=None):
+
+        """
+        Returns {params key: list of day results} for every parameter set, simulating only
+        (parameters, day) pairs not in the cache
+        days: (int) only the first this many dates need results, all dates by default
+        A params key is the parameters as a JSON string with sorted keys, json.loads gives them back
+        """
+
+        self.prepare()
+        params_list = sweep.expand_grid(param_grid)
+        days = len(self.dates) if days is None else days
+
+        jobs = []
+        for params in params_list:
+            key = json.dumps(params, sort_keys=True)
+            cached = self.day_cache.setdefault(key, [None] * len(self.dates))
+            if self.flatten_daily:
+                jobs.extend((key, params, [d], None, 0.0) for d in range(days) if cached[d] is None)
+            else:
+                # Continuous runs resume after the last day already simulated
+                done = 0
+                while done < days and cached[done] is not None:
+                    done += 1
+                if done < days:
+                    previous = cached[done - 1] if done else None
+                    jobs.append((key, params, list(range(done, days)), previous["state"] if previous else None, previous["equity"] if previous else 0.0))
+
+        if jobs:
+            with ProcessPoolExecutor(max_workers=self.processes, initializer=sweep._init_worker, initargs=(self.data_dir,)) as pool:
+                futures = [
+                    (key, d, pool.submit(_run_days, self.strategy_class, params, self.ticker, self.slippage_model, self.cost_structure, d, self.flatten_daily, state, equity))
+                    for key, params, d, state, equity in jobs
+                ]
+                for key, d, future in futures:
+                    cached = self.day_cache[key]
+                    for index, result in zip(d, future.result()):
+                        cached[index] = result
+                    # A resumed continuous run carries the state forward, only its last day keeps one
+                    if not self.flatten_daily and d[0] > 0:
+                        cached[d[0] - 1]["state"] = None
+
+        return {json.dumps(params, sort_keys=True): self.day_cache[json.dumps(params, sort_keys=True)][:days] for params in params_list}
+
+    def run(self, param_grid, train_days, test_days=1, anchored=False, metric="total_pnl"):
+
+        """
+        Runs the walk-forward evaluation
+        param_grid: (dict or list) {name: [values]} grid or a list of parameter dicts
+        train_days/test_days: (int) window lengths in days, windows roll forward by test_days
+        anchored: (bool) grow the train window from the first date instead of rolling it
+        metric: (str) summarize() key the best parameters maximize on each train window
+        Returns a dict with:
+            windows: per window train/test dates, chosen params and in_sample/out_of_sample metrics
+            in_sample: metrics of the chosen params over all their train days (overlapping days repeat)
+            out_of_sample: metrics of the stitched test days, the honest estimate
+            efficiency: out of sample over in sample mean daily PnL (walk-forward efficiency)
+        """
+
+        params_list = sweep.expand_grid(param_grid)
+        results = self.day_results(params_list)
+        keys = [json.dumps(params, sort_keys=True) for params in params_list]
+        pnl = np.array([[day["pnl"] for day in results[key]] for key in keys], dtype=np.float64).reshape(len(keys), len(self.dates))
+
+        windows = []
+        in_sample_pnl = []
+        out_of_sample_pnl = []
+        for train, test in walk_forward_windows(len(self.dates), train_days, test_days, anchored):
+            scores = [summarize(row[train.start:train.stop])[metric] for row in pnl]
+            best = int(np.argmax(scores))
+            train_pnl = pnl[best, train.start:train.stop]
+            test_pnl = pnl[best, test.start:test.stop]
+            in_sample_pnl.extend(train_pnl.tolist())
+            out_of_sample_pnl.extend(test_pnl.tolist())
+            windows.append({
+                "train": (self.dates[train.start], self.dates[train.stop - 1]),
+                "test": (self.dates[test.start], self.dates[test.stop - 1]),
+                "params": params_list[best],
+                "in_sample": summarize(train_pnl),
+                "out_of_sample": summarize(test_pnl)
+            })
+
+        in_sample = summarize(in_sample_pnl)
+        out_of_sample = summarize(out_of_sample_pnl)
+
+        return {
+            "windows": windows,
+            "in_sample": in_sample,
+            "out_of_sample": out_of_sample,
+            "efficiency": out_of_sample["mean_daily_pnl"] / in_sample["mean_daily_pnl"] if in_sample["mean_daily_pnl"] else 0.0
+        }
+
+    def close(self):
+
+        """
+        Removes the shared day files if they were written to a temporary directory
+        """
+
+        self._interface.close()
+        if self._owns_dir and self.data_dir is not None:
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+            self.data_dir = None
+        self._prepared = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,18 @@
+import os
+import sys
+import pytest
+
+# Tests import the repo the same way the examples do (from src.x import y)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.synthetic import SyntheticMarket, MockPolygonServer
+
+@pytest.fixture
+def market():
+    # A sparse market keeps every day a few thousand rows
+    return SyntheticMarket(seed=7, quotes_per_second=0.5, trades_per_second=0.2)
+
+@pytest.fixture
+def server(market):
+    with MockPolygonServer(market) as server:
+        yield server
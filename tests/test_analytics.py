@@ -0,0 +1,46 @@
+import pytest
+
+from src.analytics import PerformanceTracker
+from src.interface import DataInterface
+from src.marketsimulator import MarketSimulator, IBKRProFIXEDCostStructure
+
+from example_strategies.reversion import RangeBound
+
+def test_tracker_matches_simulator_with_fees(server):
+
+    # The example1.py loop with commissions
+    DI = DataInterface("key", "SYN", ["2025-07-14", "2025-07-15"], use_NY_hours=False, start_hour=10, end_hour=12, base_url=server.url)
+    MS = MarketSimulator(cost_structure=IBKRProFIXEDCostStructure())
+    Metrics = PerformanceTracker()
+    Strategy = RangeBound(mean=99.0, deviation=0.5, max_allowed_position=100)
+
+    fills = 0
+    sample = DI.next_sample()
+    while sample:
+        if sample.NBBO["bid"] and sample.NBBO["ask"]:
+            fees_before = MS.total_fees
+            order_qty, buy_side = Strategy.get_order(sample.NBBO, MS.positions.get("SYN", 0))
+            if order_qty != 0:
+                MS.fill_order("SYN", sample.NBBO, order_qty, sample.temporal, buy_side)
+                fills += 1
+            equity = MS.get_equity_curve_sample("SYN", sample.NBBO)
+            Metrics.add_data(sample.temporal, (sample.NBBO["bid"], sample.NBBO["ask"]), MS.positions.get("SYN", 0), equity, MS.total_fees - fees_before)
+        sample = DI.next_sample()
+
+    summary = Metrics.summary()
+    assert fills > 1
+    assert summary["trades"] == fills
+    assert summary["fees"] == pytest.approx(MS.total_fees) and MS.total_fees > 0
+    assert summary["pnl"] == pytest.approx(MS.get_equity_curve_sample("SYN", DI.last_sample.NBBO))
+    assert summary["final_position"] == MS.positions["SYN"]
+    assert sum(day["fees"] for day in Metrics.daily()) == pytest.approx(MS.total_fees)
+
+def test_total_fees_survive_a_state_round_trip():
+
+    MS = MarketSimulator(cost_structure=IBKRProFIXEDCostStructure())
+    MS.apply_fill("SYN", 100.0, 300, 1, True)
+    MS.apply_fill("SYN", 101.0, 300, 2, False)
+
+    restored = MarketSimulator()
+    restored.set_state(MS.get_state())
+    assert restored.total_fees == MS.total_fees > 0
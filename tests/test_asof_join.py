@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from src.datastream import asof_join, increase_sample_rate_most_recent
+
+def loop_join(to_increase, timestamps, timestamps_onto):
+
+    # The original per quote loop asof_join replaced
+    upsampled = [[] for _ in range(len(to_increase))]
+
+    basei = 0
+    for ts in timestamps_onto:
+        while basei + 1 < len(timestamps) and timestamps[basei + 1] <= ts:
+            basei += 1
+
+        for i in range(len(to_increase)):
+            if timestamps[basei] <= ts:
+                upsampled[i].append(to_increase[i][basei])
+            else:
+                upsampled[i].append(0)
+
+    return upsampled
+
+def test_matches_loop_on_a_synthetic_day(market):
+
+    trades, quotes = market.day("SYN", "2025-07-14")
+    columns = [trades["price"], trades["size"], trades["sip_timestamp"]]
+
+    expected = loop_join([column.tolist() for column in columns], trades["sip_timestamp"].tolist(), quotes["sip_timestamp"].tolist())
+    joined = asof_join(columns, trades["sip_timestamp"], quotes["sip_timestamp"])
+
+    for column, reference in zip(joined, expected):
+        assert column.tolist() == reference
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_loop_with_duplicate_and_early_timestamps(seed):
+
+    rng = np.random.default_rng(seed)
+    timestamps = np.sort(rng.integers(10, 60, 40))
+    onto = np.sort(rng.integers(0, 80, 100))
+    values = rng.normal(size=40)
+
+    expected = loop_join([values.tolist()], timestamps.tolist(), onto.tolist())
+    assert asof_join([values], timestamps, onto)[0].tolist() == expected[0]
+    assert increase_sample_rate_most_recent([values], timestamps, onto) == expected
+
+def test_fill_modes():
+
+    timestamps = np.array([10, 20])
+    onto = np.array([5, 10, 25])
+    values = np.array([1.5, 2.5])
+
+    assert np.isnan(asof_join([values], timestamps, onto, fill="nan")[0][0])
+    assert asof_join([values], timestamps, onto, fill="ffill", initial=[0.5])[0].tolist() == [0.5, 1.5, 2.5]
+    (joined,), kept = asof_join([values], timestamps, onto, fill="drop")
+    assert joined.tolist() == [1.5, 2.5] and kept.tolist() == [1, 2]
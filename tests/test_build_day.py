@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from src.interface import build_day
+
+def make_tables():
+
+    # Three trades share 150 and two quotes share 200
+    trades = {
+        "participant_timestamp": np.array([100, 150, 150, 150, 300], dtype=np.int64),
+        "sip_timestamp": np.array([101, 151, 152, 153, 301], dtype=np.int64),
+        "price": np.array([10.0, 11.0, 12.0, 14.0, 15.0]),
+        "size": np.array([5, 10, 30, 10, 7], dtype=np.int64)
+    }
+    quotes = {
+        "participant_timestamp": np.array([50, 120, 200, 200, 400], dtype=np.int64),
+        "sip_timestamp": np.array([51, 121, 201, 202, 401], dtype=np.int64),
+        "bid_price": np.array([9.0, 9.5, 10.5, 10.6, 14.5]),
+        "ask_price": np.array([9.2, 9.7, 10.7, 10.8, 14.7]),
+        "bid_size": np.array([1, 2, 3, 4, 5], dtype=np.int64),
+        "ask_size": np.array([6, 7, 8, 9, 10], dtype=np.int64)
+    }
+    return trades, quotes
+
+def test_defaults_keep_quotes_and_aggregate_trades():
+
+    trades, quotes = make_tables()
+    day = build_day("2025-07-14", trades, quotes)
+
+    # Every quote is served, including both at 200
+    assert day.timestamps.tolist() == [50, 120, 200, 200, 400]
+    assert day.bids.tolist() == [9.0, 9.5, 10.5, 10.6, 14.5]
+
+    # The prints at 150 arrive as one trade of size 50 at their VWAP
+    vwap = (11.0 * 10 + 12.0 * 30 + 14.0 * 10) / 50
+    assert day.sizes.tolist() == [0, 5, 50, 50, 7]
+    assert day.prices[2] == pytest.approx(vwap)
+    assert day.prices[3] == pytest.approx(vwap)
+    assert day.prices.tolist()[:2] == [0.0, 10.0]
+    assert day.prices[4] == 15.0
+    assert day.trade_timestamps.tolist() == [0, 100, 150, 150, 300]
+
+def test_last_policy_matches_dict_keyed_by_timestamp():
+
+    trades, quotes = make_tables()
+    day = build_day("2025-07-14", trades, quotes, trade_duplicates="last", quote_duplicates="last")
+
+    assert day.timestamps.tolist() == [50, 120, 200, 400]
+    assert day.bids.tolist() == [9.0, 9.5, 10.6, 14.5]
+    assert day.prices.tolist() == [0.0, 10.0, 14.0, 15.0]
+    assert day.sizes.tolist() == [0, 5, 10, 7]
+
+def test_aggregate_sorts_out_of_order_participant_timestamps():
+
+    trades, quotes = make_tables()
+    order = np.array([0, 3, 1, 4, 2])
+    shuffled = {name: column[order] for name, column in trades.items()}
+    day = build_day("2025-07-14", shuffled, quotes)
+
+    assert day.sizes.tolist() == [0, 5, 50, 50, 7]
+    assert day.prices[2] == pytest.approx((11.0 * 10 + 12.0 * 30 + 14.0 * 10) / 50)
+
+def test_quotes_cannot_be_aggregated():
+
+    trades, quotes = make_tables()
+    with pytest.raises(ValueError):
+        build_day("2025-07-14", trades, quotes, quote_duplicates="aggregate")
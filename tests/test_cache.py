@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.cache import TickCache
+from src.interface import DataInterface
+
+DATES = ["2025-07-14", "2025-07-15"]
+
+def drain(DI):
+
+    samples = []
+    while True:
+        sample = DI.next_sample()
+        if sample is None:
+            return samples
+        samples.append((sample.temporal, dict(sample.NBBO), dict(sample.last_trade)))
+
+def test_put_get_round_trip(tmp_path):
+
+    cache = TickCache(str(tmp_path))
+    window = (1_000, 2_000)
+    trades = {"participant_timestamp": np.array([1_100, 1_200], dtype=np.int64), "price": np.array([10.5, 10.25]), "size": np.array([3, 4], dtype=np.int64)}
+    quotes = {"participant_timestamp": np.array([], dtype=np.int64), "bid_price": np.array([])}
+
+    assert cache.get("SYN", "2025-07-14", window) is None
+    cache.put("SYN", "2025-07-14", window, trades, quotes)
+    assert cache.contains("SYN", "2025-07-14", window)
+    assert not cache.contains("SYN", "2025-07-14", (1_000, 3_000))
+
+    cached_trades, cached_quotes = cache.get("SYN", "2025-07-14", window)
+    assert list(cached_trades) == list(trades)
+    for name, values in trades.items():
+        assert cached_trades[name].dtype == values.dtype
+        np.testing.assert_array_equal(cached_trades[name], values)
+    assert len(cached_quotes["bid_price"]) == 0
+
+    assert cache.info()["entries"] == 1
+    cache.remove("SYN", "2025-07-14", window)
+    assert cache.get("SYN", "2025-07-14", window) is None
+
+def test_second_run_reads_the_cache_only(tmp_path, server):
+
+    cache = TickCache(str(tmp_path))
+    first = drain(DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=11, cache=cache, base_url=server.url))
+    pages = server.pages_served
+    assert first and pages > 0
+
+    second = drain(DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=11, cache=cache, base_url=server.url))
+    assert server.pages_served == pages
+    assert second == first
+
+def test_cached_days_match_uncached_days(tmp_path, server):
+
+    uncached = drain(DataInterface("key", "SYN", DATES[:1], use_NY_hours=False, start_hour=10, end_hour=11, base_url=server.url))
+    cache = TickCache(str(tmp_path))
+    drain(DataInterface("key", "SYN", DATES[:1], use_NY_hours=False, start_hour=10, end_hour=11, cache=cache, base_url=server.url))
+    cached = drain(DataInterface("key", "SYN", DATES[:1], use_NY_hours=False, start_hour=10, end_hour=11, cache=cache, base_url=server.url))
+    assert cached == uncached
@@ -0,0 +1,80 @@
+import json
+import pytest
+
+from src.cache import TickCache
+from src.checkpoint import Checkpointer
+from src.interface import DataInterface
+from src.marketsimulator import MarketSimulator
+from src.synthetic import SyntheticMarket, MockPolygonServer
+
+from example_strategies.reversion import RangeBound
+
+DATES = ["2025-07-14", "2025-07-15", "2025-07-16"]
+
+class Crash(Exception):
+    pass
+
+@pytest.fixture(scope="module")
+def server():
+    # Volatile enough for RangeBound to trade every day
+    with MockPolygonServer(SyntheticMarket(seed=3, start_price=100.0, volatility=2.0, quotes_per_second=0.5, trades_per_second=0.2)) as server:
+        yield server
+
+def run(server, checkpointer=None, crash_at=None, streaming=False, cache=None):
+
+    """
+    Trades RangeBound over DATES, raises Crash after crash_at samples
+    Returns (samples handled including before a resume, simulator state)
+    """
+
+    DI = DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=12, base_url=server.url, cache=cache, streaming=streaming)
+    MS = MarketSimulator()
+    strategy = RangeBound(mean=100.0, deviation=0.5, max_allowed_position=100)
+
+    extra = checkpointer.restore(DI, MS) if checkpointer is not None else None
+    handled = extra["handled"] if extra else 0
+
+    sample = DI.next_sample()
+    while sample:
+        if sample.NBBO["bid"] and sample.NBBO["ask"]:
+            qty, buy_side = strategy.get_order(sample.NBBO, MS.positions.get("SYN", 0))
+            if qty:
+                MS.fill_order("SYN", sample.NBBO, qty, sample.temporal, buy_side)
+        handled += 1
+        if handled == crash_at:
+            raise Crash()
+        if checkpointer is not None:
+            checkpointer.step(DI, MS, {"handled": handled})
+        sample = DI.next_sample()
+
+    return handled, MS.get_state()
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("every_ticks", [None, 3001])
+def test_resume_after_crash_matches_uninterrupted_run(tmp_path, server, streaming, every_ticks):
+
+    full_count, full_state = run(server, streaming=streaming)
+    assert full_state["position_PnL"]["SYN"] != 0
+
+    path = str(tmp_path / "run.ckpt.json")
+    cache = None if streaming else TickCache(str(tmp_path / "cache"))
+    with pytest.raises(Crash):
+        run(server, Checkpointer(path, every_ticks=every_ticks), crash_at=full_count * 2 // 3, streaming=streaming, cache=cache)
+
+    with open(path) as f:
+        saved = json.load(f)
+    assert saved["interface"]["current_date_index"] >= 1
+
+    pages = server.pages_served
+    count, state = run(server, Checkpointer(path, every_ticks=every_ticks), streaming=streaming, cache=cache)
+    assert count == full_count
+    assert state == full_state
+    if not streaming:
+        # Only the days after the checkpoint's one are downloaded again, the cached ones are not
+        assert server.pages_served - pages <= 2 * (len(DATES) - saved["interface"]["current_date_index"] + 1)
+
+def test_no_checkpoint_starts_fresh(tmp_path):
+
+    checkpointer = Checkpointer(str(tmp_path / "none.json"))
+    assert checkpointer.load() is None
+    checkpointer.clear()
@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.datastream import read_columns, records_to_columns, concat_columns, get_polygon_quotes_table, TRADE_COLUMNS, QUOTE_COLUMNS
+
+def pages_of(market, kind, page_rows):
+
+    trades, quotes = market.day("SYN", "2025-07-14")
+    table = trades if kind == "trades" else quotes
+    n = len(table["sip_timestamp"])
+    return [market.records(kind, table, lo, min(lo + page_rows, n)) for lo in range(0, n, page_rows)]
+
+def test_read_columns_matches_per_page_columns(market):
+
+    pages = pages_of(market, "trades", 1000)
+    expected = concat_columns([records_to_columns(records, TRADE_COLUMNS) for records in pages], TRADE_COLUMNS)
+
+    # A small capacity makes the arrays grow several times
+    for capacity in (0, 7, 1000, 10 ** 6):
+        table = read_columns(iter(pages), TRADE_COLUMNS, capacity)
+        assert list(table) == list(TRADE_COLUMNS)
+        for name, dtype in TRADE_COLUMNS.items():
+            assert table[name].dtype == dtype
+            np.testing.assert_array_equal(table[name], expected[name])
+
+def test_read_columns_without_pages():
+
+    table = read_columns(iter([]), QUOTE_COLUMNS, 100)
+    assert all(len(values) == 0 for values in table.values())
+
+def test_missing_participant_timestamp_falls_back_to_sip():
+
+    table = read_columns([[{"sip_timestamp": 5, "price": 1.0, "size": 2}], [{"sip_timestamp": 6, "participant_timestamp": 4, "price": 1.5}]], TRADE_COLUMNS)
+    assert table["participant_timestamp"].tolist() == [5, 4]
+    assert table["size"].tolist() == [2.0, 0.0]
+
+def test_quotes_table_over_every_page(server, market):
+
+    _, quotes = market.day("SYN", "2025-07-14")
+    window = (int(quotes["sip_timestamp"][100]), int(quotes["sip_timestamp"][2600]))
+    table = get_polygon_quotes_table("SYN", "2025-07-14", "key", limit=500, base_url=server.url, window=window)
+
+    np.testing.assert_array_equal(table["sip_timestamp"], quotes["sip_timestamp"][100:2601])
+    np.testing.assert_array_equal(table["bid_price"], quotes["bid_price"][100:2601])
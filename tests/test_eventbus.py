@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+
+from src.eventbus import EventBus
+
+class HandlerError(Exception):
+    pass
+
+def failing_handler(fail_at):
+
+    seen = []
+
+    async def handle(tick):
+        seen.append(tick.seq)
+        # Yielding lets publish fill the queue again before the handler fails
+        await asyncio.sleep(0)
+        if tick.seq == fail_at:
+            raise HandlerError(tick.seq)
+
+    return handle, seen
+
+async def publish_all(bus, count):
+
+    await bus.start()
+    try:
+        for i in range(count):
+            await bus.publish(i)
+    finally:
+        await bus.close()
+
+def test_failing_consumer_under_backpressure_raises():
+
+    bus = EventBus(maxsize=2)
+    handle, seen = failing_handler(2)
+    bus.subscribe("strategy", handle)
+
+    async def main():
+        task = asyncio.ensure_future(publish_all(bus, 20))
+        done, _ = await asyncio.wait([task], timeout=2)
+        assert done, "publish blocked on a consumer that already failed"
+        task.result()
+
+    with pytest.raises(HandlerError):
+        asyncio.run(main())
+    assert seen == [0, 1, 2]
+    assert bus.consumers["strategy"].errors == 1
+
+def test_close_stops_healthy_consumers_when_one_fails():
+
+    bus = EventBus(maxsize=2)
+    handle, _ = failing_handler(2)
+    received = []
+    bus.subscribe("failing", handle)
+    bus.subscribe("healthy", lambda tick: received.append(tick.seq), maxsize=100)
+
+    async def main():
+        await bus.start()
+        for i in range(4):
+            await bus.publish(i)
+        # The failing consumer's queue is full again, close must neither block nor leave the healthy one running
+        task = asyncio.ensure_future(bus.close())
+        done, _ = await asyncio.wait([task], timeout=2)
+        assert done, "close blocked on a consumer that already failed"
+        task.result()
+
+    with pytest.raises(HandlerError):
+        asyncio.run(main())
+    assert received == [0, 1, 2, 3]
+    assert bus.consumers["healthy"].task.done()
+
+def test_every_consumer_sees_every_tick_in_order():
+
+    bus = EventBus(maxsize=2)
+    received = {"fast": [], "slow": []}
+
+    async def slow(tick):
+        await asyncio.sleep(0)
+        received["slow"].append(tick.seq)
+
+    bus.subscribe("fast", lambda tick: received["fast"].append(tick.seq))
+    bus.subscribe("slow", slow)
+
+    asyncio.run(publish_all(bus, 50))
+    assert received["fast"] == list(range(50))
+    assert received["slow"] == list(range(50))
+    assert bus.metrics()["slow"]["max_depth"] <= 2
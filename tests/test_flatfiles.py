@@ -0,0 +1,93 @@
+import io
+import gzip
+import pytest
+
+from src.datastream import TRADE_COLUMNS, QUOTE_COLUMNS
+from src.flatfiles import DirectoryStore, FlatFileSource, read_flat_file, flat_file_key, TRADES_PREFIX, QUOTES_PREFIX
+
+WINDOW = (0, 10**19)
+
+TRADES_HEADER = "ticker,conditions,correction,exchange,id,participant_timestamp,price,sequence_number,sip_timestamp,size,tape"
+QUOTES_HEADER = "ticker,ask_exchange,ask_price,ask_size,bid_exchange,bid_price,bid_size,conditions,participant_timestamp,sequence_number,sip_timestamp,tape"
+
+def gzipped(lines):
+    return io.BytesIO(gzip.compress(("\n".join(lines) + "\n").encode()))
+
+def trade_line(ticker, timestamp, price):
+    return f"{ticker},,0,4,1,{timestamp},{price},1,{timestamp},100,3"
+
+def quote_line(ticker, timestamp, bid):
+    return f"{ticker},11,{bid + 0.01},2,12,{bid},3,1,{timestamp},1,{timestamp},3"
+
+def write_day(root, date, tickers):
+    for prefix, header, line in ((TRADES_PREFIX, TRADES_HEADER, trade_line), (QUOTES_PREFIX, QUOTES_HEADER, quote_line)):
+        path = root / flat_file_key(prefix, date)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rows = [line(ticker, 1000 * (i + 1), 10.0 + i) for i, ticker in enumerate(tickers)]
+        path.write_bytes(gzip.compress(("\n".join([header] + rows) + "\n").encode()))
+
+def test_ticker_column_found_from_header():
+
+    lines = [
+        "participant_timestamp,sip_timestamp,price,size,ticker,conditions",
+        "1,1,10.0,100,A,",
+        '2,2,11.0,100,AA,"12,A,37"',
+        "3,3,12.0,100,A,",
+        "4,4,13.0,100,B,A"
+    ]
+    tables = read_flat_file(gzipped(lines), ["A", "B"], WINDOW, TRADE_COLUMNS, sorted_by_ticker=False)
+
+    assert tables["A"]["price"].tolist() == [10.0, 12.0]
+    assert tables["B"]["price"].tolist() == [13.0]
+
+def test_ticker_as_last_column():
+
+    lines = ["sip_timestamp,price,size,ticker", "1,10.0,100,AB", "2,11.0,100,A"]
+    tables = read_flat_file(gzipped(lines), ["A"], WINDOW, TRADE_COLUMNS)
+
+    assert tables["A"]["sip_timestamp"].tolist() == [2]
+
+def test_header_without_ticker_column():
+
+    with pytest.raises(ValueError):
+        read_flat_file(gzipped(["sip_timestamp,price,size", "1,10.0,100"]), ["A"], WINDOW, TRADE_COLUMNS)
+
+def test_missing_daily_file(tmp_path):
+
+    source = FlatFileSource(DirectoryStore(str(tmp_path)))
+    with pytest.raises(FileNotFoundError, match="2025-07-15"):
+        source.load_tables("A", "2025-07-15", WINDOW)
+
+def test_one_pass_serves_every_ticker(tmp_path):
+
+    write_day(tmp_path, "2025-07-15", ["A", "B"])
+    source = FlatFileSource(DirectoryStore(str(tmp_path)), tickers=["A", "B"])
+
+    trades, quotes = source.load_tables("A", "2025-07-15", WINDOW)
+    assert trades["price"].tolist() == [10.0]
+    assert quotes["bid_price"].tolist() == [10.0]
+
+    # B is served from the first pass, the files are gone by now
+    (tmp_path / flat_file_key(TRADES_PREFIX, "2025-07-15")).unlink()
+    trades, quotes = source.load_tables("B", "2025-07-15", WINDOW)
+    assert trades["price"].tolist() == [11.0]
+    assert source._extracted == {}
+
+def test_tables_of_served_dates_are_evicted(tmp_path):
+
+    dates = ["2025-07-14", "2025-07-15", "2025-07-16"]
+    for date in dates:
+        write_day(tmp_path, date, ["A", "B", "C"])
+    source = FlatFileSource(DirectoryStore(str(tmp_path)), tickers=["A", "B", "C"])
+
+    source.load_tables("A", dates[0], WINDOW)
+    source.load_tables("A", dates[1], WINDOW)
+    assert set(source._extracted) == {(t, d, WINDOW) for t in ("B", "C") for d in dates[:2]}
+
+    # B skipped the first date, its tables of that date are dropped
+    source.load_tables("B", dates[1], WINDOW)
+    assert set(source._extracted) == {("C", dates[0], WINDOW), ("C", dates[1], WINDOW)}
+
+    # C moves past its stored dates, the new pass keeps only the tables A and B can still ask for
+    source.load_tables("C", dates[2], WINDOW)
+    assert set(source._extracted) == {("A", dates[2], WINDOW), ("B", dates[2], WINDOW)}
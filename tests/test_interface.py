@@ -0,0 +1,62 @@
+import numpy as np
+
+from src.interface import DataInterface, DayData
+from src.sources import DataSource
+
+class DictSource(DataSource):
+
+    """
+    Serves prepared DayData by date
+    """
+
+    def __init__(self, days):
+        self.days = days
+
+    def load_day(self, ticker, date, window, limit=50000, max_iter=10000):
+        return self.days[date]
+
+def make_day(date, n, start=0):
+
+    timestamps = np.arange(start, start + n, dtype=np.int64) + 1
+    return DayData(
+        date, timestamps,
+        100.0 + np.arange(n), 100.1 + np.arange(n),
+        np.ones(n, dtype=np.int64), np.ones(n, dtype=np.int64),
+        np.full(n, 100.05), np.ones(n, dtype=np.int64),
+        timestamps
+    )
+
+def empty_day(date):
+    return make_day(date, 0)
+
+def drain(DI):
+
+    samples = []
+    while True:
+        sample = DI.next_sample()
+        if sample is None:
+            return samples
+        samples.append(sample.copy())
+
+def test_empty_last_day_keeps_last_sample():
+
+    source = DictSource({"2025-07-14": make_day("2025-07-14", 3), "2025-07-15": empty_day("2025-07-15")})
+    DI = DataInterface("key", "SYN", ["2025-07-14", "2025-07-15"], use_NY_hours=False, source=source)
+
+    samples = drain(DI)
+    assert len(samples) == 3
+    assert DI.last_sample.NBBO.get("bid") == 102.0
+    assert DI.last_sample.temporal == 3
+
+def test_empty_days_between_sessions_are_skipped():
+
+    source = DictSource({
+        "2025-07-14": empty_day("2025-07-14"),
+        "2025-07-15": make_day("2025-07-15", 2),
+        "2025-07-16": empty_day("2025-07-16"),
+        "2025-07-17": make_day("2025-07-17", 2, start=10)
+    })
+    DI = DataInterface("key", "SYN", list(source.days), use_NY_hours=False, source=source)
+
+    assert [sample.temporal for sample in drain(DI)] == [1, 2, 11, 12]
+    assert DI.last_sample.NBBO["ask"] == 101.1
@@ -0,0 +1,179 @@
+import random
+import pytest
+
+from src.marketsimulator import LotQueue, MarketSimulator, IdealFillSlippageModel, ZeroCostStructure, IBKRProFIXEDCostStructure
+
+DAY_NS = 86400 * 1_000_000_000
+
+def reference_pnl(fills, cost_structure):
+
+    """
+    Realized PnL of a fill sequence with plain lists of lots, oldest first
+    fills: (list) (price, qty, timestamp, buy_side, borrow_rate)
+    """
+
+    longs, shorts, pnl = [], [], 0.0
+    for price, qty, timestamp, buy_side, borrow_rate in fills:
+        pnl -= cost_structure.calculate_cost(qty, price)
+        opposite, same = (shorts, longs) if buy_side else (longs, shorts)
+        left = qty
+        while left and opposite:
+            lot = opposite[0]
+            used = min(left, lot[0])
+            if buy_side:
+                held_days = (timestamp - lot[1]) / 1e9 / 86400
+                pnl += (lot[2] - price) * used - used * lot[2] * lot[3] * held_days / 365
+            else:
+                pnl += (price - lot[2]) * used
+            lot[0] -= used
+            left -= used
+            if lot[0] == 0:
+                opposite.pop(0)
+        if left:
+            same.append([left, timestamp, price, borrow_rate])
+    return pnl, longs, shorts
+
+def test_consume_is_fifo_and_partial():
+
+    lots = LotQueue()
+    lots.add(10, 1, 100.0)
+    lots.add(5, 2, 101.0)
+    lots.add(7, 3, 102.0)
+
+    assert list(lots.consume(12)) == [(10, 1, 100.0, 0.0), (2, 2, 101.0, 0.0)]
+    assert lots.qty == 10
+    assert lots.cost == pytest.approx(3 * 101.0 + 7 * 102.0)
+    assert [lot["qty"] for lot in lots] == [3, 7]
+
+    # Consuming more than is open stops at the last lot and resets the running totals
+    assert sum(used for used, *_ in lots.consume(50)) == 10
+    assert len(lots) == 0 and lots.qty == 0 and lots.cost == 0.0
+
+def test_accrued_borrow_matches_cover_charge():
+
+    lots = LotQueue()
+    lots.add(100, 0, 50.0, 0.05)
+    lots.add(50, DAY_NS, 52.0, 0.10)
+    at = 11 * DAY_NS
+    expected = 100 * 50.0 * 0.05 * 11 / 365 + 50 * 52.0 * 0.10 * 10 / 365
+    assert lots.accrued_borrow(at) == pytest.approx(expected)
+
+    restored = LotQueue.from_state(lots.get_state())
+    assert restored.accrued_borrow(at) == pytest.approx(expected)
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("cost_structure", [ZeroCostStructure(), IBKRProFIXEDCostStructure()])
+def test_simulator_matches_reference_fifo(seed, cost_structure):
+
+    rng = random.Random(seed)
+    simulator = MarketSimulator(slippage_model=IdealFillSlippageModel(), cost_structure=cost_structure)
+
+    fills = []
+    timestamp = 0
+    for _ in range(400):
+        timestamp += rng.randint(1, 3600) * 1_000_000_000
+        price = round(rng.uniform(90, 110), 2)
+        qty = rng.randint(1, 300)
+        buy_side = rng.random() < 0.5
+        borrow_rate = 0.0 if buy_side else rng.choice([0.0, 0.03, 0.2])
+        fills.append((price, qty, timestamp, buy_side, borrow_rate))
+        simulator.apply_fill("SYN", price, qty, timestamp, buy_side, borrow_rate)
+
+    pnl, longs, shorts = reference_pnl(fills, cost_structure)
+    assert simulator.get_stock_Pnl("SYN") == pytest.approx(pnl)
+    assert simulator.get_all_PnL() == pytest.approx(pnl)
+    assert simulator.positions["SYN"] == sum(lot[0] for lot in longs) - sum(lot[0] for lot in shorts)
+    assert [[lot["qty"], lot["entry_time"], lot["entry_price"]] for lot in simulator.long_lots["SYN"]] == [lot[:3] for lot in longs]
+    assert [[lot["qty"], lot["entry_time"], lot["entry_price"]] for lot in simulator.short_lots["SYN"]] == [lot[:3] for lot in shorts]
+
+    # Unrealized from the running cost basis agrees with marking every lot
+    NBBO = {"bid": 99.5, "ask": 100.5}
+    unrealized = sum((99.5 - lot[2]) * lot[0] for lot in longs) + sum((lot[2] - 100.5) * lot[0] for lot in shorts)
+    assert simulator.get_stock_unrealized_PnL("SYN", NBBO) == pytest.approx(unrealized)
+
+def test_state_round_trip_continues_identically():
+
+    rng = random.Random(11)
+    fills = [(round(rng.uniform(90, 110), 2), rng.randint(1, 200), i * 1_000_000_000, rng.random() < 0.5, 0.05) for i in range(1, 200)]
+
+    straight = MarketSimulator()
+    resumed = MarketSimulator()
+    for i, (price, qty, timestamp, buy_side, rate) in enumerate(fills):
+        straight.apply_fill("SYN", price, qty, timestamp, buy_side, rate)
+        if i == 100:
+            restored = MarketSimulator()
+            restored.set_state(resumed.get_state())
+            resumed = restored
+        resumed.apply_fill("SYN", price, qty, timestamp, buy_side, rate)
+
+    assert resumed.get_stock_Pnl("SYN") == pytest.approx(straight.get_stock_Pnl("SYN"))
+    assert resumed.get_state()["positions"] == straight.get_state()["positions"]
+
+def full_mark(simulator, marks, timestamp):
+
+    """
+    Portfolio totals from every open lot, with no running totals or cached rows
+    marks: (dict) {stock: (bid, ask)} last non-zero quote of each stock
+    """
+
+    totals = {"realized": sum(simulator.position_PnL.values()), "unrealized": 0.0, "accrued_borrow": 0.0, "gross_exposure": 0.0, "net_exposure": 0.0}
+    for stock, (bid, ask) in marks.items():
+        for lot in simulator.long_lots.get(stock, []):
+            totals["unrealized"] += (bid - lot["entry_price"]) * lot["qty"]
+            totals["gross_exposure"] += bid * lot["qty"]
+            totals["net_exposure"] += bid * lot["qty"]
+        for lot in simulator.short_lots.get(stock, []):
+            totals["unrealized"] += (lot["entry_price"] - ask) * lot["qty"]
+            totals["gross_exposure"] += ask * lot["qty"]
+            totals["net_exposure"] -= ask * lot["qty"]
+            totals["accrued_borrow"] += lot["qty"] * lot["entry_price"] * lot["borrow_rate"] * (timestamp - lot["entry_time"]) / 1e9 / 86400 / 365
+    totals["total"] = totals["realized"] + totals["unrealized"] - totals["accrued_borrow"]
+    return totals
+
+def test_portfolio_snapshot_matches_full_recompute():
+
+    rng = random.Random(5)
+    stocks = ["AAA", "BBB", "CCC"]
+    simulator = MarketSimulator(slippage_model=IdealFillSlippageModel(), cost_structure=IBKRProFIXEDCostStructure())
+
+    marks = {}
+    timestamp = 0
+    for step in range(300):
+        timestamp += rng.randint(1, 600) * 1_000_000_000
+
+        # A few stocks requote, now and then with an empty side that keeps the last price
+        quoted = rng.sample(stocks, rng.randint(0, len(stocks)))
+        bids, asks = [], []
+        for stock in quoted:
+            bid = round(rng.uniform(95, 105), 2)
+            ask = round(bid + rng.choice([0.01, 0.02, 0.05]), 2)
+            last_bid, last_ask = marks.get(stock, (None, None))
+            if rng.random() < 0.1 and last_bid is not None:
+                bid = 0.0
+            if rng.random() < 0.1 and last_ask is not None:
+                ask = 0.0
+            marks[stock] = (bid or last_bid, ask or last_ask)
+            bids.append(bid)
+            asks.append(ask)
+
+        if step % 2:
+            snapshot = simulator.portfolio_snapshot({stock: {"bid": bid, "ask": ask} for stock, bid, ask in zip(quoted, bids, asks)}, timestamp)
+        else:
+            snapshot = simulator.portfolio_snapshot((quoted, bids, asks), timestamp)
+
+        expected = full_mark(simulator, marks, timestamp)
+        for name, value in expected.items():
+            assert snapshot[name] == pytest.approx(value, abs=1e-6)
+        for stock, (bid, ask) in marks.items():
+            NBBO = {"bid": bid, "ask": ask}
+            assert snapshot["symbols"][stock]["unrealized"] == pytest.approx(simulator.get_stock_unrealized_PnL(stock, NBBO), abs=1e-6)
+
+        # Fill only stocks with a mark, at their current quote
+        if marks and rng.random() < 0.5:
+            stock = rng.choice(sorted(marks))
+            buy_side = rng.random() < 0.5
+            price = marks[stock][1] if buy_side else marks[stock][0]
+            simulator.apply_fill(stock, price, rng.randint(1, 300), timestamp, buy_side, 0.0 if buy_side else 0.05)
+
+    assert any(simulator.short_lots.get(stock) for stock in stocks)
+    assert any(simulator.long_lots.get(stock) for stock in stocks)
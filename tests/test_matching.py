@@ -0,0 +1,63 @@
+import pytest
+
+from src.marketsimulator import MarketSimulator
+from src.matching import MatchingEngine
+
+def engine(latency_ns=0):
+    engine = MatchingEngine(MarketSimulator(), latency_ns=latency_ns)
+    engine.on_quote("SYN", 100.00, 100.02, 5, 5, 1)
+    return engine
+
+def test_level_keeps_time_priority_and_removes_by_id():
+
+    e = engine()
+    first = e.submit("SYN", 10, 2, True, "limit", 99.99)
+    second = e.submit("SYN", 10, 3, True, "limit", 99.99)
+    third = e.submit("SYN", 10, 4, True, "limit", 99.99)
+    level = e.books["SYN"][0].levels[first.level]
+    assert list(level) == [first.id, second.id, third.id]
+
+    e.cancel(second.id, 5)
+    assert list(level) == [first.id, third.id]
+    assert second.status == "cancelled"
+
+    # A print at the price fills the oldest order first
+    fills = e.on_trade("SYN", 99.99, 15, 6)
+    assert [(fill["order_id"], fill["qty"]) for fill in fills] == [(first.id, 10), (third.id, 5)]
+    assert first.status == "filled" and third.remaining == 5
+    assert list(level) == [third.id]
+
+def test_open_order_count_follows_fills_and_cancels():
+
+    e = engine(latency_ns=10)
+    assert e.open_order_count("SYN") == 0
+
+    buy = e.submit("SYN", 10, 2, True, "limit", 99.99)
+    sell = e.submit("SYN", 10, 2, False, "limit", 100.03)
+    other = e.submit("OTHER", 5, 2, True, "market")
+    assert e.open_order_count("SYN") == 2 and e.open_order_count() == 3
+
+    # OTHER has no quote so its market order is rejected on arrival
+    e.advance(20)
+    assert other.status == "rejected"
+    assert e.open_order_count("OTHER") == 0 and e.open_order_count() == 2
+
+    e.on_quote("SYN", 100.04, 100.06, 5, 5, 30)
+    assert sell.status == "filled"
+    assert e.open_order_count("SYN") == 1
+    assert e.open_orders("SYN") == [buy]
+
+    e.cancel(buy.id, 40)
+    e.advance(50)
+    assert e.open_order_count("SYN") == 0 and e.open_orders() == []
+    assert not e.books["SYN"][0].levels
+
+def test_traded_through_level_fills_every_order():
+
+    e = engine()
+    orders = [e.submit("SYN", 10, 2 + i, False, "limit", 100.05) for i in range(3)]
+    e.on_trade("SYN", 100.06, 1, 10)
+    assert all(order.status == "filled" for order in orders)
+    assert e.open_order_count("SYN") == 0
+    assert e.simulator.positions["SYN"] == -30
+    assert e.simulator.short_lots["SYN"].cost == pytest.approx(30 * 100.05)
@@ -0,0 +1,20 @@
+import numpy as np
+
+from src.results import Grapher
+
+def test_grapher_grows_from_zero_capacity():
+
+    grapher = Grapher(capacity=0)
+    for i in range(5):
+        grapher.add_data(i, (99.0 + i, 99.1 + i), i, 0.5 * i)
+
+    assert grapher.size == 5
+    np.testing.assert_array_equal(grapher.timestamps, np.arange(5))
+
+def test_grapher_stride_keeps_every_nth_call():
+
+    grapher = Grapher(stride=3, capacity=2)
+    for i in range(10):
+        grapher.add_data(i, (99.0, 99.1), 0, 0.0)
+
+    assert grapher.timestamps.tolist() == [0, 3, 6, 9]
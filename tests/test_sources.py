@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from src.interface import DataInterface
+from src.sources import FileSource, export_days
+
+DATES = ["2025-07-14", "2025-07-15"]
+
+def drain(DI):
+
+    rows = []
+    sample = DI.next_sample()
+    while sample is not None:
+        rows.append((int(sample.temporal), float(sample.NBBO["bid"]), float(sample.NBBO["ask"]), float(sample.last_trade["price"]), float(sample.last_trade["size"])))
+        sample = DI.next_sample()
+    return rows
+
+@pytest.fixture
+def exported(tmp_path, server):
+
+    def export(fmt):
+        root = str(tmp_path / fmt)
+        export_days(DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=11, base_url=server.url), root, fmt)
+        return root
+
+    return export
+
+@pytest.mark.parametrize("fmt", ["npy", "npz"])
+def test_file_source_serves_the_exported_days(server, exported, fmt):
+
+    root = exported(fmt)
+    expected = drain(DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=11, base_url=server.url))
+    assert drain(DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=11, source=FileSource(root, fmt))) == expected
+
+def test_memory_mapped_days_are_not_copied_to_lists(exported):
+
+    DI = DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=11, source=FileSource(exported("npy"), "npy"))
+    DI.next_sample()
+    assert isinstance(DI.bids, np.memmap)
+    assert isinstance(DI.timestamps, np.memmap)
+
+    DI = DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=11, source=FileSource(exported("npz"), "npz"))
+    DI.next_sample()
+    assert isinstance(DI.bids, list)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.interface import DataInterface, DAY_COLUMNS
+from src.marketsimulator import MarketSimulator
+from src.sweep import write_days, load_days, run_sweep, expand_grid
+
+from example_strategies.reversion import RangeBound
+
+DATES = ["2025-07-14", "2025-07-15", "2025-07-16"]
+
+def interface(server):
+    return DataInterface("key", "SYN", DATES, use_NY_hours=False, start_hour=10, end_hour=11, base_url=server.url)
+
+def test_write_days_round_trip(tmp_path, server):
+
+    write_days(interface(server), str(tmp_path))
+    columns, dates, offsets = load_days(str(tmp_path))
+
+    DI = interface(server)
+    assert dates == DATES
+    for d in range(len(DATES)):
+        day = DI._load_day(d)
+        assert offsets[d + 1] - offsets[d] == len(day)
+        for name in DAY_COLUMNS:
+            np.testing.assert_array_equal(columns[name][offsets[d]:offsets[d + 1]], getattr(day, name))
+
+    assert isinstance(columns["bids"], np.memmap)
+    assert columns["timestamps"].dtype == np.int64
+
+def test_run_sweep_matches_sequential_loop(server):
+
+    grid = {"mean": [97.0, 99.0, 101.0], "deviation": [0.5], "max_allowed_position": [100]}
+    results = run_sweep(RangeBound, grid, "key", "SYN", DATES, processes=2, use_NY_hours=False, start_hour=10, end_hour=11, base_url=server.url)
+
+    for params, result in zip(expand_grid(grid), results):
+        strategy = RangeBound(**params)
+        simulator = MarketSimulator()
+        DI = interface(server)
+        sample = DI.next_sample()
+        while sample is not None:
+            if sample.NBBO["bid"] and sample.NBBO["ask"]:
+                qty, buy_side = strategy.get_order(sample.NBBO, simulator.positions.get("SYN", 0))
+                if qty:
+                    simulator.fill_order("SYN", sample.NBBO, qty, sample.temporal, buy_side)
+            sample = DI.next_sample()
+
+        assert result["realized_PnL"] == simulator.get_stock_Pnl("SYN")
+        assert result["position"] == simulator.positions.get("SYN", 0)
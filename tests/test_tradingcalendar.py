@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytz
+
+from src.datastream import OC
+from src.interface import DataInterface, get_all_dates_on_range
+from src.tradingcalendar import NYSE, TradingCalendar, nyse_holidays, nyse_early_closes
+
+def utc(ns):
+    return datetime.fromtimestamp(ns / 1e9, pytz.utc).strftime("%Y-%m-%d %H:%M")
+
+def test_2025_holidays_and_early_closes():
+
+    assert sorted(day.isoformat() for day in nyse_holidays(2025)) == [
+        "2025-01-01", "2025-01-20", "2025-02-17", "2025-04-18", "2025-05-26",
+        "2025-06-19", "2025-07-04", "2025-09-01", "2025-11-27", "2025-12-25"
+    ]
+    assert sorted(day.isoformat() for day in nyse_early_closes(2025)) == ["2025-07-03", "2025-11-28", "2025-12-24"]
+
+def test_observance_rules():
+
+    # New Year's Day on a Saturday is not observed on the Friday before
+    assert NYSE.is_session("2021-12-31")
+    # Sunday holidays move to Monday, Saturday ones to Friday
+    assert not NYSE.is_session("2022-06-20")
+    assert not NYSE.is_session("2022-12-26")
+    assert not NYSE.is_session("2021-07-05")
+    assert not NYSE.is_session("2020-07-03")
+    # Juneteenth only from 2022
+    assert NYSE.is_session("2021-06-18")
+    # Special closures and weekends
+    assert not NYSE.is_session("2025-01-09")
+    assert not NYSE.is_session("2025-07-12")
+    # Christmas Eve on a Friday is not an early close
+    assert not NYSE.is_early_close("2021-12-24") and NYSE.is_early_close("2025-12-24")
+
+def test_session_ranges_follow_early_closes_and_dst():
+
+    assert NYSE.session_range("2025-07-05") is None
+    assert [utc(ns) for ns in NYSE.session_range("2025-11-28")] == ["2025-11-28 14:30", "2025-11-28 18:00"]
+    assert [utc(ns) for ns in NYSE.session_range("2025-03-07")] == ["2025-03-07 14:30", "2025-03-07 21:00"]
+    assert [utc(ns) for ns in NYSE.session_range("2025-03-10")] == ["2025-03-10 13:30", "2025-03-10 20:00"]
+    assert [utc(ns) for ns in NYSE.session_range("2025-07-03", extended=True)] == ["2025-07-03 08:00", "2025-07-03 21:00"]
+
+    # Regular sessions give the same window as the fixed NY hours
+    assert NYSE.session_range("2025-07-14") == OC("2025-07-14")
+
+def test_sessions_and_bounds():
+
+    sessions = NYSE.sessions("2025-06-30", "2025-07-08")
+    assert sessions == ["2025-06-30", "2025-07-01", "2025-07-02", "2025-07-03", "2025-07-07", "2025-07-08"]
+    start, end = datetime(2025, 6, 30), datetime(2025, 7, 8)
+    assert get_all_dates_on_range(start, end) == sessions
+    assert len(get_all_dates_on_range(start, end, all_days=True)) == 9
+
+    bounds = NYSE.session_bounds(["2025-07-03", "2025-07-04"])
+    assert tuple(bounds[0]) == NYSE.session_range("2025-07-03")
+    assert tuple(bounds[1]) == (0, 0)
+
+def test_custom_calendar_hours():
+
+    calendar = TradingCalendar(holidays=lambda year: set(), early_closes=lambda year: set(), special_closures=())
+    assert calendar.is_session("2025-07-04")
+    assert not calendar.is_session("2025-07-05")
+
+def test_data_interface_uses_the_calendar_by_default():
+
+    dates = ["2025-07-03", "2025-07-04", "2025-07-05", "2025-07-07"]
+    DI = DataInterface("key", "SYN", dates)
+    assert DI.dates == ["2025-07-03", "2025-07-07"]
+    assert DI._time_window("2025-07-03") == NYSE.session_range("2025-07-03")
+    assert utc(DI._time_window("2025-07-03")[1]) == "2025-07-03 17:00"
+
+    DI = DataInterface("key", "SYN", dates, calendar=None)
+    assert DI.dates == dates
+    assert DI._time_window("2025-07-03") == OC("2025-07-03")
+
+    # Fixed hours ignore early closes but still skip non-sessions
+    DI = DataInterface("key", "SYN", dates, use_NY_hours=False, start_hour=4, end_hour=20)
+    assert DI.dates == ["2025-07-03", "2025-07-07"]
+    assert utc(DI._time_window("2025-07-03")[1]) == "2025-07-04 00:00"
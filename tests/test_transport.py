@@ -0,0 +1,72 @@
+import pytest
+
+from src import transport
+from src.interface import DataInterface
+from src.synthetic import MockPolygonServer
+from src.transport import PolygonSession, PolygonAPIError
+
+def trades_url(server):
+    return f"{server.url}/v3/trades/SYN?timestamp.gte=1752498000000000000&timestamp.lte=1752498060000000000&limit=1000"
+
+@pytest.fixture
+def sleeps(monkeypatch):
+
+    # Records retry delays instead of sleeping, jitter always picks the upper bound
+    delays = []
+    monkeypatch.setattr(transport.time, "sleep", delays.append)
+    monkeypatch.setattr(transport.random, "uniform", lambda low, high: high)
+    return delays
+
+def test_retries_429_and_5xx_then_succeeds(market, sleeps):
+
+    with MockPolygonServer(market, errors=[429, 503, 502]) as server:
+        session = PolygonSession(backoff=0.5, max_backoff=1.5)
+        body = session.get_json(trades_url(server))
+
+    assert body["status"] == "OK" and body["results"]
+    assert session.stats["retries"] == 3
+    assert session.stats["pages"] == 1
+    assert session.page_stats[0]["retries"] == 3
+    # Exponential backoff capped at max_backoff
+    assert sleeps == [0.5, 1.0, 1.5]
+
+def test_gives_up_after_max_retries(market, sleeps):
+
+    with MockPolygonServer(market, errors=[503] * 3) as server:
+        session = PolygonSession(max_retries=2, backoff=0.01)
+        with pytest.raises(PolygonAPIError) as error:
+            session.get_json(trades_url(server) + "&apiKey=secret")
+
+    assert error.value.status_code == 503
+    assert "secret" not in error.value.url
+    assert len(sleeps) == 2
+
+def test_client_errors_are_not_retried(market, sleeps):
+
+    with MockPolygonServer(market, errors=[403]) as server:
+        session = PolygonSession(backoff=0.01)
+        with pytest.raises(PolygonAPIError) as error:
+            session.get_json(trades_url(server))
+
+    assert error.value.status_code == 403
+    assert sleeps == []
+
+def test_flaky_server_serves_the_same_day(market, sleeps):
+
+    def samples(server, session):
+        DI = DataInterface("key", "SYN", ["2025-07-14"], use_NY_hours=False, start_hour=10, end_hour=11, base_url=server.url, session=session)
+        rows = []
+        sample = DI.next_sample(limit=500)
+        while sample is not None:
+            rows.append((sample.temporal, sample.NBBO["bid"], sample.last_trade["price"]))
+            sample = DI.next_sample(limit=500)
+        return rows
+
+    with MockPolygonServer(market) as server:
+        clean = samples(server, PolygonSession())
+    with MockPolygonServer(market, errors=[429, 500, 503, 504]) as server:
+        session = PolygonSession(backoff=0.01)
+        flaky = samples(server, session)
+
+    assert flaky == clean
+    assert session.stats["retries"] == 4
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from src.interface import DayData, DAY_COLUMNS
+from src.sweep import simulate_day
+from src.vectorized import run_vectorized_day
+from src.marketsimulator import MarketSimulator, SlippageModel, IdealFillSlippageModel, BasicFractionalSlippageModel, IBKRProFIXEDCostStructure
+
+from example_strategies.reversion import RangeBound
+
+TICKER = "SYN"
+
+class RecordingSimulator(MarketSimulator):
+
+    """
+    MarketSimulator keeping (timestamp, position, realized PnL) after every fill
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = []
+
+    def apply_fill(self, stock, avg_price, filled_qty, timestamp, *args, **kwargs):
+        super().apply_fill(stock, avg_price, filled_qty, timestamp, *args, **kwargs)
+        self.path.append((timestamp, self.positions[stock], self.position_PnL[stock]))
+
+class TouchOnlySlippageModel(SlippageModel):
+
+    """
+    Fills only the size shown at the touch, the rest of the order is dropped
+    """
+
+    def calculate_slippage(self, NBBO, order_qty, buy_side=True):
+        if buy_side:
+            return NBBO.get("ask"), min(order_qty, NBBO.get("ask_size"))
+        return NBBO.get("bid"), min(order_qty, NBBO.get("bid_size"))
+
+def make_day(n=20000):
+
+    """
+    Mid price oscillating through both edges of RangeBound(mean=100, deviation=2)
+    with touch sizes that are often smaller than the orders
+    """
+
+    rng = np.random.default_rng(0)
+    timestamps = np.cumsum(rng.integers(1, 20_000_000, n))
+    phase = np.cumsum(rng.uniform(0, 2 * np.pi / 200, n))
+    mid = 100 + 3 * np.sin(phase) + rng.normal(0, 0.3, n)
+    bids = np.round(mid - 0.05, 2)
+    bids[::97] = 0
+    return DayData(
+        "2025-07-15",
+        timestamps,
+        bids,
+        np.round(mid + 0.05, 2),
+        rng.integers(0, 150, n).astype(np.float64),
+        rng.integers(0, 150, n).astype(np.float64),
+        np.round(mid, 2),
+        rng.integers(1, 500, n).astype(np.float64)
+    )
+
+@pytest.mark.parametrize("slippage_model", [IdealFillSlippageModel(), BasicFractionalSlippageModel(), TouchOnlySlippageModel()])
+def test_vectorized_matches_event_loop(slippage_model):
+
+    day = make_day()
+    columns = {name: getattr(day, name) for name in DAY_COLUMNS}
+
+    event_sim = RecordingSimulator(slippage_model=slippage_model, cost_structure=IBKRProFIXEDCostStructure())
+    cursor = simulate_day(RangeBound(mean=100, deviation=2), event_sim, TICKER, columns, 0, len(day))
+
+    vector_sim = RecordingSimulator(slippage_model=slippage_model, cost_structure=IBKRProFIXEDCostStructure())
+    result = run_vectorized_day(RangeBound(mean=100, deviation=2), vector_sim, TICKER, day)
+
+    event_path = np.array(event_sim.path)
+    vector_path = np.array(vector_sim.path)
+    assert len(event_path) > 50
+    assert event_path.shape == vector_path.shape
+    np.testing.assert_array_equal(event_path, vector_path)
+    np.testing.assert_array_equal(result.positions[result.fill_index], event_path[:, 1])
+    assert result.fill_qtys.dtype == np.int64
+    assert (result.fill_qtys > 0).all()
+    assert result.positions[-1] == event_sim.positions[TICKER]
+    assert result.equity[-1] == pytest.approx(event_sim.get_equity_curve_sample(TICKER, cursor.NBBO))
+
+def test_batch_fallback_casts_and_drops_empty_fills():
+
+    model = TouchOnlySlippageModel()
+    prices, qtys = model.calculate_slippage_batch(np.array([99.0, 99.0]), np.array([99.1, 99.1]), np.array([5.0, 0.0]), np.array([30.0, 5.0]), np.array([100, 100]), np.array([True, False]))
+
+    assert qtys.dtype == np.int64
+    assert qtys.tolist() == [30, 0]
+    assert prices.tolist() == [99.1, 99.0]
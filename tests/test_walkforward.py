@@ -0,0 +1,56 @@
+import pytest
+
+from src import walkforward
+from src.walkforward import WalkForward, walk_forward_windows
+
+from example_strategies.reversion import RangeBound
+
+DATES = ["2025-07-14", "2025-07-15", "2025-07-16", "2025-07-17"]
+GRID = {"mean": [97.0, 99.0, 101.0], "deviation": [0.5], "max_allowed_position": [100]}
+
+def walk_forward(server, flatten_daily):
+    return WalkForward(RangeBound, "key", "SYN", DATES, processes=2, flatten_daily=flatten_daily, use_NY_hours=False, start_hour=10, end_hour=11, base_url=server.url)
+
+class NoPool:
+
+    def __init__(self, *args, **kwargs):
+        raise AssertionError("a cached run should not simulate")
+
+def test_windows_roll_forward():
+
+    windows = walk_forward_windows(5, train_days=2, test_days=2)
+    assert [(list(train), list(test)) for train, test in windows] == [([0, 1], [2, 3]), ([2, 3], [4])]
+
+    anchored = walk_forward_windows(4, train_days=2, anchored=True)
+    assert [(list(train), list(test)) for train, test in anchored] == [([0, 1], [2]), ([0, 1, 2], [3])]
+
+@pytest.mark.parametrize("flatten_daily", [True, False])
+def test_second_run_reads_the_day_cache(server, monkeypatch, flatten_daily):
+
+    with walk_forward(server, flatten_daily) as wf:
+        first = wf.run(GRID, train_days=1)
+        pages = server.pages_served
+
+        monkeypatch.setattr(walkforward, "ProcessPoolExecutor", NoPool)
+        again = wf.run(GRID, train_days=1)
+        longer = wf.run(GRID, train_days=2, metric="sharpe_daily")
+
+        assert server.pages_served == pages
+        assert again == first
+        assert len(longer["windows"]) == len(DATES) - 2
+
+def test_continuous_run_resumes_from_the_last_state(server):
+
+    with walk_forward(server, False) as straight:
+        expected = straight.day_results(GRID)
+
+    with walk_forward(server, False) as wf:
+        wf.day_results(GRID, days=2)
+        resumed = wf.day_results(GRID)
+
+    assert {key: [day["equity"] for day in days] for key, days in resumed.items()} == {key: [day["equity"] for day in days] for key, days in expected.items()}
+    assert any(day["pnl"] != 0 for days in resumed.values() for day in days)
+
+    # Only the last simulated day of every parameter set keeps a simulator state
+    for days in resumed.values():
+        assert [day["state"] is not None for day in days] == [False] * (len(DATES) - 1) + [True]